@@ -0,0 +1,16 @@
+# gunicorn.conf.py
+# Same settings the Dockerfile used to pass on the command line, plus
+# preload-and-fork: with PRELOAD_MODELS=1 the master imports the app (and
+# loads every model bundle) once, and workers share those pages copy-on-write.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+loglevel = os.getenv("LOG_LEVEL", "debug")
+preload_app = os.getenv("PRELOAD_MODELS", "0") == "1"
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked (preload_app={preload_app})")
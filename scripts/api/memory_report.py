@@ -0,0 +1,86 @@
+# scripts/api/memory_report.py
+"""
+Per-process memory breakdown from /proc/<pid>/smaps_rollup (Linux).
+
+- rss:    resident pages, shared ones counted in full
+- pss:    proportional share (shared pages divided by their sharers)
+- uss:    pages private to this process -- what one more worker really costs
+- shared: resident pages also mapped by another process (e.g. copy-on-write
+          model arrays inherited from a preloading gunicorn master)
+
+    python -m scripts.api.memory_report --master <gunicorn master pid>
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """rss / pss / uss / shared in MB for `pid` (default: this process)."""
+    pid = pid or os.getpid()
+    kb: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[-1] == "kB":
+                    kb[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return {"pid": pid, "error": "smaps_rollup unavailable"}
+
+    uss = kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)
+    shared = kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)
+    return {
+        "pid": pid,
+        "rss_mb": round(kb.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(kb.get("Pss", 0) / 1024, 1),
+        "uss_mb": round(uss / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    """Direct children of `parent` (scans /proc/*/stat for the ppid field)."""
+    children = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            children.append(int(stat.parent.name))
+    return sorted(children)
+
+
+def report(master: int) -> List[Dict[str, float]]:
+    rows = [dict(process_memory(master), role="master")]
+    rows += [dict(process_memory(pid), role="worker") for pid in child_pids(master)]
+
+    print("\n" + "=" * 68)
+    print(f"🧠 Memory for gunicorn master {master} and {len(rows) - 1} workers (MB)")
+    print("=" * 68)
+    print(f"   {'role':<8}{'pid':>8}{'rss':>10}{'pss':>10}{'uss':>10}{'shared':>10}")
+    for r in rows:
+        if "error" in r:
+            print(f"   {r['role']:<8}{r['pid']:>8}  {r['error']}")
+            continue
+        print(f"   {r['role']:<8}{r['pid']:>8}{r['rss_mb']:>10}{r['pss_mb']:>10}"
+              f"{r['uss_mb']:>10}{r['shared_mb']:>10}")
+    workers = [r for r in rows if r["role"] == "worker" and "error" not in r]
+    if workers:
+        total_pss = sum(r["pss_mb"] for r in rows if "error" not in r)
+        avg_uss = sum(r["uss_mb"] for r in workers) / len(workers)
+        print("-" * 68)
+        print(f"   total PSS {total_pss:.1f} MB | avg worker USS {avg_uss:.1f} MB "
+              f"(≈ cost of one more worker)")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSS/PSS/USS of a gunicorn master and its workers")
+    parser.add_argument("--master", type=int, required=True, help="gunicorn master pid")
+    args = parser.parse_args()
+    report(args.master)
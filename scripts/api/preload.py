@@ -0,0 +1,61 @@
+# scripts/api/preload.py
+"""
+Preload-and-fork support for gunicorn.
+
+With PRELOAD_MODELS=1 and gunicorn's preload_app (see gunicorn.conf.py), the
+master imports the app once and this module loads, before forking:
+
+- every model bundle
+- with PRELOAD_EMBEDDINGS=1, the sentence-transformers weights used by GraphRAG
+- with PRELOAD_TRANSLATORS=1, the common MarianMT translators
+
+Workers then inherit those pages copy-on-write instead of each loading its
+own copy.
+
+gc.freeze() moves everything allocated so far out of the collector's view, so
+GC passes in the workers don't write to (and un-share) the inherited objects.
+"""
+from __future__ import annotations
+
+import gc
+import os
+import time
+from typing import Dict
+
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+PRELOAD_EMBEDDINGS = os.getenv("PRELOAD_EMBEDDINGS", "0") == "1"
+# Load (and pin) the TRANSLATOR_PRELOAD MarianMT pairs, e.g. hi<->en
+PRELOAD_TRANSLATORS = os.getenv("PRELOAD_TRANSLATORS", "0") == "1"
+
+
+def preload_all() -> Dict:
+    """Load shared read-only state in the current (master) process."""
+    from scripts.recommendation.predict import preload_bundles
+
+    t0 = time.perf_counter()
+    summary: Dict = {"bundles": preload_bundles()}
+
+    if PRELOAD_EMBEDDINGS:
+        try:
+            from scripts.rag.graph_rag import get_embeddings
+
+            get_embeddings()
+            summary["embeddings"] = True
+        except Exception as e:  # RAG is optional; never block startup on it
+            print(f"⚠️  Embedding preload skipped: {e}")
+            summary["embeddings"] = False
+
+    if PRELOAD_TRANSLATORS:
+        try:
+            from scripts.preprocessing.multilingual_handler import preload_translators
+
+            summary["translators"] = preload_translators()
+        except Exception as e:  # translation is optional too
+            print(f"⚠️  Translator preload skipped: {e}")
+            summary["translators"] = []
+
+    gc.collect()
+    gc.freeze()
+    summary["seconds"] = round(time.perf_counter() - t0, 3)
+    print(f"📦 Preloaded in pid {os.getpid()}: {summary}")
+    return summary
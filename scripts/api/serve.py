@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import hmac
+import json
+import os
+import time
+
+_IMPORT_T0 = time.perf_counter()
+
 from typing import List, Dict, Any, Optional
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, root_validator
 
-from scripts.recommendation.predict import predict
-from scripts.llm.llm_client import explain_recommendation
+from scripts.recommendation.predict import (
+    predict, predict_batch, hybrid_stats, bundle_versions, reload_bundles, start_bundle_watcher,
+)
+from scripts.recommendation.pricing import quote_property_portfolio, quote_vehicle_portfolio
+from scripts.llm.llm_client import explain_many, llm_stats, stream_explanations, will_enrich
+from scripts.rag.graph_rag import context_result, context_result_async, rag_stats, submit_context
+from scripts.api.memory_report import process_memory
+from scripts.api.preload import PRELOAD_MODELS, preload_all
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException
 
@@ -124,6 +138,10 @@ class RecommendRequest(BaseModel):
     accident_coverage: Optional[str] = None
     trip_premium: Optional[float] = Field(None, ge=0)
 
+    # Explanations: None = server default (EXPLAIN_ENRICH), False = templates only,
+    # True = LLM text when there is capacity
+    enrich: Optional[bool] = None
+
     @root_validator(pre=True)
     def standardize_fields(cls, values):
         # Handle empty strings
@@ -255,10 +273,29 @@ class PolicyItem(BaseModel):
 
 class MultiRecommendRequest(BaseModel):
     policies: List[PolicyItem] = Field(..., min_items=1, max_items=5)
+    enrich: Optional[bool] = None  # as RecommendRequest.enrich
 
 class MultiRecommendResponse(BaseModel):
     results: List[RecommendResponse]
 
+# Rows accepted by one /quote/bulk request; larger portfolios go through
+# batch_reprice.py or several requests
+BULK_QUOTE_MAX_ITEMS = int(os.getenv("BULK_QUOTE_MAX_ITEMS", "10000"))
+
+class BulkQuoteRequest(BaseModel):
+    policy_type: str = Field(..., description="VEHICLE or HOUSE")
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        min_items=1,
+        description="Rows with price_of_vehicle/age_of_vehicle/type_of_vehicle (VEHICLE) "
+                    "or property_value/property_age/property_type/property_size_sq_feet (HOUSE)",
+    )
+
+class BulkQuoteResponse(BaseModel):
+    policy_type: str
+    count: int
+    quotes: List[Dict[str, Any]]
+
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -266,6 +303,35 @@ def to_dict_safe(model: BaseModel) -> Dict[str, Any]:
     dump = getattr(model, "model_dump", None)
     return dump() if callable(dump) else model.dict()
 
+# -----------------------------
+# Startup
+# -----------------------------
+# Heavy dependencies (sklearn, the LLM provider clients, torch, HF embeddings) load
+# on first use, so a worker is ready once this module has imported.
+# WARM_ON_START=1 pays those costs before the worker accepts traffic instead.
+STARTUP: Dict[str, float] = {"import_seconds": round(time.perf_counter() - _IMPORT_T0, 3)}
+
+# Under gunicorn preload_app this runs once in the master, before fork
+if PRELOAD_MODELS:
+    STARTUP["preload_seconds"] = preload_all()["seconds"]
+
+# Each worker polls the bundles' CURRENT pointers and hot-swaps new model
+# versions in the background (0 disables; then requests check per call)
+BUNDLE_WATCH_SECONDS = float(os.getenv("BUNDLE_WATCH_SECONDS", "10"))
+# POST /admin/reload requires X-Admin-Token to match; unset disables it
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+@app.on_event("startup")
+def report_startup():
+    if os.getenv("WARM_ON_START", "0") == "1":
+        t0 = time.perf_counter()
+        import sklearn.ensemble  # noqa: F401  (unpickling the HGB models needs it)
+        STARTUP["warm_seconds"] = round(time.perf_counter() - t0, 3)
+    # Started per worker (after fork): threads don't survive fork
+    if BUNDLE_WATCH_SECONDS > 0:
+        start_bundle_watcher(BUNDLE_WATCH_SECONDS)
+    print(f"🚀 Worker {os.getpid()} ready: {STARTUP} memory={process_memory()}")
+
 # -----------------------------
 # Endpoints
 # -----------------------------
@@ -273,60 +339,136 @@ def to_dict_safe(model: BaseModel) -> Dict[str, Any]:
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics/hybrid")
+def hybrid_metrics():
+    """Rule short-circuit hit rate and classifier time saved, per product."""
+    return hybrid_stats()
+
+@app.get("/metrics/llm")
+def llm_metrics():
+    """Template vs LLM explanations, load shedding and per-provider LLM stats for this worker."""
+    return llm_stats()
+
+@app.get("/metrics/rag")
+def rag_metrics():
+    """GraphRAG retrievals: cache hits, on-time vs missed-deadline rate and latency."""
+    return rag_stats()
+
+@app.get("/metrics/memory")
+def memory_metrics():
+    """This worker's RSS / PSS / unique (USS) / shared memory in MB."""
+    return process_memory()
+
+@app.get("/admin/bundles")
+def admin_bundles():
+    """Model version this worker is serving for each loaded bundle."""
+    return {"pid": os.getpid(), "versions": bundle_versions()}
+
+@app.post("/admin/reload")
+def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    """Swap this worker to the bundles' current versions now (others follow via their watcher)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    changes = reload_bundles()
+    return {"pid": os.getpid(), "changes": changes, "versions": bundle_versions()}
+
+@app.post("/quote/bulk", response_model=BulkQuoteResponse)
+def quote_bulk(req: BulkQuoteRequest):
+    """Reprice a whole vehicle or property portfolio in one vectorized call."""
+    import pandas as pd
+
+    policy_type = req.policy_type.upper()
+    if len(req.items) > BULK_QUOTE_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"At most {BULK_QUOTE_MAX_ITEMS} items per request, got {len(req.items)}"},
+        )
+    df = pd.DataFrame(req.items)
+    try:
+        if policy_type == "VEHICLE":
+            for col in ("price_of_vehicle", "age_of_vehicle", "type_of_vehicle"):
+                if col not in df.columns:
+                    df[col] = None
+            priced = quote_vehicle_portfolio(df)
+            cols = ["idv", "annual_premium"]
+        elif policy_type == "HOUSE":
+            for col in ("property_value", "property_age", "property_type"):
+                if col not in df.columns:
+                    df[col] = None
+            priced = quote_property_portfolio(df)
+            cols = ["annual_premium"]
+        else:
+            raise ValueError(f"Bulk quoting supports VEHICLE and HOUSE, got: {policy_type}")
+    except ValueError as ve:
+        return JSONResponse(status_code=400, content={"detail": str(ve)})
+
+    quotes = priced[cols].round(2).to_dict(orient="records")
+    return {"policy_type": policy_type, "count": len(quotes), "quotes": quotes}
+
+def _validate_recommend(req: RecommendRequest):
+    """(country, policy_type, data) for a /recommend request; raises ValueError if invalid."""
+    data = to_dict_safe(req)
+    # Get and normalize country
+    country = data.get("country", "").upper()
+    if not country:
+        raise ValueError("Country is required")
+        
+    # Handle country codes
+    country_mapping = {
+        "IN": "INDIA",
+        "AU": "AUSTRALIA",
+        "INDIA": "INDIA",
+        "AUSTRALIA": "AUSTRALIA"
+    }
+    
+    country = country_mapping.get(country)
+    if not country:
+        raise ValueError(f"Invalid country. Must be one of: IN, AU, INDIA, AUSTRALIA")
+        
+    # Get and validate policy type
+    policy_type = data.get("policy_type", "").upper()
+    if not policy_type:
+        raise ValueError("Policy type is required")
+    if policy_type not in ["HEALTH", "LIFE", "TRAVEL", "HOUSE", "VEHICLE"]:
+        raise ValueError(f"Invalid policy type: {policy_type}")
+    
+    data.pop("policy", None)  # Remove extra field if present
+    data.pop("enrich", None)  # explanation option, not a model input
+    
+    print(f"Processing request for {country} - {policy_type}")
+    print(f"Input data: {data}")
+    
+    # Policy-specific validation
+    if policy_type == "HOUSE":
+        if not data.get("property_value"):
+            raise ValueError("Property value is required for house insurance")
+        if "property_age" not in data:
+            raise ValueError("Property age is required for house insurance")
+        if not data.get("property_type"):
+            raise ValueError("Property type is required for house insurance")
+
+    return country, policy_type, data
+
 @app.post("/recommend", response_model=RecommendResponse)
 async def recommend(req: RecommendRequest):
     try:
         print(f"\n=== Starting recommendation request ===")
         print(f"Request data: {req}")
         
-        data = to_dict_safe(req)
-        # Get and normalize country
-        country = data.get("country", "").upper()
-        if not country:
-            raise ValueError("Country is required")
-            
-        # Handle country codes
-        country_mapping = {
-            "IN": "INDIA",
-            "AU": "AUSTRALIA",
-            "INDIA": "INDIA",
-            "AUSTRALIA": "AUSTRALIA"
-        }
-        
-        country = country_mapping.get(country)
-        if not country:
-            raise ValueError(f"Invalid country. Must be one of: IN, AU, INDIA, AUSTRALIA")
-            
-        # Get and validate policy type
-        policy_type = data.get("policy_type", "").upper()
-        if not policy_type:
-            raise ValueError("Policy type is required")
-        if policy_type not in ["HEALTH", "LIFE", "TRAVEL", "HOUSE", "VEHICLE"]:
-            raise ValueError(f"Invalid policy type: {policy_type}")
-        
-        data.pop("policy", None)  # Remove extra field if present
-        
-        print(f"Processing request for {country} - {policy_type}")
-        print(f"Input data: {data}")
-        
-        # Policy-specific validation
-        if policy_type == "HOUSE":
-            if not data.get("property_value"):
-                raise ValueError("Property value is required for house insurance")
-            if "property_age" not in data:
-                raise ValueError("Property age is required for house insurance")
-            if not data.get("property_type"):
-                raise ValueError("Property type is required for house insurance")
-        
-        prediction = predict(country, policy_type, data)
+        started = time.perf_counter()
+        country, policy_type, data = _validate_recommend(req)
+        # Retrieval runs alongside inference; only the LLM path uses it.
+        # Inference is CPU-bound: run it off the event loop
+        rag = submit_context(country, policy_type, data) if will_enrich(req.enrich) else None
+        prediction = await asyncio.to_thread(predict, country, policy_type, data)
         print(f"Prediction result: {prediction}")
+        knowledge = await context_result_async(rag, started)
 
-        explanation = explain_recommendation(
-            user_input=data,
-            prediction=prediction,
-            ranked_policies=None,
-            rag_knowledge="GraphRAG knowledge goes here",
-        )
+        # Template text unless LLM enrichment is requested and not shed
+        explanation = (await explain_many([(data, prediction)], rag_knowledge=knowledge,
+                                          enrich=req.enrich))[0]
         print(f"Generated explanation: {explanation}")
         
         return {"prediction": prediction, "explanation": explanation}
@@ -346,64 +488,83 @@ async def recommend(req: RecommendRequest):
             content={"detail": "An internal server error occurred. Please try again later."}
         )
 
+def _sse(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/recommend/stream")
+async def recommend_stream(req: RecommendRequest):
+    """
+    /recommend as server-sent events: a `prediction` event right away, then one
+    `explanation` event ({"field", "text"}) per tier (with enrichment, as soon
+    as the LLM finishes writing it), then `done`.
+    """
+    started = time.perf_counter()
+    try:
+        country, policy_type, data = _validate_recommend(req)
+        rag = submit_context(country, policy_type, data) if will_enrich(req.enrich) else None
+        prediction = await asyncio.to_thread(predict, country, policy_type, data)
+    except ValueError as ve:
+        print(f"Validation error: {str(ve)}")
+        return JSONResponse(status_code=400, content={"detail": str(ve)})
+
+    def events():
+        yield _sse("prediction", prediction)
+        knowledge = context_result(rag, started)
+        for field, text in stream_explanations(data, prediction, knowledge, enrich=req.enrich):
+            yield _sse("explanation", {"field": field, "text": text})
+        yield _sse("done", {})
+
+    # Sync generator: Starlette iterates it in a worker thread, off the event loop
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/recommend_multiple", response_model=MultiRecommendResponse)
 async def recommend_multiple(req: MultiRecommendRequest):
     print("Processing multiple recommendations request")
     print(f"Number of policies: {len(req.policies)}")
-    results = []
-    
+    started = time.perf_counter()
+    enrich = will_enrich(req.enrich)
+
+    # ---- Parse every item; one batched predict call for all of them
+    items = []
     for idx, policy in enumerate(req.policies):
         try:
-            print(f"\nProcessing policy {idx + 1}:")
-            # Convert policy to dict and make prediction
             policy_dict = to_dict_safe(policy)
-            print(f"Policy data: {policy_dict}")
-            
             country = policy_dict.pop("country", "").upper()
             policy_type = policy_dict.pop("policy_type", "").upper()
-            print(f"Country: {country}, Policy Type: {policy_type}")
-            
+            print(f"Policy {idx + 1}: {country} {policy_type} {policy_dict}")
+
             if not country or not policy_type:
                 print(f"Skipping policy {idx + 1}: Missing country or policy_type")
                 continue
-                
+
             # Remove None values to avoid prediction issues
             policy_dict = {k: v for k, v in policy_dict.items() if v is not None}
-            
-            try:
-                prediction = predict(
-                    country=country,
-                    policy=policy_type,
-                    data=policy_dict
-                )
-                print(f"Prediction result: {prediction}")
-                
-                explanation = explain_recommendation(
-                    user_input=policy_dict,
-                    prediction=prediction,
-                    ranked_policies=None,
-                    rag_knowledge="GraphRAG knowledge goes here"
-                )
-                
-                results.append({
-                    "prediction": prediction,
-                    "explanation": explanation
-                })
-                print(f"Successfully processed policy {idx + 1}")
-            except ValueError as ve:
-                print(f"Validation error in policy {idx + 1}: {str(ve)}")
-                continue
-            except Exception as e:
-                import traceback
-                print(f"Error processing policy {idx + 1}: {str(e)}")
-                print(traceback.format_exc())
-                continue
-                
+            items.append((idx, country, policy_type, policy_dict))
         except Exception as e:
             print(f"Error parsing policy {idx + 1}: {str(e)}")
             continue
-    
-    if not results:
-        return {"results": []}  # Return empty results instead of raising error
-        
+
+    # Retrieval for each distinct profile runs alongside inference
+    rag = [submit_context(c, p, d) for _, c, p, d in items] if enrich else []
+    predictions = await asyncio.to_thread(predict_batch, [(c, p, d) for _, c, p, d in items])
+    contexts = await asyncio.gather(*(context_result_async(f, started) for f in rag))
+    knowledge = "\n\n".join(dict.fromkeys(c for c in contexts if c))
+
+    ok = []
+    for (idx, country, policy_type, policy_dict), prediction in zip(items, predictions):
+        if isinstance(prediction, Exception):
+            kind = "Validation error" if isinstance(prediction, ValueError) else "Error"
+            print(f"{kind} in policy {idx + 1}: {prediction}")
+            continue
+        # country/policy_type were popped for prediction; the prompt needs them back
+        ok.append(({**policy_dict, "country": country, "policy_type": policy_type}, prediction))
+
+    # ---- Explanations: templates, or concurrent LLM calls; results kept in input order
+    explanations = await explain_many(ok, rag_knowledge=knowledge, enrich=req.enrich)
+    results = [
+        {"prediction": prediction, "explanation": explanation}
+        for (_, prediction), explanation in zip(ok, explanations)
+    ]
+    print(f"Successfully processed {len(results)} of {len(req.policies)} policies")
     return {"results": results}
@@ -0,0 +1,72 @@
+# scripts/api/startup_profile.py
+"""
+Measure how long a fresh interpreter takes to import a module (default: the API app).
+
+Runs `python -X importtime -c "import <module>"` a few times and prints the
+median wall time plus the slowest packages by cumulative import time
+(a package's figure includes whatever it imports first, e.g. pandas -> numpy).
+
+    python -m scripts.api.startup_profile
+    python -m scripts.api.startup_profile --module scripts.recommendation.predict --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+def _run(module: str) -> Tuple[float, str]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    return wall, proc.stderr
+
+
+def _packages(importtime: str) -> Dict[str, int]:
+    """Cumulative µs of each top-level package's own import line (includes its dependencies)."""
+    totals: Dict[str, int] = {}
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." in name or not cumulative.strip().isdigit():
+            continue
+        totals[name] = max(totals.get(name, 0), int(cumulative))
+    return totals
+
+
+def profile(module: str, repeats: int = 3, top: int = 10) -> Dict:
+    runs: List[Tuple[float, str]] = [_run(module) for _ in range(repeats)]
+    baseline = statistics.median(_run("os")[0] for _ in range(repeats))
+    wall = statistics.median(r[0] for r in runs)
+    root = module.split(".")[0]
+    packages = sorted(((k, v) for k, v in _packages(runs[-1][1]).items() if k != root),
+                      key=lambda kv: kv[1], reverse=True)
+
+    print("\n" + "=" * 68)
+    print(f"⏱️  import {module}: {wall:.2f}s wall (interpreter startup {baseline:.2f}s)")
+    print("=" * 68)
+    for name, us in packages[:top]:
+        print(f"   {name:<32} {us / 1e6:6.3f}s")
+    return {"module": module, "wall_seconds": wall, "baseline_seconds": baseline,
+            "packages": dict(packages[:top])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time profile of an API module")
+    parser.add_argument("--module", default="scripts.api.serve")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    profile(args.module, args.repeats, args.top)
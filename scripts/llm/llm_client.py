@@ -1,25 +1,44 @@
 # scripts/llm/llm_client.py
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import re
-from typing import Dict
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
-import google.generativeai as genai
 
+# providers reads its configuration from the environment at import time
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    # Don't crash the API; return a stub later
-    genai = None
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
+from scripts.llm.providers import LLMRouter, estimate_tokens, get_router  # noqa: E402
+from scripts.llm.templates import template_explanations  # noqa: E402
 
-# Use a widely available fast model
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+SYSTEM_PROMPT = (
+    "You are a concise, trustworthy insurance advisor. "
+    "Generate short, plain-English explanations."
+)
+EXPLANATION_KEYS = ["Basic", "Standard", "Gold", "Premium", "why_recommended"]
+
+
+def _client() -> Optional[LLMRouter]:
+    """Shared provider router (LLM_PROVIDERS), or None when none is configured (fallback replies)."""
+    return get_router()
+
+
+def llm_stats() -> Dict:
+    """
+    Template vs LLM explanation counts, load shedding and prompt/reply token
+    totals, plus the router's per-provider calls, failures, latency, tokens,
+    cost and breaker state.
+    """
+    router = _client()
+    out = router.stats() if router is not None else {"configured": False}
+    out["explanations"] = _SHEDDER.stats()
+    out["tokens"] = token_stats()
+    return out
 
 
 def _safe_json_parse(text: str) -> Dict:
@@ -58,39 +77,162 @@ def _safe_json_parse(text: str) -> Dict:
 
 def _fallback_explanations(user_input: Dict, prediction: Dict, knowledge: str = "") -> Dict:
     """
-    Used when Gemini is unavailable or returns malformed JSON.
-    Produces clear, safe defaults based on premiums and recommended tier.
-    """
-    tiers = prediction.get("all_tiers", {})
-    rec = prediction.get("recommended_tier", "")
-
-    def brief(tier: str) -> str:
-        premium = tiers.get(tier)
-        base = (
-            "Basic offers essential coverage at an affordable price."
-            if tier == "Basic" else
-            "Standard enhances the essentials with a few valuable extras."
-            if tier == "Standard" else
-            "Gold adds higher limits and more comprehensive protections."
-            if tier == "Gold" else
-            "Premium provides the most complete protection and highest limits."
-        )
-        return f"{base} Estimated premium: {premium}."
-
-    why = (
-        f"We recommend **{rec}** because it best matches your profile "
-        f"(age, dependents, sum assured and other inputs) while balancing cost vs. coverage."
-    )
-    if knowledge:
-        why += " We also considered relevant guidelines and industry details from our knowledge base."
-
-    return {
-        "Basic": brief("Basic"),
-        "Standard": brief("Standard"),
-        "Gold": brief("Gold"),
-        "Premium": brief("Premium"),
-        "why_recommended": why,
-    }
+    Template explanations (scripts/llm/templates.py): the default reply, and
+    what we fall back to when the LLM is unavailable, shed, or returns
+    malformed JSON.
+    """
+    out = template_explanations(user_input, prediction, knowledge)
+    out["source"] = "template"
+    return out
+
+
+# -----------------------------
+# Prompt compaction
+# -----------------------------
+# Request fields the model needs per policy type. Nulls, the customer's name
+# and other products' fields stay out of the prompt.
+_HEALTH_FIELDS = ["age", "sum_assured", "smoker_drinker", "num_diseases", "diseases", "annual_premium"]
+PROMPT_FIELDS = {
+    "HEALTH": _HEALTH_FIELDS,
+    "LIFE": _HEALTH_FIELDS,
+    "VEHICLE": ["price_of_vehicle", "age_of_vehicle", "type_of_vehicle"],
+    "HOUSE": ["property_value", "property_age", "property_type", "property_size", "property_size_sq_feet"],
+    "TRAVEL": ["age", "destination_country", "trip_duration_days", "existing_medical_condition",
+               "health_coverage", "baggage_coverage", "trip_cancellation_coverage",
+               "accident_coverage", "trip_premium"],
+}
+_NEVER_IN_PROMPT = {"name", "enrich", "policy_tier"}
+# Cap on the knowledge (RAG) text in one prompt, in estimated tokens
+KNOWLEDGE_TOKEN_BUDGET = int(os.getenv("KNOWLEDGE_TOKEN_BUDGET", "300"))
+_STOPWORDS = {"yes", "none", "the", "and", "for", "with"}
+
+
+def _policy_type(user_input: Dict) -> Optional[str]:
+    policy = str(user_input.get("policy_type") or "").upper()
+    return policy if policy in PROMPT_FIELDS else None
+
+
+def _guess_fields(user_input: Dict) -> List[str]:
+    """
+    Last resort when the caller passed no policy_type: the fields of every
+    policy type matching the most non-null inputs (HEALTH and LIFE always
+    tie, an age-only profile also ties with TRAVEL). Empty if nothing matches.
+    """
+    present = {k for k, v in user_input.items() if v not in (None, "")}
+    overlap = {p: len(present & set(fields)) for p, fields in PROMPT_FIELDS.items()}
+    best = max(overlap.values())
+    if not best:
+        return []
+    tied = [PROMPT_FIELDS[p] for p in PROMPT_FIELDS if overlap[p] == best]
+    return list(dict.fromkeys(f for fields in tied for f in fields))
+
+
+def compact_profile(user_input: Dict) -> Dict:
+    """
+    The user_input fields relevant to its policy type, without nulls. A
+    guessed type only narrows the fields; it is never written into the prompt.
+    """
+    policy = _policy_type(user_input)
+    if policy is not None:
+        keys = ["country", "policy_type"] + PROMPT_FIELDS[policy]
+    else:
+        guessed = _guess_fields(user_input)
+        if guessed:
+            keys = ["country"] + guessed
+        else:
+            keys = [k for k in user_input if k not in _NEVER_IN_PROMPT]
+    out = {k: user_input[k] for k in keys if user_input.get(k) not in (None, "")}
+    if policy is not None:
+        out["policy_type"] = policy
+    return out
+
+
+def _terms(text: str) -> set:
+    return {w for w in re.findall(r"[a-z]{3,}", text.lower()) if w not in _STOPWORDS}
+
+
+def fit_knowledge(knowledge: str, profiles: List[Dict], budget: Optional[int] = None) -> str:
+    """
+    Knowledge text cut to `budget` estimated tokens: distinct passages
+    (paragraphs, bullets, sentences) that share words with the profiles,
+    best-matching first, kept in their original order. If none fits, the best
+    one is truncated.
+    """
+    budget = KNOWLEDGE_TOKEN_BUDGET if budget is None else budget
+    knowledge = (knowledge or "").strip()
+    if not knowledge or budget <= 0:
+        return ""
+    if estimate_tokens(knowledge) <= budget:
+        return knowledge
+
+    split = re.split(r"\n\s*\n|\n(?=\s*[-*•])|(?<=[.!?])\s+", knowledge)
+    chunks = list(dict.fromkeys(c.strip() for c in split if c.strip()))  # drop repeats
+    # Match on values; for yes/no flags the field name says what it is ("smoker_drinker")
+    wanted = _terms(" ".join(k.replace("_", " ") if str(v).lower() == "yes" else str(v)
+                             for p in profiles for k, v in p.items()))
+    scores = [len(wanted & _terms(c)) for c in chunks]
+    ranked = sorted((i for i in range(len(chunks)) if scores[i]), key=lambda i: (-scores[i], i))
+    keep, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(chunks[i])
+        if used + cost <= budget:
+            keep.append(i)
+            used += cost
+    if not keep:
+        return chunks[(ranked or [0])[0]][:budget * 4]
+    return "\n".join(chunks[i] for i in sorted(keep))
+
+
+def _compact_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _knowledge_section(knowledge: str) -> str:
+    return f"\nExtra knowledge (not guaranteed):\n{knowledge}\n" if knowledge else ""
+
+
+def _explanation_prompt(user_input: Dict, prediction: Dict, knowledge: str = "") -> str:
+    profile = compact_profile(user_input)
+    return f"""
+User profile (JSON): {_compact_json(profile)}
+Predicted premiums (JSON): {_compact_json(prediction.get("all_tiers", {}))}
+Recommended tier: {prediction.get("recommended_tier", "")}
+{_knowledge_section(fit_knowledge(knowledge, [profile]))}
+Instructions:
+1) For each tier (Basic, Standard, Gold, Premium), write 2–4 sentences:
+   - What the tier generally includes and who it suits.
+   - Mention its estimated premium from the JSON above.
+2) Add a field "why_recommended" explaining why the recommended tier fits this user better than the others.
+3) Return STRICT JSON with keys: "Basic", "Standard", "Gold", "Premium", "why_recommended".
+"""
+
+
+# Prompt / reply token totals across calls, for /metrics/llm
+_TOKEN_LOCK = threading.Lock()
+_TOKEN_STATS = {"calls": 0, "prompt_tokens": 0, "response_tokens": 0}
+
+
+def _record_tokens(usage: Dict, policies: int = 1) -> Dict[str, int]:
+    """Log and count one call's token usage; returns the per-request report."""
+    tokens = {"prompt": usage.get("in", 0), "response": usage.get("out", 0)}
+    with _TOKEN_LOCK:
+        _TOKEN_STATS["calls"] += 1
+        _TOKEN_STATS["prompt_tokens"] += tokens["prompt"]
+        _TOKEN_STATS["response_tokens"] += tokens["response"]
+    print(f"🧮 LLM {usage.get('provider', '?')}: prompt {tokens['prompt']} tokens, "
+          f"reply {tokens['response']} tokens ({policies} {'policy' if policies == 1 else 'policies'})")
+    if policies > 1:
+        tokens["policies"] = policies  # one combined call shared by this many
+    return tokens
+
+
+def token_stats() -> Dict:
+    with _TOKEN_LOCK:
+        out = dict(_TOKEN_STATS)
+    if out["calls"]:
+        out["avg_prompt_tokens"] = round(out["prompt_tokens"] / out["calls"], 1)
+        out["avg_response_tokens"] = round(out["response_tokens"] / out["calls"], 1)
+    return out
 
 
 def generate_explanations(user_input: Dict, prediction: Dict, knowledge: str = "") -> Dict:
@@ -106,56 +248,322 @@ def generate_explanations(user_input: Dict, prediction: Dict, knowledge: str = "
       "why_recommended": "..."
     }
     """
-    if genai is None:
+    client = _client()
+    if client is None:
         # No API key – graceful fallback
         return _fallback_explanations(user_input, prediction, knowledge)
 
-    tiers = prediction.get("all_tiers", {})
-    rec = prediction.get("recommended_tier", "")
+    user_prompt = _explanation_prompt(user_input, prediction, knowledge)
 
-    system_prompt = (
-        "You are a concise, trustworthy insurance advisor. "
-        "Generate short, plain-English explanations."
-    )
+    try:
+        usage: Dict = {}
+        parsed = _safe_json_parse(client.generate(user_prompt, system=SYSTEM_PROMPT, usage=usage))
+        # Basic validation
+        for k in EXPLANATION_KEYS:
+            if k not in parsed:
+                raise ValueError("Missing key in LLM JSON: " + k)
+        parsed["source"] = "llm"
+        parsed["tokens"] = _record_tokens(usage)
+        return parsed
+    except Exception:
+        # Robust fallback
+        return _fallback_explanations(user_input, prediction, knowledge)
 
-    user_prompt = f"""
-User profile (JSON):
-{json.dumps(user_input, ensure_ascii=False)}
 
-Predicted premiums (JSON):
-{json.dumps(tiers, ensure_ascii=False)}
+def generate_explanations_batch(items: List[Tuple[Dict, Dict]], knowledge: str = "") -> List[Dict]:
+    """
+    Explanations for several (user_input, prediction) pairs from ONE LLM call.
 
-Recommended tier: {rec}
+    The instructions are sent once and each policy is one compact JSON line,
+    keyed policy_1..policy_N; the reply is a JSON object with the same keys.
+    A policy whose entry is missing or incomplete gets _fallback_explanations.
+    """
+    if len(items) <= 1:
+        return [generate_explanations(u, p, knowledge) for u, p in items]
 
-Extra knowledge (may be empty and not guaranteed): 
-{knowledge}
+    client = _client()
+    if client is None:
+        return [_fallback_explanations(u, p, knowledge) for u, p in items]
 
-Instructions:
+    profiles = [compact_profile(user_input) for user_input, _ in items]
+    policies = "\n".join(
+        f"policy_{i}: " + _compact_json({
+            "profile": profile,
+            "premiums": prediction.get("all_tiers", {}),
+            "recommended_tier": prediction.get("recommended_tier", ""),
+        })
+        for i, (profile, (_, prediction)) in enumerate(zip(profiles, items), start=1)
+    )
+    user_prompt = f"""
+Policies to explain (one JSON object per line: user profile, predicted premiums, recommended tier):
+{policies}
+{_knowledge_section(fit_knowledge(knowledge, profiles))}
+Instructions, for EACH policy above:
 1) For each tier (Basic, Standard, Gold, Premium), write 2–4 sentences:
    - What the tier generally includes and who it suits.
-   - Mention its estimated premium from the JSON above.
+   - Mention its estimated premium from that policy's premiums.
 2) Add a field "why_recommended" explaining why the recommended tier fits this user better than the others.
-3) Return STRICT JSON with keys: "Basic", "Standard", "Gold", "Premium", "why_recommended".
+3) Return STRICT JSON: an object keyed "policy_1" … "policy_{len(items)}", each value an object
+   with keys "Basic", "Standard", "Gold", "Premium", "why_recommended".
 """
 
+    usage: Dict = {}
     try:
-        model = genai.GenerativeModel(
-            GEMINI_MODEL,
-            generation_config={"response_mime_type": "application/json"},
-            system_instruction=system_prompt,
-        )
-        resp = model.generate_content(user_prompt)
-        parsed = _safe_json_parse(getattr(resp, "text", "") or "")
-        # Basic validation
-        for k in ["Basic", "Standard", "Gold", "Premium", "why_recommended"]:
-            if k not in parsed:
-                raise ValueError("Missing key in LLM JSON: " + k)
-        return parsed
+        parsed = _safe_json_parse(client.generate(user_prompt, system=SYSTEM_PROMPT, usage=usage))
     except Exception:
-        # Robust fallback
-        return _fallback_explanations(user_input, prediction, knowledge)
+        parsed = {}
+    tokens = _record_tokens(usage, len(items)) if usage else None
+
+    out = []
+    for i, (user_input, prediction) in enumerate(items, start=1):
+        entry = parsed.get(f"policy_{i}") if isinstance(parsed, dict) else None
+        if isinstance(entry, dict) and all(k in entry for k in EXPLANATION_KEYS):
+            entry["source"] = "llm"
+            entry["tokens"] = tokens
+            out.append(entry)
+        else:
+            out.append(_fallback_explanations(user_input, prediction, knowledge))
+    return out
 
-# Backward compatibility alias
 # Backward compatibility alias
 def explain_recommendation(user_input: Dict, prediction: Dict, ranked_policies=None, rag_knowledge: str = "") -> Dict:
     return generate_explanations(user_input, prediction, rag_knowledge)
+
+
+# -----------------------------
+# Streaming explanations
+# -----------------------------
+class JsonFieldStream:
+    """
+    Incremental parser for the flat JSON object the model streams back.
+
+    feed() takes text as it arrives and returns the (key, value) pairs whose
+    top-level string value closed in that text. Anything before the first "{"
+    (e.g. a ```json fence) is skipped; nested or non-string values are ignored.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self._expect = "key"  # key -> colon -> value -> comma -> key ...
+        self._key: Optional[str] = None
+        self._chars: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        done = []
+        for ch in text:
+            if not self._started:
+                if ch == "{":
+                    self._started, self._depth = True, 1
+                continue
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        self._close_string(done)
+                    continue
+                self._chars.append(ch)
+            elif ch == '"':
+                self._in_str, self._chars = True, []
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and ch == ":":
+                self._expect = "value"
+            elif self._depth == 1 and ch == ",":
+                self._expect = "key"
+        return done
+
+    def _close_string(self, done: List[Tuple[str, str]]) -> None:
+        raw = "".join(self._chars)
+        try:
+            value = json.loads(f'"{raw}"')
+        except ValueError:
+            value = raw
+        if self._expect == "key":
+            self._key = value
+        elif self._expect == "value" and self._key is not None:
+            done.append((self._key, value))
+            self._key = None
+
+
+def stream_explanations(user_input: Dict, prediction: Dict, knowledge: str = "",
+                        enrich: Optional[bool] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (field, text) for Basic, Standard, Gold, Premium and why_recommended.
+
+    With LLM enrichment (see _wants_llm) each field is yielded as soon as its
+    JSON string is complete in the model's stream. Fields the model never
+    completes (error, timeout, open breaker, shed, no provider) are filled
+    from the templates at the end, so every key is yielded exactly once.
+    """
+    emitted = set()
+    client = _client() if _wants_llm(enrich) else None
+    if client is None:
+        _SHEDDER.record(0, 1)
+    elif _SHEDDER.acquire():
+        parser = JsonFieldStream()
+        usage: Dict = {}
+        try:
+            for delta in client.stream(_explanation_prompt(user_input, prediction, knowledge),
+                                       system=SYSTEM_PROMPT, usage=usage):
+                for key, value in parser.feed(delta):
+                    if key in EXPLANATION_KEYS and key not in emitted:
+                        emitted.add(key)
+                        yield key, value
+        except Exception as e:
+            print(f"⚠️  Explanation stream failed after {len(emitted)} fields: {e}")
+        finally:
+            _SHEDDER.release()
+            if usage:
+                _record_tokens(usage)
+            # Counted as LLM text if the model completed any field
+            _SHEDDER.record(int(bool(emitted)), int(not emitted))
+
+    if len(emitted) < len(EXPLANATION_KEYS):
+        fallback = _fallback_explanations(user_input, prediction, knowledge)
+        for key in EXPLANATION_KEYS:
+            if key not in emitted:
+                yield key, fallback[key]
+
+
+# -----------------------------
+# Load shedding
+# -----------------------------
+# Templates are the default explanation; LLM text is opt-in per request
+# (enrich=true) or for every request with EXPLAIN_ENRICH=1. Either way it is
+# skipped (shed) when this worker already has LLM_MAX_INFLIGHT enrichment
+# calls in flight, or when every provider's recent p95 latency is above
+# LLM_SHED_P95_MS (0 = no latency check), so a traffic spike or a slow
+# provider degrades to template text instead of growing the tail latency.
+EXPLAIN_ENRICH = os.getenv("EXPLAIN_ENRICH", "0") == "1"
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "8"))
+LLM_SHED_P95_MS = float(os.getenv("LLM_SHED_P95_MS", "0"))
+
+
+def _wants_llm(enrich: Optional[bool]) -> bool:
+    return EXPLAIN_ENRICH if enrich is None else bool(enrich)
+
+
+def will_enrich(enrich: Optional[bool]) -> bool:
+    """Whether a request with this enrich option will try the LLM (so RAG context is worth fetching)."""
+    return _wants_llm(enrich) and _client() is not None
+
+
+class LoadShedder:
+    """Admission control for LLM enrichment calls, with counters for /metrics/llm."""
+
+    def __init__(self, max_inflight: int = LLM_MAX_INFLIGHT, shed_p95_ms: float = LLM_SHED_P95_MS):
+        self.max_inflight = max_inflight
+        self.shed_p95_ms = shed_p95_ms
+        self._lock = threading.Lock()
+        self.inflight = 0
+        # Per explanation; shed_* are the template ones that wanted the LLM
+        self.counts = {"template": 0, "llm": 0, "shed_inflight": 0, "shed_latency": 0}
+
+    def _too_slow(self) -> bool:
+        router = _client()
+        if not self.shed_p95_ms or router is None:
+            return False
+        p95s = [p.get("p95_ms") for p in router.stats()["providers"].values()]
+        # No latency history yet for some provider -> let calls through to measure it
+        return all(v is not None and v > self.shed_p95_ms for v in p95s)
+
+    def acquire(self, items: int = 1) -> bool:
+        """True if an enrichment call for `items` explanations may start; release() it after."""
+        too_slow = self._too_slow()
+        with self._lock:
+            # While too slow, one call at a time still goes through to refresh the latencies
+            reason = "shed_latency" if too_slow and self.inflight > 0 else None
+            if reason is None and self.inflight >= self.max_inflight:
+                reason = "shed_inflight"
+            if reason is None:
+                self.inflight += 1
+                return True
+            self.counts[reason] += items
+            self.counts["template"] += items
+        return False
+
+    def release(self) -> None:
+        """The admitted call has finished (or been abandoned by its thread)."""
+        with self._lock:
+            self.inflight -= 1
+
+    def record(self, llm: int, template: int = 0) -> None:
+        """How many explanations came from the LLM vs templates."""
+        with self._lock:
+            self.counts["llm"] += llm
+            self.counts["template"] += template
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self.counts, "inflight": self.inflight, "max_inflight": self.max_inflight,
+                    "default_enrich": EXPLAIN_ENRICH}
+
+
+_SHEDDER = LoadShedder()
+
+
+# -----------------------------
+# Concurrent explanations
+# -----------------------------
+# Max LLM calls in flight per request, and how long one call may take before
+# its items fall back to the template text
+EXPLAIN_CONCURRENCY = int(os.getenv("EXPLAIN_CONCURRENCY", "5"))
+EXPLAIN_TIMEOUT = float(os.getenv("EXPLAIN_TIMEOUT", "15"))
+# Policies packed into one combined LLM call (1 = one call per policy)
+EXPLAIN_BATCH_SIZE = int(os.getenv("EXPLAIN_BATCH_SIZE", "5"))
+
+
+async def explain_many(items: List[Tuple[Dict, Dict]], rag_knowledge: str = "",
+                       concurrency: Optional[int] = None,
+                       timeout: Optional[float] = None,
+                       batch_size: Optional[int] = None,
+                       enrich: Optional[bool] = None) -> List[Dict]:
+    """
+    Explanations for (user_input, prediction) pairs, in input order.
+
+    Without enrichment (the default, see _wants_llm) these are the template
+    explanations, computed inline. With it, items are packed `batch_size` at a
+    time into combined calls (generate_explanations_batch); the blocking calls
+    run in worker threads, at most `concurrency` at a time, so N items cost
+    about one round-trip. Calls the LoadShedder turns away get templates.
+    """
+    if not items or not _wants_llm(enrich) or _client() is None:
+        _SHEDDER.record(0, len(items))
+        return [_fallback_explanations(u, p, rag_knowledge) for u, p in items]
+
+    sem = asyncio.Semaphore(concurrency or EXPLAIN_CONCURRENCY)
+    timeout = EXPLAIN_TIMEOUT if timeout is None else timeout
+    size = max(1, batch_size or EXPLAIN_BATCH_SIZE)
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+
+    def call(chunk: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        try:
+            return generate_explanations_batch(chunk, rag_knowledge)
+        finally:
+            # Held until the thread is done, even if the request stopped waiting
+            _SHEDDER.release()
+
+    async def one(chunk: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        async with sem:
+            if not _SHEDDER.acquire(len(chunk)):
+                return [_fallback_explanations(u, p, rag_knowledge) for u, p in chunk]
+            try:
+                out = await asyncio.wait_for(asyncio.to_thread(call, chunk), timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️  Explanation timed out after {timeout}s; using templates")
+                out = [_fallback_explanations(u, p, rag_knowledge) for u, p in chunk]
+            llm = sum(e.get("source") == "llm" for e in out)
+            _SHEDDER.record(llm, len(out) - llm)
+            return out
+
+    results = await asyncio.gather(*(one(c) for c in chunks))
+    return [r for chunk in results for r in chunk]
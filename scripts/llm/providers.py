@@ -0,0 +1,638 @@
+# scripts/llm/providers.py
+"""
+LLM providers behind one interface, with per-provider metrics and routing.
+
+    gemini   Gemini REST API (generateContent / streamGenerateContent)
+    openai   any OpenAI-compatible /chat/completions endpoint (OpenAI, vLLM,
+             llama.cpp server, Ollama, ...)
+    local    a small instruction model run on this box's CPU with transformers
+
+Every provider exposes generate(prompt, system) -> text and stream(...) -> text
+deltas, raises LLMUnavailable on failure, and sits behind its own circuit
+breaker: after LLM_BREAKER_FAILURES failed calls in a row it rejects calls
+immediately for LLM_BREAKER_COOLDOWN seconds, then lets one trial call through.
+
+HTTP providers keep one pooled keep-alive httpx client each, with a deadline
+per call covering every retry (LLM_DEADLINE) and bounded exponential backoff
+with jitter on timeouts, connection errors, 429 and 5xx (LLM_MAX_RETRIES).
+
+LLM_PROVIDERS lists the providers to use, in preference order (default:
+gemini when GEMINI_API_KEY is set). LLM_ROUTING=ordered tries them in that
+order and fails over; LLM_ROUTING=fastest tries the one with the lowest recent
+median latency first. Calls, failures, latency percentiles, tokens and
+estimated cost (LLM_COSTS, USD per 1M input/output tokens) are reported per
+provider by LLMRouter.stats().
+
+For tests, point GEMINI_API_BASE / OPENAI_BASE_URL at the local stub:
+
+    python -m scripts.llm.stub_llm --port 8089
+    LLM_PROVIDERS=openai,gemini GEMINI_API_KEY=stub GEMINI_API_BASE=http://127.0.0.1:8089 \
+        OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn scripts.api.serve:app
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+# Some OpenAI-compatible servers reject response_format; OPENAI_JSON_MODE=0 drops it
+OPENAI_JSON_MODE = os.getenv("OPENAI_JSON_MODE", "1") == "1"
+
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+LOCAL_LLM_THREADS = int(os.getenv("LOCAL_LLM_THREADS", "4"))
+LOCAL_LLM_MAX_NEW_TOKENS = int(os.getenv("LOCAL_LLM_MAX_NEW_TOKENS", "512"))
+
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "")
+LLM_ROUTING = os.getenv("LLM_ROUTING", "ordered")
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "12"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.25"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "2"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# USD per 1M (input, output) tokens, for the cost estimate in stats()
+DEFAULT_COSTS = {"gemini": (0.075, 0.30), "openai": (0.15, 0.60), "local": (0.0, 0.0)}
+LLM_COSTS = {**DEFAULT_COSTS, **{k: tuple(v) for k, v in json.loads(os.getenv("LLM_COSTS", "{}")).items()}}
+
+
+class LLMUnavailable(RuntimeError):
+    """The call failed, timed out, or was rejected by an open circuit breaker.
+
+    upstream_fault=False marks failures that say nothing about the provider's
+    health (a 4xx for our request, an unusable 200) and don't trip the breaker.
+    """
+
+    def __init__(self, message: str, upstream_fault: bool = True):
+        super().__init__(message)
+        self.upstream_fault = upstream_fault
+
+
+class _Retry(Exception):
+    """Transient failure; retried while the deadline allows."""
+
+
+# -----------------------------
+# Circuit breaker + metrics
+# -----------------------------
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive failures -> half-open after `cooldown`."""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True  # one trial call while half-open
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if ok:
+                self._consecutive = 0
+                self._opened_at = None
+                return
+            self._consecutive += 1
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+class ProviderMetrics:
+    """Thread-safe counters plus a window of recent successful-call latencies."""
+
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "ok": 0, "failed": 0, "rejected": 0, "retries": 0,
+                       "tokens_in": 0, "tokens_out": 0}
+        self.latencies = deque(maxlen=window)
+
+    def count(self, **inc) -> None:
+        with self._lock:
+            for k, v in inc.items():
+                self.counts[k] += v
+
+    def record(self, ok: bool, seconds: float, tokens_in: int = 0, tokens_out: int = 0) -> None:
+        with self._lock:
+            self.counts["ok" if ok else "failed"] += 1
+            self.counts["tokens_in"] += tokens_in
+            self.counts["tokens_out"] += tokens_out
+            if ok:
+                self.latencies.append(seconds)
+
+    def p50(self) -> Optional[float]:
+        with self._lock:
+            return statistics.median(self.latencies) if self.latencies else None
+
+    def snapshot(self, cost: Tuple[float, float]) -> Dict:
+        with self._lock:
+            out = dict(self.counts)
+            lat = sorted(self.latencies)
+        if lat:
+            out["p50_ms"] = round(lat[len(lat) // 2] * 1000, 1)
+            out["p95_ms"] = round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 1)
+        out["cost_usd"] = round((out["tokens_in"] * cost[0] + out["tokens_out"] * cost[1]) / 1e6, 6)
+        return out
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for providers that don't report usage."""
+    return max(1, len(text) // 4)
+
+
+# -----------------------------
+# Provider interface
+# -----------------------------
+class LLMProvider:
+    """generate()/stream() with admission control and accounting; subclasses implement _generate/_stream."""
+
+    name = "base"
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None):
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = ProviderMetrics()
+
+    # ---- subclass hooks
+    def _generate(self, prompt: str, system: Optional[str], json_mode: bool,
+                  deadline: float) -> Tuple[str, Dict[str, int]]:
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, system: Optional[str], json_mode: bool,
+                deadline: float, usage: Dict[str, int]) -> Iterator[str]:
+        text, u = self._generate(prompt, system, json_mode, deadline)
+        usage.update(u)
+        yield text
+
+    # ---- public API
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self.metrics.count(rejected=1)
+            raise LLMUnavailable(f"{self.name}: circuit breaker open")
+        self.metrics.count(calls=1)
+
+    def _finish(self, t0: float, ok: bool, prompt: str, text: str, usage: Dict[str, int],
+                upstream_fault: bool = True) -> Dict[str, int]:
+        self.breaker.record(ok or not upstream_fault)
+        # Providers that don't report usage are estimated; calls that produced
+        # nothing aren't billed
+        billed = ok or bool(text)
+        tokens = {"in": usage.get("in") or (estimate_tokens(prompt) if billed else 0),
+                  "out": usage.get("out") or (estimate_tokens(text) if text else 0)}
+        self.metrics.record(ok, time.monotonic() - t0, tokens["in"], tokens["out"])
+        return tokens
+
+    def generate(self, prompt: str, system: Optional[str] = None, json_mode: bool = True,
+                 deadline: Optional[float] = None, usage: Optional[Dict] = None) -> str:
+        """Full completion text. Raises LLMUnavailable on failure.
+
+        usage, if given, receives {"in", "out"} token counts of the call.
+        """
+        self._admit()
+        t0 = time.monotonic()
+        full_prompt = (system or "") + prompt
+        try:
+            text, reported = self._generate(prompt, system, json_mode, deadline or LLM_DEADLINE)
+        except LLMUnavailable as e:
+            self._finish(t0, False, full_prompt, "", {}, e.upstream_fault)
+            raise
+        except Exception as e:
+            self._finish(t0, False, full_prompt, "", {})
+            raise LLMUnavailable(f"{self.name}: {type(e).__name__}: {e}") from e
+        tokens = self._finish(t0, True, full_prompt, text, reported)
+        if usage is not None:
+            usage.update(tokens, provider=self.name)
+        return text
+
+    def stream(self, prompt: str, system: Optional[str] = None, json_mode: bool = True,
+               deadline: Optional[float] = None, usage: Optional[Dict] = None) -> Iterator[str]:
+        """Text deltas as they are produced. Raises LLMUnavailable (possibly after some deltas).
+
+        usage, if given, receives {"in", "out"} token counts once the stream ends.
+        """
+        self._admit()
+        t0 = time.monotonic()
+        full_prompt = (system or "") + prompt
+        reported: Dict[str, int] = {}
+        parts: List[str] = []
+
+        def finish(ok: bool, upstream_fault: bool = True) -> None:
+            tokens = self._finish(t0, ok, full_prompt, "".join(parts), reported, upstream_fault)
+            if usage is not None:
+                usage.update(tokens, provider=self.name)
+
+        try:
+            for delta in self._stream(prompt, system, json_mode, deadline or LLM_DEADLINE, reported):
+                parts.append(delta)
+                yield delta
+        except GeneratorExit:
+            # Consumer stopped reading; the provider itself was fine
+            finish(True)
+            raise
+        except LLMUnavailable as e:
+            finish(False, e.upstream_fault)
+            raise
+        except Exception as e:
+            finish(False)
+            raise LLMUnavailable(f"{self.name}: {type(e).__name__}: {e}") from e
+        finish(True)
+
+    def stats(self) -> Dict:
+        out = self.metrics.snapshot(LLM_COSTS.get(self.name, (0.0, 0.0)))
+        out["breaker"] = self.breaker.state
+        return out
+
+
+# -----------------------------
+# HTTP providers
+# -----------------------------
+class HTTPProvider(LLMProvider):
+    """Pooled keep-alive httpx client, deadline, retries with backoff; thread-safe."""
+
+    def __init__(self, base_url: str, headers: Dict[str, str], pool_size: int = LLM_POOL_SIZE,
+                 max_retries: int = LLM_MAX_RETRIES, backoff: float = LLM_BACKOFF,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(breaker)
+        import httpx  # imported on first use, like the other heavy clients
+
+        self._httpx = httpx
+        self._http = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    # ---- subclass hooks
+    def _request(self, prompt: str, system: Optional[str], json_mode: bool,
+                 stream: bool) -> Tuple[str, Dict, Dict]:
+        """(path, query params, JSON body)"""
+        raise NotImplementedError
+
+    def _parse(self, data: Dict) -> Tuple[str, Dict[str, int]]:
+        raise NotImplementedError
+
+    def _parse_event(self, data: Dict) -> Tuple[str, Dict[str, int]]:
+        raise NotImplementedError
+
+    # ---- transport
+    def _with_retries(self, deadline: float, call: Callable[[float], object]):
+        """call(remaining_seconds), retried on _Retry with jittered exponential backoff."""
+        end = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                raise LLMUnavailable(f"{self.name}: deadline exceeded")
+            try:
+                return call(remaining)
+            except _Retry as e:
+                error = str(e)
+            attempt += 1
+            remaining = end - time.monotonic()
+            if attempt > self.max_retries or remaining <= 0:
+                raise LLMUnavailable(f"{self.name}: {error}")
+            self.metrics.count(retries=1)
+            delay = min(self.backoff * 2 ** (attempt - 1), LLM_BACKOFF_MAX)
+            time.sleep(min(delay * random.uniform(0.5, 1.0), remaining))
+
+    def _check(self, resp) -> None:
+        if resp.status_code == 429 or resp.status_code >= 500:
+            resp.close()
+            raise _Retry(f"HTTP {resp.status_code}")
+        if resp.status_code >= 400:
+            # Our request is wrong; upstream is healthy, so don't trip the breaker
+            detail = resp.read()[:200].decode(errors="replace")
+            resp.close()
+            raise LLMUnavailable(f"{self.name}: HTTP {resp.status_code}: {detail}", upstream_fault=False)
+
+    def _generate(self, prompt, system, json_mode, deadline):
+        path, params, body = self._request(prompt, system, json_mode, stream=False)
+
+        def call(remaining: float):
+            try:
+                resp = self._http.post(path, params=params, json=body, timeout=remaining)
+            except self._httpx.TransportError as e:  # connect/read timeouts included
+                raise _Retry(f"{type(e).__name__}: {e}") from e
+            self._check(resp)
+            try:
+                return self._parse(resp.json())
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                # 200 with no usable answer (e.g. blocked by safety filters)
+                raise LLMUnavailable(f"{self.name}: malformed response: {e}", upstream_fault=False) from e
+
+        return self._with_retries(deadline, call)
+
+    def _stream(self, prompt, system, json_mode, deadline, usage):
+        """Server-sent events; retries only happen before the first byte."""
+        path, params, body = self._request(prompt, system, json_mode, stream=True)
+        end = time.monotonic() + deadline
+
+        def open_stream(remaining: float):
+            req = self._http.build_request("POST", path, params=params, json=body, timeout=remaining)
+            try:
+                resp = self._http.send(req, stream=True)
+            except self._httpx.TransportError as e:
+                raise _Retry(f"{type(e).__name__}: {e}") from e
+            self._check(resp)
+            return resp
+
+        resp = self._with_retries(deadline, open_stream)
+        try:
+            for line in resp.iter_lines():
+                if time.monotonic() > end:
+                    raise LLMUnavailable(f"{self.name}: deadline exceeded mid-stream")
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                delta, u = self._parse_event(json.loads(payload))
+                usage.update(u)
+                if delta:
+                    yield delta
+        except (self._httpx.TransportError, KeyError, IndexError, ValueError) as e:
+            raise LLMUnavailable(f"{self.name}: stream broken: {type(e).__name__}: {e}") from e
+        finally:
+            resp.close()
+
+    def close(self) -> None:
+        self._http.close()
+
+
+class GeminiProvider(HTTPProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = GEMINI_MODEL, base_url: str = GEMINI_API_BASE, **kwargs):
+        super().__init__(base_url, {"x-goog-api-key": api_key}, **kwargs)
+        self.model = model
+
+    def _request(self, prompt, system, json_mode, stream):
+        body: Dict = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if system:
+            body["systemInstruction"] = {"parts": [{"text": system}]}
+        if json_mode:
+            body["generationConfig"] = {"responseMimeType": "application/json"}
+        method = "streamGenerateContent" if stream else "generateContent"
+        return f"/v1beta/models/{self.model}:{method}", ({"alt": "sse"} if stream else {}), body
+
+    @staticmethod
+    def _usage(data: Dict) -> Dict[str, int]:
+        meta = data.get("usageMetadata") or {}
+        return {"in": meta.get("promptTokenCount", 0), "out": meta.get("candidatesTokenCount", 0)}
+
+    def _parse(self, data):
+        parts = data["candidates"][0]["content"]["parts"]
+        return "".join(p.get("text", "") for p in parts), self._usage(data)
+
+    def _parse_event(self, data):
+        candidates = data.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(p.get("text", "") for p in parts), self._usage(data)
+
+
+class OpenAICompatProvider(HTTPProvider):
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model: str = OPENAI_MODEL,
+                 base_url: str = OPENAI_BASE_URL, json_mode: bool = OPENAI_JSON_MODE, **kwargs):
+        super().__init__(base_url, {"Authorization": f"Bearer {api_key}"} if api_key else {}, **kwargs)
+        self.model = model
+        self.json_mode = json_mode
+
+    def _request(self, prompt, system, json_mode, stream):
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        body: Dict = {"model": self.model, "messages": messages}
+        if json_mode and self.json_mode:
+            body["response_format"] = {"type": "json_object"}
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return "/chat/completions", {}, body
+
+    @staticmethod
+    def _usage(data: Dict) -> Dict[str, int]:
+        usage = data.get("usage") or {}
+        return {"in": usage.get("prompt_tokens", 0), "out": usage.get("completion_tokens", 0)}
+
+    def _parse(self, data):
+        return data["choices"][0]["message"]["content"] or "", self._usage(data)
+
+    def _parse_event(self, data):
+        choices = data.get("choices") or []
+        delta = (choices[0].get("delta") or {}).get("content") or "" if choices else ""
+        return delta, self._usage(data)
+
+
+# -----------------------------
+# Local CPU provider
+# -----------------------------
+class LocalProvider(LLMProvider):
+    """
+    Small instruction-tuned causal LM on CPU (transformers + torch, loaded on
+    first use). Greedy decoding, one generation at a time per process, so
+    latency depends only on prompt and output length -- no network, no quota.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name: str = LOCAL_LLM_MODEL, threads: int = LOCAL_LLM_THREADS,
+                 max_new_tokens: int = LOCAL_LLM_MAX_NEW_TOKENS, breaker: Optional[CircuitBreaker] = None):
+        super().__init__(breaker)
+        self.model_name = model_name
+        self.threads = threads
+        self.max_new_tokens = max_new_tokens
+        self._model = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+        self._gen_lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    import torch
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+                    torch.set_num_threads(self.threads)
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    model = AutoModelForCausalLM.from_pretrained(self.model_name, torch_dtype=torch.float32)
+                    self._model = model.eval()
+        return self._tokenizer, self._model
+
+    def _inputs(self, prompt: str, system: Optional[str]):
+        tokenizer, _ = self._load()
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        return tokenizer.apply_chat_template(messages, add_generation_prompt=True, return_tensors="pt")
+
+    def _gen_kwargs(self, deadline: float) -> Dict:
+        tokenizer, _ = self._load()
+        return {"max_new_tokens": self.max_new_tokens, "do_sample": False, "max_time": deadline,
+                "pad_token_id": tokenizer.pad_token_id or tokenizer.eos_token_id}
+
+    def _generate(self, prompt, system, json_mode, deadline):
+        import torch
+
+        tokenizer, model = self._load()
+        ids = self._inputs(prompt, system)
+        with self._gen_lock, torch.inference_mode():
+            out = model.generate(ids, **self._gen_kwargs(deadline))
+        new = out[0, ids.shape[1]:]
+        return tokenizer.decode(new, skip_special_tokens=True), {"in": int(ids.shape[1]), "out": int(len(new))}
+
+    def _stream(self, prompt, system, json_mode, deadline, usage):
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        tokenizer, model = self._load()
+        ids = self._inputs(prompt, system)
+        # timeout bounds each wait for the next delta, so a stalled generate can't hang the consumer
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                        timeout=deadline)
+        stop = threading.Event()
+        failure: List[BaseException] = []
+
+        class _Stop(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full((input_ids.shape[0],), stop.is_set(), dtype=torch.bool)
+
+        def run():
+            try:
+                with self._gen_lock, torch.inference_mode():
+                    if stop.is_set():  # consumer left while we waited for the lock
+                        return
+                    model.generate(ids, streamer=streamer,
+                                   stopping_criteria=StoppingCriteriaList([_Stop()]),
+                                   **self._gen_kwargs(deadline))
+            except BaseException as e:  # re-raised in the consumer below
+                failure.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        parts = []
+        try:
+            for delta in streamer:
+                parts.append(delta)
+                yield delta
+        finally:
+            # Consumer gone (GeneratorExit), timed out or done: stop generating and free _gen_lock
+            stop.set()
+            worker.join()
+        if failure:
+            raise failure[0]
+        usage.update({"in": int(ids.shape[1]), "out": len(tokenizer.encode("".join(parts)))})
+
+
+# -----------------------------
+# Routing
+# -----------------------------
+class LLMRouter:
+    """Tries providers in preference order (or fastest first) and fails over on LLMUnavailable."""
+
+    def __init__(self, providers: List[LLMProvider], routing: str = LLM_ROUTING):
+        self.providers = providers
+        self.routing = routing
+
+    def _order(self) -> List[LLMProvider]:
+        if self.routing != "fastest":
+            return list(self.providers)
+        # Providers without latency data yet go first so they get measured
+        return sorted(self.providers, key=lambda p: p.metrics.p50() or 0.0)
+
+    def generate(self, prompt: str, system: Optional[str] = None, json_mode: bool = True,
+                 deadline: Optional[float] = None, usage: Optional[Dict] = None) -> str:
+        errors = []
+        for provider in self._order():
+            try:
+                return provider.generate(prompt, system, json_mode, deadline, usage)
+            except LLMUnavailable as e:
+                errors.append(str(e))
+        raise LLMUnavailable("; ".join(errors) or "no LLM providers")
+
+    def stream(self, prompt: str, system: Optional[str] = None, json_mode: bool = True,
+               deadline: Optional[float] = None, usage: Optional[Dict] = None) -> Iterator[str]:
+        """Fails over to the next provider only if nothing was streamed yet."""
+        errors = []
+        for provider in self._order():
+            started = False
+            try:
+                for delta in provider.stream(prompt, system, json_mode, deadline, usage):
+                    started = True
+                    yield delta
+                return
+            except LLMUnavailable as e:
+                if started:
+                    raise
+                errors.append(str(e))
+        raise LLMUnavailable("; ".join(errors) or "no LLM providers")
+
+    def stats(self) -> Dict:
+        return {"routing": self.routing, "providers": {p.name: p.stats() for p in self.providers}}
+
+
+def build_provider(name: str) -> Optional[LLMProvider]:
+    """Provider from its env configuration, or None if it isn't configured."""
+    name = name.strip().lower()
+    if name == "gemini":
+        return GeminiProvider(GEMINI_API_KEY) if GEMINI_API_KEY else None
+    if name == "openai":
+        custom_base = OPENAI_BASE_URL != "https://api.openai.com/v1"
+        return OpenAICompatProvider(OPENAI_API_KEY) if OPENAI_API_KEY or custom_base else None
+    if name == "local":
+        return LocalProvider()
+    raise ValueError(f"Unknown LLM provider: {name} (expected gemini | openai | local)")
+
+
+_ROUTER: Optional[LLMRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> Optional[LLMRouter]:
+    """Process-wide router over the configured providers; None if none is configured."""
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                names = [n for n in LLM_PROVIDERS.split(",") if n.strip()] or ["gemini"]
+                providers = []
+                for n in names:
+                    provider = build_provider(n)
+                    if provider is None:
+                        if LLM_PROVIDERS:
+                            print(f"⚠️  LLM provider '{n.strip()}' is not configured; skipping it")
+                    else:
+                        providers.append(provider)
+                _ROUTER = LLMRouter(providers)
+    return _ROUTER if _ROUTER.providers else None
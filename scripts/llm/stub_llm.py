@@ -0,0 +1,168 @@
+# scripts/llm/stub_llm.py
+"""
+Local stand-in for the LLM HTTP providers, for load and failure tests.
+
+Answers Gemini's POST /v1beta/models/<model>:generateContent (and
+:streamGenerateContent) and OpenAI-style POST /v1/chat/completions, plain or
+as SSE chunks, with explanation JSON in the shape llm_client asks for (keyed
+policy_1..N for combined prompts), after an optional delay, and can inject
+503s or hangs to exercise retries, deadlines and the circuit breaker.
+
+    python -m scripts.llm.stub_llm --port 8089 --latency 0.4 --fail-rate 0.1
+    GEMINI_API_KEY=stub GEMINI_API_BASE=http://127.0.0.1:8089 python app.py
+    LLM_PROVIDERS=openai OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python app.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+TIERS = ["Basic", "Standard", "Gold", "Premium"]
+
+
+def _explanation(label: str) -> Dict[str, str]:
+    out = {t: f"[stub] {t} explanation for {label}." for t in TIERS}
+    out["why_recommended"] = f"[stub] Why the recommended tier fits {label}."
+    return out
+
+
+def fake_reply(prompt: str) -> str:
+    """JSON text mimicking the model's answer to a llm_client prompt."""
+    keys = re.findall(r"^(policy_\d+): ", prompt, flags=re.M)
+    if keys:
+        return json.dumps({k: _explanation(k) for k in keys})
+    return json.dumps(_explanation("this user"))
+
+
+class StubState:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, fail_rate: float = 0.0,
+                 hang_rate: float = 0.0, hang_seconds: float = 30.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so client connection reuse is visible
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def _send(self, code: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # GET /stats: request and TCP connection counts
+            with state.lock:
+                self._send(200, {"requests": state.requests, "connections": state.connections})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with state.lock:
+                state.requests += 1
+            path = self.path.split("?")[0]
+            openai = path.endswith("/chat/completions")
+            streaming = body.get("stream", False) if openai else path.endswith(":streamGenerateContent")
+            if not (openai or streaming or path.endswith(":generateContent")):
+                return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            roll = random.random()
+            if roll < state.hang_rate:
+                time.sleep(state.hang_seconds)
+            elif roll < state.hang_rate + state.fail_rate:
+                return self._send(503, {"error": {"code": 503, "message": "stub overloaded"}})
+            latency = max(0.0, state.latency + random.uniform(-state.jitter, state.jitter))
+
+            if openai:
+                prompt = "".join(m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user")
+            else:
+                prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+            reply = fake_reply(prompt)
+            usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4}
+            if streaming:
+                return self._stream(reply, latency, openai, usage)
+            time.sleep(latency)
+            if openai:
+                return self._send(200, {"choices": [{"message": {"role": "assistant", "content": reply}}],
+                                        "usage": usage})
+            self._send(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": reply}]}}],
+                             "usageMetadata": {"promptTokenCount": usage["prompt_tokens"],
+                                               "candidatesTokenCount": usage["completion_tokens"]}})
+
+        def _event(self, payload: str) -> None:
+            data = f"data: {payload}\r\n\r\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _stream(self, reply: str, latency: float, openai: bool, usage: Dict,
+                    n_chunks: int = 20) -> None:
+            """SSE chunks spread evenly over `latency`, like tokens arriving from the model."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            size = max(1, -(-len(reply) // n_chunks))
+            for i in range(0, len(reply), size):
+                time.sleep(latency / n_chunks)
+                chunk = reply[i:i + size]
+                if openai:
+                    self._event(json.dumps({"choices": [{"delta": {"content": chunk}}]}))
+                else:
+                    self._event(json.dumps({"candidates": [{"content": {"role": "model",
+                                                                        "parts": [{"text": chunk}]}}]}))
+            if openai:
+                self._event(json.dumps({"choices": [], "usage": usage}))
+                self._event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, fmt, *args):  # quiet
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8089, **kwargs) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; returns the server (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(StubState(**kwargs)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini / OpenAI-compatible LLM stub")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds added to latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of 503 replies")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    server = serve(args.port, latency=args.latency, jitter=args.jitter, fail_rate=args.fail_rate,
+                   hang_rate=args.hang_rate, hang_seconds=args.hang_seconds)
+    print(f"🧪 LLM stub on http://127.0.0.1:{args.port} "
+          f"(latency {args.latency}s, 503 rate {args.fail_rate}, hang rate {args.hang_rate})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
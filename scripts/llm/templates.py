@@ -0,0 +1,102 @@
+# scripts/llm/templates.py
+"""
+Deterministic explanations built from the prediction alone: tier premiums,
+classifier confidence, and the underwriting rule that matched the profile
+(prediction["rule"], from rule_table.explain_rule).
+
+This is the primary, sub-millisecond path for /recommend explanations; LLM
+text is an optional enrichment on top (see llm_client.explain_many).
+Output has the same keys as the LLM's: Basic, Standard, Gold, Premium,
+why_recommended.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+TIERS = ["Basic", "Standard", "Gold", "Premium"]
+
+TIER_SUMMARY = {
+    "Basic": "Basic offers essential coverage at an affordable price.",
+    "Standard": "Standard enhances the essentials with a few valuable extras.",
+    "Gold": "Gold adds higher limits and more comprehensive protections.",
+    "Premium": "Premium provides the most complete protection and highest limits.",
+}
+
+TIER_SUITS = {
+    "Basic": "It suits low-risk profiles who want cover at the lowest cost.",
+    "Standard": "It suits most people looking for balanced cover and price.",
+    "Gold": "It suits higher-risk profiles or anyone wanting extra headroom on claims.",
+    "Premium": "It suits high sums insured, high-value assets or the highest-risk profiles.",
+}
+
+# Below this gap between the top two classifier probabilities, call the runner-up close
+CLOSE_MARGIN = 0.15
+
+
+def _money(value) -> str:
+    try:
+        return f"{float(value):,.2f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _tier_text(tier: str, tiers: Dict, recommended: str) -> str:
+    premium = tiers.get(tier)
+    parts = [TIER_SUMMARY[tier], TIER_SUITS[tier]]
+    if premium is not None:
+        line = f"Estimated premium: {_money(premium)}"
+        idx = TIERS.index(tier)
+        below = tiers.get(TIERS[idx - 1]) if idx > 0 else None
+        if isinstance(premium, (int, float)) and isinstance(below, (int, float)):
+            line += f" ({_money(premium - below)} more than {TIERS[idx - 1]})"
+        parts.append(line + ".")
+    if tier == recommended:
+        parts.append("This is the tier we recommend for you.")
+    return " ".join(parts)
+
+
+def _ranked(confidence: Dict[str, float]) -> List:
+    return sorted(confidence.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def _why(user_input: Dict, prediction: Dict, knowledge: str) -> str:
+    rec = prediction.get("recommended_tier", "")
+    rule: Optional[Dict] = prediction.get("rule")
+    ranked = _ranked(prediction.get("confidence") or {})
+    sentences = []
+
+    if prediction.get("decided_by") == "rule" and rule:
+        sentences.append(f"We recommend **{rec}** because our underwriting rules place this profile "
+                         f"there: {rule['reason']}.")
+    else:
+        lead = f"We recommend **{rec}**"
+        if ranked and ranked[0][0] == rec:
+            lead += f": our pricing model rates it the best fit with {ranked[0][1]:.0%} confidence"
+        sentences.append(lead + ", based on your profile (age, dependents, sum assured and other inputs).")
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < CLOSE_MARGIN:
+            sentences.append(f"{ranked[1][0]} was a close second ({ranked[1][1]:.0%}), "
+                             f"so it is worth comparing the two.")
+        if rule and rule["tier"] == rec:
+            sentences.append(f"This agrees with our underwriting rules, based on {rule['reason']}.")
+        elif rule:
+            sentences.append(f"Our underwriting rules alone would suggest {rule['tier']}, based on "
+                             f"{rule['reason']}; the model weighs more of your details.")
+
+    if rule and rule.get("factors"):
+        sentences.append("Factors that raised your risk: " + ", ".join(rule["factors"]) + ".")
+
+    tiers = prediction.get("all_tiers", {})
+    if rec in tiers:
+        sentences.append(f"It balances cost vs. coverage at an estimated {_money(tiers[rec])}.")
+    if knowledge:
+        sentences.append("We also considered relevant guidelines and industry details from our knowledge base.")
+    return " ".join(sentences)
+
+
+def template_explanations(user_input: Dict, prediction: Dict, knowledge: str = "") -> Dict:
+    """Explanations for every tier plus why_recommended, without calling an LLM."""
+    tiers = prediction.get("all_tiers", {})
+    rec = prediction.get("recommended_tier", "")
+    out = {tier: _tier_text(tier, tiers, rec) for tier in TIERS}
+    out["why_recommended"] = _why(user_input, prediction, knowledge)
+    return out
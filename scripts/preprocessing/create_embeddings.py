@@ -9,6 +9,7 @@ from pathlib import Path
 
 # Local import for text cleaning
 from clean_text import clean_policy_text
+from embedding_cache import CachedEmbeddings
 
 from langchain_community.document_loaders import PyMuPDFLoader as PDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -24,7 +25,13 @@ PDF_DIR = Path("data/pdf")
 VECTORSTORE_DIR = Path("vectorstore")  # root folder that will contain chroma_india / chroma_australia
 VECTORSTORE_DIR.mkdir(exist_ok=True)
 
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Cached wrapper: unchanged chunks are read from disk instead of re-embedded
+embeddings = CachedEmbeddings(
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+)
 
 
 def process_pdfs(country: str) -> None:
@@ -107,6 +114,7 @@ def process_pdfs(country: str) -> None:
         stats = db.get()
         print(f"\n💾 Persisted to {db_path}")
         print(f"📦 Collection now contains {len(stats['ids'])} documents")
+        print(f"⚡ Embedding cache: {embeddings.stats()}")
 
     except Exception as e:
         print(f"❌ Error while persisting to Chroma: {e}")
@@ -0,0 +1,115 @@
+# scripts/preprocessing/embedding_cache.py
+# ============================
+# Persistent embedding cache (SQLite blob store)
+# ============================
+
+from __future__ import annotations
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+CACHE_PATH = Path("vectorstore") / "embedding_cache.sqlite"
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model with an on-disk cache keyed by
+    (model_name, sha256(chunk_text)). Vectors are stored as float32 blobs,
+    so unchanged chunks are read from disk instead of re-running the model.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, cache_path: Path = CACHE_PATH):
+        self.base = base
+        self.model_name = model_name
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.cache_path))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,
+                PRIMARY KEY (model, sha256)
+            )
+            """
+        )
+        self._conn.commit()
+
+    # --------------------
+    # Cache I/O
+    # --------------------
+    def _lookup(self, keys: List[str]) -> dict:
+        found = {}
+        # SQLite caps bound parameters, so query in slices
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            marks = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT sha256, vec FROM embeddings WHERE model = ? AND sha256 IN ({marks})",
+                [self.model_name, *part],
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, keys: List[str], vectors: List[List[float]]) -> None:
+        rows = []
+        for key, vec in zip(keys, vectors):
+            arr = np.asarray(vec, dtype=np.float32)
+            rows.append((self.model_name, key, int(arr.shape[0]), arr.tobytes()))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, sha256, dim, vec) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+
+    # --------------------
+    # Embeddings interface
+    # --------------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [_text_key(t) for t in texts]
+        cached = self._lookup(list(set(keys)))
+
+        # Only embed texts we have never seen (dedupe identical chunks too)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        hit_count = sum(1 for k in keys if k in cached)
+        self.hits += hit_count
+        self.misses += len(keys) - hit_count
+
+        if missing:
+            new_keys = list(missing.keys())
+            new_vecs = self.base.embed_documents(list(missing.values()))
+            self._store(new_keys, new_vecs)
+            cached.update(zip(new_keys, new_vecs))
+
+        return [list(cached[k]) for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries are one-off; no point caching them
+        return self.base.embed_query(text)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"{self.hits}/{total} chunks served from cache ({rate:.1f}%)"
+
+    def close(self) -> None:
+        self._conn.close()
@@ -2,35 +2,282 @@
 from __future__ import annotations
 from langdetect import detect, DetectorFactory
 from unidecode import unidecode
-from transformers import MarianMTModel, MarianTokenizer
-import torch
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+import os
+import queue
 import re
+import threading
+import time
+
+# torch / transformers are imported when the first translator is loaded,
+# so importing this module (e.g. for detect_language) stays cheap.
 
 DetectorFactory.seed = 0
 
-MODEL_CACHE = {}
+# ---- Translation tuning (CPU)
+# Intra-op threads for torch; more than the physical cores just adds contention
+TRANSLATE_THREADS = int(os.getenv("TRANSLATE_THREADS", str(min(4, os.cpu_count() or 1))))
+# 1 = greedy decoding: several times faster than beam search, near-identical for short chat turns
+TRANSLATE_NUM_BEAMS = int(os.getenv("TRANSLATE_NUM_BEAMS", "1"))
+TRANSLATE_MAX_NEW_TOKENS = int(os.getenv("TRANSLATE_MAX_NEW_TOKENS", "256"))
+# Concurrent requests for the same language pair are translated together:
+# up to TRANSLATE_BATCH_SIZE texts, collected for at most TRANSLATE_BATCH_WAIT_MS
+TRANSLATE_BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "16"))
+TRANSLATE_BATCH_WAIT_MS = float(os.getenv("TRANSLATE_BATCH_WAIT_MS", "10"))
+# Repeated phrases (greetings, menu answers, canned replies) are memoized
+TRANSLATE_CACHE_SIZE = int(os.getenv("TRANSLATE_CACHE_SIZE", "4096"))
+
+# ---- Translator models: size-aware LRU
+# Each opus-mt model is ~300 MB in fp32. Loaded models are kept until their
+# total size passes TRANSLATOR_CACHE_MB, then the least recently used go
+# (pairs preloaded with preload_translators() are never evicted).
+TRANSLATOR_CACHE_MB = float(os.getenv("TRANSLATOR_CACHE_MB", "1024"))
+# Pairs loaded by preload_translators(), "src-tgt" comma separated
+TRANSLATOR_PRELOAD = os.getenv("TRANSLATOR_PRELOAD", "hi-en,en-hi")
+# 1 = int8 dynamic quantization of the Linear layers: ~3x smaller and
+# faster on CPU, with a small quality cost
+TRANSLATOR_QUANTIZE = os.getenv("TRANSLATOR_QUANTIZE", "0") == "1"
+
+MODEL_CACHE: "OrderedDict[str, Tuple[object, object]]" = OrderedDict()
+_MODEL_BYTES: Dict[str, int] = {}
+_PINNED = set()
+_MODEL_LOCK = threading.Lock()  # MODEL_CACHE bookkeeping
+_LOAD_LOCK = threading.Lock()   # one model load at a time
+_MODEL_STATS = {"loads": 0, "evictions": 0, "load_seconds": 0.0}
+_TORCH_CONFIGURED = False
+
+def _configure_torch():
+    global _TORCH_CONFIGURED
+    if not _TORCH_CONFIGURED:
+        import torch
+        torch.set_num_threads(TRANSLATE_THREADS)
+        _TORCH_CONFIGURED = True
+
+def _tensor_bytes(value) -> int:
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    try:
+        return value.numel() * value.element_size()
+    except AttributeError:  # dtypes and other non-tensor state
+        return 0
+
+def _model_bytes(model) -> int:
+    """Weight memory, including int8 packed weights (which aren't parameters())."""
+    return sum(_tensor_bytes(v) for v in model.state_dict().values())
+
+def _load_pair(model_name: str):
+    _configure_torch()
+    from transformers import MarianMTModel, MarianTokenizer
+    tokenizer = MarianTokenizer.from_pretrained(model_name)
+    model = MarianMTModel.from_pretrained(model_name).eval()
+    if TRANSLATOR_QUANTIZE:
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+def _evict(keep: str) -> None:
+    budget = TRANSLATOR_CACHE_MB * 1e6
+    while sum(_MODEL_BYTES.values()) > budget:
+        victim = next((n for n in MODEL_CACHE if n != keep and n not in _PINNED), None)
+        if victim is None:
+            break  # everything left is pinned or in use; over budget until those go
+        MODEL_CACHE.pop(victim)
+        size = _MODEL_BYTES.pop(victim)
+        _MODEL_STATS["evictions"] += 1
+        print(f"♻️  Evicted translator {victim} ({size / 1e6:.0f} MB)")
 
 def load_translator(src_lang: str, tgt_lang: str = "en"):
     model_name = f"Helsinki-NLP/opus-mt-{src_lang}-{tgt_lang}"
-    if model_name not in MODEL_CACHE:
-        tokenizer = MarianTokenizer.from_pretrained(model_name)
-        model = MarianMTModel.from_pretrained(model_name)
-        MODEL_CACHE[model_name] = (tokenizer, model)
-    return MODEL_CACHE[model_name]
+    with _MODEL_LOCK:
+        if model_name in MODEL_CACHE:
+            MODEL_CACHE.move_to_end(model_name)
+            return MODEL_CACHE[model_name]
+    with _LOAD_LOCK:  # concurrent first requests load the model once
+        with _MODEL_LOCK:
+            if model_name in MODEL_CACHE:
+                return MODEL_CACHE[model_name]
+        t0 = time.perf_counter()
+        pair = _load_pair(model_name)
+        size = _model_bytes(pair[1])
+        with _MODEL_LOCK:
+            MODEL_CACHE[model_name] = pair
+            _MODEL_BYTES[model_name] = size
+            _MODEL_STATS["loads"] += 1
+            _MODEL_STATS["load_seconds"] += time.perf_counter() - t0
+            _evict(keep=model_name)
+        print(f"🌐 Loaded translator {model_name} ({size / 1e6:.0f} MB"
+              f"{', int8' if TRANSLATOR_QUANTIZE else ''}) in {time.perf_counter() - t0:.1f}s")
+        return pair
+
+def preload_translators(pairs: str = None) -> List[str]:
+    """Load and pin the common language pairs (TRANSLATOR_PRELOAD); returns those loaded."""
+    loaded = []
+    for pair in (TRANSLATOR_PRELOAD if pairs is None else pairs).split(","):
+        if "-" not in pair:
+            continue
+        src, tgt = (p.strip() for p in pair.split("-", 1))
+        try:
+            load_translator(src, tgt)
+        except Exception as e:
+            print(f"[WARN] Could not preload translator {pair}: {e}")
+            continue
+        with _MODEL_LOCK:
+            _PINNED.add(f"Helsinki-NLP/opus-mt-{src}-{tgt}")
+        loaded.append(f"{src}-{tgt}")
+    return loaded
+
+def translator_models() -> dict:
+    """Loaded translator models (MB each, LRU first), budget, loads and evictions."""
+    with _MODEL_LOCK:
+        models = {n.rsplit("/", 1)[-1]: round(_MODEL_BYTES[n] / 1e6, 1) for n in MODEL_CACHE}
+        out = dict(_MODEL_STATS)
+        pinned = sorted(n.rsplit("/", 1)[-1] for n in _PINNED)
+    out["load_seconds"] = round(out["load_seconds"], 2)
+    return {"models_mb": models, "total_mb": round(sum(models.values()), 1),
+            "budget_mb": TRANSLATOR_CACHE_MB, "pinned": pinned, "int8": TRANSLATOR_QUANTIZE, **out}
+
+def translate_batch(texts: List[str], src_lang: str, tgt_lang: str = "en") -> List[str]:
+    """Translate several texts in one generate() call (no cache, no error handling)."""
+    import torch
+    tokenizer, model = load_translator(src_lang, tgt_lang)
+    # Similar lengths side by side -> less padding per batch
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batch = tokenizer([texts[i] for i in order], return_tensors="pt", truncation=True, padding=True)
+    with torch.inference_mode():
+        gen = model.generate(**batch, num_beams=TRANSLATE_NUM_BEAMS, do_sample=False,
+                             max_new_tokens=TRANSLATE_MAX_NEW_TOKENS)
+    decoded = tokenizer.batch_decode(gen, skip_special_tokens=True)
+    out = [""] * len(texts)
+    for pos, i in enumerate(order):
+        out[i] = decoded[pos]
+    return out
+
+# ---- LRU cache of translations
+_CACHE: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_STATS = {"requests": 0, "cache_hits": 0, "coalesced": 0, "batches": 0, "batched_texts": 0,
+          "model_seconds": 0.0, "failures": 0}
+
+def _cache_get(key):
+    with _CACHE_LOCK:
+        _STATS["requests"] += 1
+        if key in _CACHE:
+            _STATS["cache_hits"] += 1
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+    return None
+
+def _cache_put(key, value: str) -> None:
+    with _CACHE_LOCK:
+        _CACHE[key] = value
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > TRANSLATE_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+# ---- Micro-batching, one worker thread per language pair
+class _PairBatcher:
+    def __init__(self, src_lang: str, tgt_lang: str):
+        self.src_lang, self.tgt_lang = src_lang, tgt_lang
+        self.queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        # Text -> Future while queued or translating: concurrent repeats share one result
+        self.pending: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True,
+                         name=f"translate-{src_lang}-{tgt_lang}").start()
+
+    def submit(self, text: str) -> Future:
+        with self.lock:
+            if text in self.pending:
+                with _CACHE_LOCK:
+                    _STATS["coalesced"] += 1
+                return self.pending[text]
+            fut: Future = Future()
+            self.pending[text] = fut
+        self.queue.put((text, fut))
+        return fut
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        items = [self.queue.get()]  # block until there is work
+        deadline = time.monotonic() + TRANSLATE_BATCH_WAIT_MS / 1000
+        while len(items) < TRANSLATE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                items.append(self.queue.get(timeout=max(0.0, remaining)) if remaining > 0
+                             else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self) -> None:
+        while True:
+            items = self._collect()
+            texts = [t for t, _ in items]
+            t0 = time.perf_counter()
+            try:
+                results = translate_batch(texts, self.src_lang, self.tgt_lang)
+            except Exception as e:
+                results = [e] * len(items)
+            else:
+                with _CACHE_LOCK:
+                    _STATS["batches"] += 1
+                    _STATS["batched_texts"] += len(texts)
+                    _STATS["model_seconds"] += time.perf_counter() - t0
+                for text, result in zip(texts, results):
+                    _cache_put((self.src_lang, self.tgt_lang, text), result)
+            with self.lock:
+                for text, _ in items:
+                    self.pending.pop(text, None)
+            for (_, fut), result in zip(items, results):
+                if isinstance(result, Exception):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+
+_BATCHERS: Dict[Tuple[str, str], _PairBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+def _batcher(src_lang: str, tgt_lang: str) -> _PairBatcher:
+    key = (src_lang, tgt_lang)
+    if key not in _BATCHERS:
+        with _BATCHERS_LOCK:
+            if key not in _BATCHERS:
+                _BATCHERS[key] = _PairBatcher(src_lang, tgt_lang)
+    return _BATCHERS[key]
 
 def translate_text(text: str, src_lang: str, tgt_lang: str = "en") -> str:
-    if src_lang == tgt_lang:
+    """
+    Translate one text. Served from the LRU cache when seen before; otherwise
+    batched with other concurrent requests for the same language pair.
+    Returns the input unchanged if translation fails.
+    """
+    if src_lang == tgt_lang or not text or not text.strip():
         return text
+    key = (src_lang, tgt_lang, text.strip())
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
     try:
-        tokenizer, model = load_translator(src_lang, tgt_lang)
-        batch = tokenizer([text], return_tensors="pt", truncation=True, padding=True)
-        with torch.no_grad():
-            gen = model.generate(**batch)
-        return tokenizer.decode(gen[0], skip_special_tokens=True)
+        return _batcher(src_lang, tgt_lang).submit(key[2]).result()
     except Exception as e:
+        with _CACHE_LOCK:
+            _STATS["failures"] += 1
         print(f"[WARN] Translation failed ({src_lang}->{tgt_lang}): {e}")
         return text
 
+def translation_stats() -> dict:
+    """Cache hits, requests sharing an in-flight translation, batch count / size and model time."""
+    with _CACHE_LOCK:
+        out = dict(_STATS)
+        out["cached"] = len(_CACHE)
+    out["model_seconds"] = round(out["model_seconds"], 3)
+    out["hit_rate"] = round(out["cache_hits"] / out["requests"], 4) if out["requests"] else 0.0
+    out["avg_batch"] = round(out["batched_texts"] / out["batches"], 2) if out["batches"] else 0.0
+    out["threads"] = TRANSLATE_THREADS
+    out["translators"] = translator_models()
+    return out
+
 def detect_language(text: str) -> str:
     try:
         return detect(text) if text and text.strip() else "en"
@@ -9,10 +9,16 @@ Retrieves: context (PDF/Vectorstore) + graph facts (Neo4j) for LLM
 
 import os
 import argparse
+import asyncio
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Optional, Tuple
+
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 
 # ============================
 # Load environment variables
@@ -30,28 +36,52 @@ EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM
 # ============================
 # Embeddings + Neo4j Driver
 # ============================
-embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+# Created on first use: importing this module must not load torch /
+# sentence-transformers or open a Neo4j connection.
+_EMBEDDINGS = None
+_DRIVER = None
+
+def get_embeddings():
+    global _EMBEDDINGS
+    if _EMBEDDINGS is None:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        _EMBEDDINGS = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    return _EMBEDDINGS
+
+def get_driver():
+    global _DRIVER
+    if _DRIVER is None:
+        from neo4j import GraphDatabase
+        _DRIVER = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+    return _DRIVER
 
 # ============================
 # Helpers
 # ============================
 
+_CHROMA: Dict[str, object] = {}
+_CHROMA_LOCK = threading.Lock()
+
 def _load_chroma(country: str):
-    """Load country-specific Chroma collection created by create_embeddings.py"""
-    db_path = f"{CHROMA_ROOT}/chroma_{country.lower()}"
-    collection_name = f"policies_{country.lower()}"
-    print(f"📂 Loading {country} Chroma: {db_path} (collection={collection_name})")
-    return Chroma(
-        persist_directory=db_path,
-        embedding_function=embeddings,
-        collection_name=collection_name,
-    )
+    """Country-specific Chroma collection created by create_embeddings.py (opened once per process)."""
+    key = country.lower()
+    with _CHROMA_LOCK:
+        if key not in _CHROMA:
+            db_path = f"{CHROMA_ROOT}/chroma_{key}"
+            collection_name = f"policies_{key}"
+            print(f"📂 Loading {country} Chroma: {db_path} (collection={collection_name})")
+            from langchain_chroma import Chroma
+            _CHROMA[key] = Chroma(
+                persist_directory=db_path,
+                embedding_function=get_embeddings(),
+                collection_name=collection_name,
+            )
+        return _CHROMA[key]
 
 def ping():
     """Check Neo4j connectivity"""
     try:
-        driver.verify_connectivity()
+        get_driver().verify_connectivity()
         print("✅ Neo4j connectivity OK")
     except Exception as e:
         print(f"❌ Neo4j connection error: {e}")
@@ -134,7 +164,7 @@ def fetch_related_nodes(user_q: str, country: str, limit: int = 8):
     LIMIT $limit
     """
     try:
-        records, _, _ = driver.execute_query(
+        records, _, _ = get_driver().execute_query(
             cypher,
             q=user_q,
             country=country,
@@ -150,10 +180,13 @@ def fetch_related_nodes(user_q: str, country: str, limit: int = 8):
         return []
 
 
-def query_for_context(user_query: str, country: str = "india", k: int = 5, use_graph: bool = True):
+def query_for_context(user_query: str, country: str = "india", k: int = 5, use_graph: bool = True,
+                      graph_query: Optional[str] = None):
     """
     Retrieve from Chroma + Neo4j, return dict for LLM:
     { "contexts": <pdf text>, "graph": <facts> }
+
+    graph_query: search term for Neo4j (default: user_query)
     """
     # --- Load Chroma ---
     db = _load_chroma(country)
@@ -164,7 +197,7 @@ def query_for_context(user_query: str, country: str = "india", k: int = 5, use_g
     # --- Query Neo4j ---
     graph_text = ""
     if use_graph:
-        facts = fetch_related_nodes(user_query, country)
+        facts = fetch_related_nodes(graph_query or user_query, country)
         if facts:
             graph_lines = []
             for f in facts:
@@ -190,6 +223,179 @@ def query_for_context(user_query: str, country: str = "india", k: int = 5, use_g
 
     return {"contexts": contexts, "graph": graph_text}
 
+# ============================
+# Deadline-bounded retrieval (API)
+# ============================
+# /recommend starts retrieval before model inference and waits only until
+# RAG_DEADLINE_MS after the request began; late results are not waited for
+# (they still fill the cache for the next request with the same profile).
+# Retrieval runs on its own small pool so slow Chroma / Neo4j calls can't
+# tie up the threads used for inference and LLM calls; with RAG_MAX_PENDING
+# retrievals already queued or running, new ones are skipped.
+RAG_ENABLED = os.getenv("RAG_ENABLED", "1") == "1"
+RAG_DEADLINE_MS = float(os.getenv("RAG_DEADLINE_MS", "300"))
+RAG_WORKERS = int(os.getenv("RAG_WORKERS", "4"))
+RAG_MAX_PENDING = int(os.getenv("RAG_MAX_PENDING", str(2 * RAG_WORKERS)))
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "256"))
+RAG_K = int(os.getenv("RAG_K", "4"))
+
+# Categorical request fields that make a useful retrieval query
+_QUERY_FIELDS = ["diseases", "type_of_vehicle", "property_type", "destination_country"]
+_FLAG_FIELDS = {"smoker_drinker": "smoker", "existing_medical_condition": "pre-existing medical condition"}
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_RAG_LOCK = threading.Lock()
+_RAG_CACHE: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_RAG_INFLIGHT: Dict[Tuple[str, str], Future] = {}
+_RAG_STATS = {"requests": 0, "cache_hits": 0, "on_time": 0, "missed_deadline": 0,
+              "errors": 0, "skipped_busy": 0}
+_RAG_LATENCY = deque(maxlen=512)
+
+
+def profile_query(country: str, policy_type: str, data: Dict) -> Tuple[str, str]:
+    """(vector search text, Neo4j search term) for a recommendation request."""
+    policy = policy_type.lower()
+    terms = []
+    for field in _QUERY_FIELDS:
+        value = str(data.get(field) or "").strip()
+        if value and value.lower() != "none":
+            terms.append(value.lower())
+    for field, label in _FLAG_FIELDS.items():
+        if str(data.get(field) or "").lower() == "yes":
+            terms.append(label)
+    query = f"{policy} insurance in {country.lower()}" + (": " + ", ".join(terms) if terms else "")
+    # Neo4j matches one term by substring: the most specific one we have
+    return query, (terms[0] if terms else policy)
+
+
+def format_context(result: Dict) -> str:
+    """query_for_context output as knowledge text (placeholder warnings dropped)."""
+    parts = [result.get("contexts") or "", result.get("graph") or ""]
+    return "\n\n".join(p for p in parts if p and not p.startswith("⚠️"))
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ThreadPoolExecutor(max_workers=RAG_WORKERS, thread_name_prefix="rag")
+    return _POOL
+
+
+def _retrieve(key: Tuple[str, str], query: str, graph_query: str) -> str:
+    t0 = time.perf_counter()
+    try:
+        text = format_context(query_for_context(query, key[0], k=RAG_K, use_graph=bool(NEO4J_URI),
+                                                graph_query=graph_query))
+    finally:
+        with _RAG_LOCK:
+            _RAG_INFLIGHT.pop(key, None)
+    with _RAG_LOCK:
+        _RAG_LATENCY.append(time.perf_counter() - t0)
+        _RAG_CACHE[key] = text
+        _RAG_CACHE.move_to_end(key)
+        while len(_RAG_CACHE) > RAG_CACHE_SIZE:
+            _RAG_CACHE.popitem(last=False)
+    return text
+
+
+def submit_context(country: str, policy_type: str, data: Dict) -> Optional[Future]:
+    """
+    Start retrieval for a request now; returns a Future of the knowledge text
+    (already done on a cache hit), or None if RAG is disabled or saturated.
+    Identical in-flight queries share one retrieval.
+    """
+    if not RAG_ENABLED:
+        return None
+    query, graph_query = profile_query(country, policy_type, data)
+    key = (country.lower(), query)
+    with _RAG_LOCK:
+        _RAG_STATS["requests"] += 1
+        if key in _RAG_CACHE:
+            _RAG_STATS["cache_hits"] += 1
+            _RAG_CACHE.move_to_end(key)
+            done: Future = Future()
+            done.set_result(_RAG_CACHE[key])
+            return done
+        if key in _RAG_INFLIGHT:
+            return _RAG_INFLIGHT[key]
+        if len(_RAG_INFLIGHT) >= RAG_MAX_PENDING:
+            _RAG_STATS["skipped_busy"] += 1
+            return None
+        fut = _pool().submit(_retrieve, key, query, graph_query)
+        _RAG_INFLIGHT[key] = fut
+        return fut
+
+
+def _outcome(fut: Future) -> str:
+    try:
+        text = fut.result(timeout=0)
+    except Exception as e:
+        print(f"⚠️  RAG retrieval failed: {e}")
+        with _RAG_LOCK:
+            _RAG_STATS["errors"] += 1
+        return ""
+    with _RAG_LOCK:
+        _RAG_STATS["on_time"] += 1
+    return text
+
+
+def _missed(deadline_ms: float) -> str:
+    print(f"⏱️  RAG context missed the {deadline_ms:.0f}ms deadline; continuing without it")
+    with _RAG_LOCK:
+        _RAG_STATS["missed_deadline"] += 1
+    return ""
+
+
+def context_result(fut: Optional[Future], started: float, deadline_ms: Optional[float] = None) -> str:
+    """Knowledge text if `fut` finishes within deadline_ms of `started` (perf_counter), else ""."""
+    if fut is None:
+        return ""
+    deadline_ms = RAG_DEADLINE_MS if deadline_ms is None else deadline_ms
+    remaining = max(0.0, started + deadline_ms / 1000 - time.perf_counter())
+    try:
+        fut.result(timeout=remaining)
+    except FutureTimeout:
+        return _missed(deadline_ms)
+    except Exception:
+        pass
+    return _outcome(fut)
+
+
+async def context_result_async(fut: Optional[Future], started: float,
+                               deadline_ms: Optional[float] = None) -> str:
+    """context_result() without blocking the event loop."""
+    if fut is None:
+        return ""
+    deadline_ms = RAG_DEADLINE_MS if deadline_ms is None else deadline_ms
+    remaining = max(0.0, started + deadline_ms / 1000 - time.perf_counter())
+    try:
+        # shield: a timeout must not cancel the retrieval other requests may share
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), remaining)
+    except asyncio.TimeoutError:
+        return _missed(deadline_ms)
+    except Exception:
+        pass
+    return _outcome(fut)
+
+
+def rag_stats() -> Dict:
+    """Retrieval requests, cache hits, on-time / missed-deadline / failed / skipped counts and latency."""
+    with _RAG_LOCK:
+        out = dict(_RAG_STATS)
+        lat = sorted(_RAG_LATENCY)
+        out["inflight"] = len(_RAG_INFLIGHT)
+        out["cached"] = len(_RAG_CACHE)
+    waited = out["on_time"] + out["missed_deadline"]
+    out["miss_rate"] = round(out["missed_deadline"] / waited, 4) if waited else 0.0
+    out["deadline_ms"] = RAG_DEADLINE_MS
+    if lat:
+        out["p50_ms"] = round(statistics.median(lat) * 1000, 1)
+        out["p95_ms"] = round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 1)
+    return out
+
 # ============================
 # CLI (for debugging)
 # ============================
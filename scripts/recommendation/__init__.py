@@ -2,5 +2,6 @@
 from .predict import predict
 
 from .rule_engine import apply_rules
+from .rule_table import apply_rules_frame
 
-__all__ = ["recommend", "apply_rules"]
+__all__ = ["recommend", "apply_rules", "apply_rules_frame"]
@@ -0,0 +1,207 @@
+# scripts/recommendation/batch_reprice.py
+"""
+Portfolio re-pricing batch job.
+
+Streams processed/standardized_<country>.parquet one row group at a time,
+scores every row with the (country, policy) tier classifier + premium
+regressor in vectorized chunks, and writes the quotes back to Parquet.
+Row groups are spread across a process pool; throughput is reported in rows/sec.
+
+    python -m scripts.recommendation.batch_reprice --country india --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from threadpoolctl import threadpool_limits
+
+from .bundles import is_bundle
+from .common import ARTIFACTS, canon_column, encode_with_pipeline
+from .predict import INR_TO_AUD, TIER_MULTIPLIER, TIERS, _encode_for, _load_bundle
+
+PROCESSED = Path("processed")
+POLICIES = ["health", "life", "vehicle", "house", "travel"]
+
+# Per-process bundle cache: each worker loads a (country, policy) model once
+_BUNDLES: Dict[str, Optional[Dict]] = {}
+
+
+def _bundle(country: str, policy: str) -> Optional[Dict]:
+    key = f"{country}_{policy}"
+    if key not in _BUNDLES:
+        path = ARTIFACTS / key
+        _BUNDLES[key] = _load_bundle(path) if is_bundle(path) else None
+        if _BUNDLES[key] is None:
+            print(f"⚠️  No artifacts for {key}; its rows will be left unpriced")
+    return _BUNDLES[key]
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def score_chunk(df: pd.DataFrame, country: str) -> pd.DataFrame:
+    """Tier + all-tier premiums for every row of a chunk (canonical column names)."""
+    n = len(df)
+    tier = np.full(n, None, dtype=object)
+    conf = np.full(n, np.nan)
+    premiums = {t: np.full(n, np.nan) for t in TIERS}
+
+    policy_col = df["policytype"].astype(str).str.lower().to_numpy()
+    for policy in np.unique(policy_col):
+        bundle = _bundle(country, policy)
+        if bundle is None:
+            continue
+        idx = np.flatnonzero(policy_col == policy)
+        X = df.iloc[idx]
+        if bundle["pipeline"] is not None:
+            M_cls = M_reg = encode_with_pipeline(X, bundle["pipeline"])
+        else:
+            M_cls, M_reg = _encode_for(bundle, X, "cls"), _encode_for(bundle, X, "reg")
+
+        clf, reg = bundle["clf"], bundle["reg"]
+        proba = clf.predict_proba(M_cls)
+        best = proba.argmax(axis=1)
+        tier[idx] = np.asarray(clf.classes_, dtype=object)[best]
+        conf[idx] = proba[np.arange(len(idx)), best]
+
+        base = reg.predict(M_reg)
+        if country == "australia":
+            base = base * INR_TO_AUD
+        for t in TIERS:
+            premiums[t][idx] = np.round(base * TIER_MULTIPLIER[t], 2)
+
+    out = pd.DataFrame({
+        "policytype": policy_col,
+        "recommended_tier": tier,
+        "confidence": np.round(conf, 4),
+    }, index=df.index)
+    for t in TIERS:
+        out[f"premium_{t.lower()}"] = premiums[t]
+    return out
+
+
+# -----------------------------
+# Workers
+# -----------------------------
+def _init_worker(threads: int) -> None:
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    threadpool_limits(limits=threads)
+
+
+def _needed_columns(country: str) -> Optional[List[str]]:
+    """Canonical columns the bundles read; None (= all) if an old bundle has no pipeline."""
+    cols = {"policytype"}
+    for policy in POLICIES:
+        bundle = _bundle(country, policy)
+        if bundle is None:
+            continue
+        if bundle["pipeline"] is None:
+            return None
+        cols.update(bundle["pipeline"]["features"])
+    return sorted(cols)
+
+
+def _process_row_groups(src: str, out_file: str, country: str,
+                        row_groups: List[int], batch_size: int) -> Dict:
+    """Score the given row groups of `src` and write them to one part file."""
+    t0 = time.perf_counter()
+    pf = pq.ParquetFile(src)
+    needed = _needed_columns(country)
+    columns = None if needed is None else [c for c in pf.schema_arrow.names if canon_column(c) in needed]
+
+    # Global row ids so output rows can be joined back to the source file
+    offsets = np.cumsum([0] + [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)])
+
+    rows = 0
+    writer = None
+    try:
+        for rg in row_groups:
+            start = int(offsets[rg])
+            for batch in pf.iter_batches(batch_size=batch_size, row_groups=[rg], columns=columns):
+                df = batch.to_pandas()
+                df.columns = [canon_column(c) for c in df.columns]
+                df.index = pd.RangeIndex(start, start + len(df), name="row_id")
+                start += len(df)
+
+                scored = score_chunk(df, country).reset_index()
+                table = pa.Table.from_pandas(scored, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_file, table.schema)
+                writer.write_table(table)
+                rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return {"file": out_file, "rows": rows, "seconds": time.perf_counter() - t0}
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def reprice(country: str, src: Optional[str] = None, out_dir: Optional[str] = None,
+            workers: Optional[int] = None, batch_size: int = 50_000) -> Dict:
+    country = country.lower()
+    src = src or str(PROCESSED / f"standardized_{country}.parquet")
+    out = Path(out_dir or PROCESSED / f"repriced_{country}")
+    out.mkdir(parents=True, exist_ok=True)
+    for old in out.glob("part-*.parquet"):
+        old.unlink()
+
+    n_groups = pq.ParquetFile(src).num_row_groups
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, n_groups))
+    threads = max(1, cpus // workers)
+    # Round-robin row groups across workers; one part file per worker
+    assignments = [list(range(w, n_groups, workers)) for w in range(workers)]
+
+    print("\n" + "=" * 68)
+    print(f"💱 Re-pricing {country.upper()} from {src}")
+    print(f"   {n_groups} row groups → {workers} workers × {threads} threads")
+    print("=" * 68)
+
+    t0 = time.perf_counter()
+    results = []
+    if workers == 1:
+        _init_worker(threads)
+        results.append(_process_row_groups(src, str(out / "part-000.parquet"), country,
+                                           assignments[0], batch_size))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(threads,)) as pool:
+            futures = [
+                pool.submit(_process_row_groups, src, str(out / f"part-{w:03d}.parquet"),
+                            country, groups, batch_size)
+                for w, groups in enumerate(assignments)
+            ]
+            for fut in as_completed(futures):
+                results.append(fut.result())
+    wall = time.perf_counter() - t0
+
+    total = sum(r["rows"] for r in results)
+    for r in sorted(results, key=lambda r: r["file"]):
+        rate = r["rows"] / r["seconds"] if r["seconds"] else 0.0
+        print(f"   {Path(r['file']).name}: {r['rows']} rows in {r['seconds']:.2f}s ({rate:,.0f} rows/s)")
+    print(f"✅ {total} rows in {wall:.2f}s → {total / max(wall, 1e-9):,.0f} rows/s | output: {out}")
+    return {"rows": total, "seconds": wall, "rows_per_sec": total / max(wall, 1e-9), "out_dir": str(out)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-quote the whole book from standardized Parquet")
+    parser.add_argument("--country", required=True, help="india | australia")
+    parser.add_argument("--src", default=None, help="Input parquet (default: processed/standardized_<country>.parquet)")
+    parser.add_argument("--out", default=None, help="Output dir (default: processed/repriced_<country>/)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows per scored chunk")
+    args = parser.parse_args()
+
+    reprice(args.country, args.src, args.out, args.workers, args.batch_size)
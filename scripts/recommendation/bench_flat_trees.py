@@ -0,0 +1,127 @@
+# scripts/recommendation/bench_flat_trees.py
+"""
+Benchmark sklearn HGB estimators against their flat node-array export.
+
+For one (country, policy) bundle this checks that clf/reg predictions are
+identical, then compares single-row latency, batch cost per row, and the
+cold-start cost of importing + loading each format in a fresh interpreter.
+
+    python -m scripts.recommendation.bench_flat_trees --country india --policy health
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from .bundles import resolve_bundle_dir
+from .common import ARTIFACTS, encode_with_pipeline
+from .flat_trees import export_model, export_pipeline, load_flat_model, load_flat_pipeline
+from .train import load_training_frame, prepare_xy
+
+
+def _median_us(fn, repeats: int) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e6
+
+
+def _cold_start_s(code: str, repeats: int = 3) -> float:
+    """Median wall time of `python -c code` in a fresh interpreter."""
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def bench(country: str, policy: str, data_path: str, repeats: int = 200) -> dict:
+    path = resolve_bundle_dir(ARTIFACTS / f"{country.lower()}_{policy.lower()}")
+    clf, reg = joblib.load(path / "clf.pkl"), joblib.load(path / "reg.pkl")
+    pipeline = joblib.load(path / "pipeline.pkl")
+    if not (path / "clf_flat.npz").exists():
+        print(f"ℹ️  No flat export in {path}; exporting now")
+        export_model(clf, path / "clf_flat.npz")
+        export_model(reg, path / "reg_flat.npz")
+        export_pipeline(pipeline, path / "pipeline_flat.json")
+    fclf, freg = load_flat_model(path / "clf_flat.npz"), load_flat_model(path / "reg_flat.npz")
+    fpipe = load_flat_pipeline(path / "pipeline_flat.json")
+
+    df = load_training_frame(data_path, country=country, policies=[policy])
+    X = prepare_xy(country, df, policy)[0]
+    M = encode_with_pipeline(X, pipeline)
+    one = M[:1]
+
+    # ---- Parity
+    parity = {
+        "rows": len(M),
+        "encode_max_abs_diff": float(np.abs(encode_with_pipeline(X, fpipe) - M).max()),
+        "proba_max_abs_diff": float(np.abs(clf.predict_proba(M) - fclf.predict_proba(M)).max()),
+        "class_agreement": float((clf.predict(M) == fclf.predict(M)).mean()),
+        "reg_max_abs_diff": float(np.abs(reg.predict(M) - freg.predict(M)).max()),
+    }
+
+    # ---- Latency
+    latency = {
+        "sklearn_clf_single_us": _median_us(lambda: clf.predict_proba(one), repeats),
+        "flat_clf_single_us": _median_us(lambda: fclf.predict_proba(one), repeats),
+        "sklearn_reg_single_us": _median_us(lambda: reg.predict(one), repeats),
+        "flat_reg_single_us": _median_us(lambda: freg.predict(one), repeats),
+        "sklearn_clf_batch_row_us": _median_us(lambda: clf.predict_proba(M), 5) / len(M),
+        "flat_clf_batch_row_us": _median_us(lambda: fclf.predict_proba(M), 5) / len(M),
+    }
+
+    # ---- Cold start: import + load in a fresh process
+    here = Path(__file__).resolve().parent
+    cold = {
+        "python_baseline_s": _cold_start_s("pass"),
+        "sklearn_import_load_s": _cold_start_s(
+            "import joblib; "
+            + "; ".join(f"joblib.load(r'{path / n}')" for n in ("clf.pkl", "reg.pkl", "pipeline.pkl"))
+        ),
+        "flat_import_load_s": _cold_start_s(
+            f"import sys; sys.path.insert(0, r'{here}'); "
+            "from flat_trees import load_flat_model, load_flat_pipeline; "
+            f"load_flat_model(r'{path / 'clf_flat.npz'}'); load_flat_model(r'{path / 'reg_flat.npz'}'); "
+            f"load_flat_pipeline(__import__('pathlib').Path(r'{path / 'pipeline_flat.json'}'))"
+        ),
+    }
+
+    print("\n" + "=" * 68)
+    print(f"🌲 Flat trees vs sklearn — {country.upper()} {policy.upper()} ({fclf.roots.size} clf trees)")
+    print("=" * 68)
+    for k, v in parity.items():
+        print(f"   {k:<28} {v}")
+    print("-" * 68)
+    for kind in ("clf_single", "reg_single", "clf_batch_row"):
+        s, f = latency[f"sklearn_{kind}_us"], latency[f"flat_{kind}_us"]
+        print(f"   {kind:<16} sklearn {s:>10.1f}µs | flat {f:>10.1f}µs | {s / max(f, 1e-9):5.1f}x")
+    print("-" * 68)
+    base = cold["python_baseline_s"]
+    print(f"   cold import+load  sklearn {cold['sklearn_import_load_s'] - base:.2f}s | "
+          f"flat {cold['flat_import_load_s'] - base:.2f}s (python startup {base:.2f}s excluded)")
+    print("=" * 68)
+    return {"parity": parity, "latency_us": latency, "cold_start_s": cold}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sklearn HGB with the flat-array evaluator")
+    parser.add_argument("--country", default="india", help="india | australia")
+    parser.add_argument("--policy", default="health")
+    parser.add_argument("--data", default=None, help="Training data (default: processed/standardized_<country>.parquet)")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    data = args.data or str(Path("processed") / f"standardized_{args.country.lower()}.parquet")
+    bench(args.country, args.policy, data, args.repeats)
@@ -0,0 +1,139 @@
+# scripts/recommendation/bundles.py
+"""
+Versioned artifact bundles.
+
+    artifacts/<country>_<policy>/
+        CURRENT                     <- version id of the live bundle (atomic rename)
+        tuned_params.json           <- tuning input, shared by every version
+        versions/<version>/
+            clf.pkl reg.pkl pipeline.pkl *_flat.npz pipeline_flat.json features*.json
+            premium_grid.npz        <- vehicle / travel premium lookup table
+            manifest.json           <- sha256 + size of every file above
+
+train.py writes a complete version directory, then flips CURRENT, so a
+reader always sees one consistent (clf, reg, pipeline) set. Bundles trained
+before versioning (files directly in the bundle dir, no CURRENT) still load.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CURRENT = "CURRENT"
+VERSIONS = "versions"
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Older versions kept on disk for rollback
+KEEP_VERSIONS = int(os.getenv("KEEP_BUNDLE_VERSIONS", "3"))
+
+
+# -----------------------------
+# Layout
+# -----------------------------
+def new_version_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + f"-{os.getpid()}"
+
+
+def version_dir(bundle_root: Path, version: str) -> Path:
+    return bundle_root / VERSIONS / version
+
+
+def current_version(bundle_root: Path) -> Optional[str]:
+    """Live version id, or None for an unversioned (legacy) bundle."""
+    try:
+        return (bundle_root / CURRENT).read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def resolve_bundle_dir(bundle_root: Path) -> Path:
+    """Directory holding the live model files (the bundle dir itself for legacy bundles)."""
+    version = current_version(bundle_root)
+    return version_dir(bundle_root, version) if version else bundle_root
+
+
+def is_bundle(bundle_root: Path) -> bool:
+    return (bundle_root / CURRENT).exists() or (bundle_root / "clf.pkl").exists()
+
+
+# -----------------------------
+# Manifest
+# -----------------------------
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_manifest(vdir: Path, meta: Dict) -> Dict:
+    """Checksum every file in the version dir and write manifest.json last."""
+    files = {
+        p.name: {"sha256": file_sha256(p), "bytes": p.stat().st_size}
+        for p in sorted(vdir.iterdir())
+        if p.is_file() and p.name != MANIFEST and not p.name.startswith(".")
+    }
+    manifest = {"manifest_version": MANIFEST_VERSION, "version": vdir.name,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                **meta, "files": files}
+    tmp = vdir / f".{MANIFEST}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, vdir / MANIFEST)
+    return manifest
+
+
+def load_manifest(vdir: Path) -> Optional[Dict]:
+    p = vdir / MANIFEST
+    if not p.exists():
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_manifest(vdir: Path) -> Optional[Dict]:
+    """Raise ValueError if a listed file is missing or its checksum differs."""
+    manifest = load_manifest(vdir)
+    if manifest is None:
+        return None
+    for name, info in manifest["files"].items():
+        p = vdir / name
+        if not p.exists():
+            raise ValueError(f"{vdir}: {name} listed in manifest but missing")
+        if p.stat().st_size != info["bytes"] or file_sha256(p) != info["sha256"]:
+            raise ValueError(f"{vdir}: checksum mismatch for {name}")
+    return manifest
+
+
+# -----------------------------
+# Publish
+# -----------------------------
+def publish_version(bundle_root: Path, version: str) -> None:
+    """Point CURRENT at `version` with an atomic rename."""
+    if not (version_dir(bundle_root, version) / MANIFEST).exists():
+        raise ValueError(f"Refusing to publish {version}: no manifest")
+    tmp = bundle_root / f".{CURRENT}.{os.getpid()}.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, bundle_root / CURRENT)
+
+
+def list_versions(bundle_root: Path) -> List[str]:
+    vroot = bundle_root / VERSIONS
+    return sorted(p.name for p in vroot.iterdir() if p.is_dir()) if vroot.exists() else []
+
+
+def prune_versions(bundle_root: Path, keep: int = KEEP_VERSIONS) -> List[str]:
+    """Delete all but the newest `keep` versions besides the live one."""
+    live = current_version(bundle_root)
+    others = [v for v in list_versions(bundle_root) if v != live]
+    old = others[:max(len(others) - keep, 0)]
+    for v in old:
+        shutil.rmtree(version_dir(bundle_root, v), ignore_errors=True)
+    return old
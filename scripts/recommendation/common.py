@@ -1,10 +1,14 @@
 # scripts/recommendation/common.py
+import re
+
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import OneHotEncoder
 from pathlib import Path
 
+# sklearn is imported on first use (preprocess / unpickling an estimator),
+# not at import: it is a third of the API worker's import time.
+
 # -----------------
 # Globals
 # -----------------
@@ -27,9 +31,20 @@ FEATURES = [
     "policytype",
 ]
 
+# Header aliases that canonicalisation (lowercase, strip non-alphanumerics) misses
+COLUMN_ALIASES = {
+    "propertysizesqfeet": "propertysize",
+    "sumsssured": "sumassured",  # typo in the raw CSVs
+}
+
 # -----------------
 # Data Handling
 # -----------------
+def canon_column(name: str) -> str:
+    """Map any header spelling (sum_assured, Sum Assured, ...) to the training feature name."""
+    c = re.sub(r"[^a-z0-9]", "", str(name).lower())
+    return COLUMN_ALIASES.get(c, c)
+
 def load_data(country: str) -> pd.DataFrame:
     """Load dataset parquet and normalize column names."""
     if country.lower() == "india":
@@ -54,17 +69,21 @@ def load_data(country: str) -> pd.DataFrame:
 # -----------------
 # Artifacts
 # -----------------
+# Pickles are written uncompressed so their numpy arrays can be loaded with
+# mmap_mode="r". For HGB estimators that is ~1 small array per tree, so the
+# flat export (flat_trees.py: a few large arrays, mapped by default) is the
+# format to serve from when load time and shared memory matter.
 def save_artifacts(path: Path, obj, name: str):
     path.mkdir(parents=True, exist_ok=True)
-    joblib.dump(obj, path / f"{name}.pkl")
+    joblib.dump(obj, path / f"{name}.pkl", compress=0)
 
-def load_artifacts(path: Path, name: str):
-    return joblib.load(path / f"{name}.pkl")
+def load_artifacts(path: Path, name: str, mmap_mode=None):
+    return joblib.load(path / f"{name}.pkl", mmap_mode=mmap_mode)
 
 # -----------------
 # Preprocessing
 # -----------------
-def preprocess(X: pd.DataFrame, encoder: OneHotEncoder = None):
+def preprocess(X: pd.DataFrame, encoder=None):
     """Return numeric + one-hot encoded categorical features.
 
     NaNs are preserved for numeric columns (HGB supports them).
@@ -86,6 +105,8 @@ def preprocess(X: pd.DataFrame, encoder: OneHotEncoder = None):
 
     # OneHotEncoder (only categorical)
     if encoder is None:
+        from sklearn.preprocessing import OneHotEncoder
+
         encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=False)
         if len(cat_cols):
             encoder.fit(X[cat_cols])
@@ -96,3 +117,36 @@ def preprocess(X: pd.DataFrame, encoder: OneHotEncoder = None):
     X_cat = encoder.transform(X[cat_cols]) if len(cat_cols) else np.zeros((len(X), 0))
 
     return np.concatenate([X_num, X_cat], axis=1), encoder
+
+# -----------------
+# Shared feature pipeline
+# -----------------
+# One encoder per bundle, shared by the classifier and the regressor.
+# Stored as a plain dict (no custom classes) so it unpickles anywhere.
+FEATURE_PIPELINE_VERSION = 1
+
+def load_feature_pipeline(path: Path):
+    """Return the bundle's shared pipeline dict, or None for old two-encoder bundles."""
+    if not (path / "pipeline.pkl").exists():
+        return None
+    pipeline = load_artifacts(path, "pipeline")
+    version = pipeline.get("version")
+    if version != FEATURE_PIPELINE_VERSION:
+        raise ValueError(f"Unsupported feature pipeline version {version} in {path}")
+    return pipeline
+
+def encode_with_pipeline(X: pd.DataFrame, pipeline: dict) -> np.ndarray:
+    """Encode rows once: numeric (NaN -> -1) + one-hot categoricals, in training order."""
+    X = X.reindex(columns=pipeline["features"])
+    num_cols, cat_cols = pipeline["num_cols"], pipeline["cat_cols"]
+
+    Xn = np.zeros((len(X), 0))
+    if num_cols:
+        Xn = X[num_cols].apply(pd.to_numeric, errors="coerce").fillna(-1.0).to_numpy(dtype=float)
+
+    Xc = np.zeros((len(X), 0))
+    if cat_cols:
+        X_cat = X[cat_cols].astype("object").fillna("__missing__").astype(str)
+        Xc = pipeline["encoder"].transform(X_cat)
+
+    return np.hstack([Xn, Xc])
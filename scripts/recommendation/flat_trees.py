@@ -0,0 +1,273 @@
+# scripts/recommendation/flat_trees.py
+"""
+Flat-array export of fitted HistGradientBoosting models + a pure-NumPy evaluator.
+
+Every tree of a model is concatenated into one set of node arrays
+(feature, threshold, missing_left, left, right, value) saved as <name>_flat.npz;
+leaves point at themselves so all trees for a batch of rows are walked together,
+one vectorized step per tree level.
+
+The shared feature pipeline is exported alongside as pipeline_flat.json, with
+its one-hot encoder reduced to plain category lists.
+
+This module only imports numpy (no pandas, scikit-learn or joblib), so serving
+can load and score a bundle without importing sklearn at all.
+
+The .npz files are written uncompressed, so each member is a plain .npy blob at
+a fixed offset: load_flat_model() memory-maps the large node arrays read-only
+instead of copying them. Load time is near zero and every process that serves
+the same bundle maps the same physical pages from the page cache.
+"""
+from __future__ import annotations
+
+import io
+import json
+import os
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FLAT_VERSION = 1
+
+# Rows are scored in chunks so rows × trees node indices stay a few MB
+_CHUNK_CELLS = 2_000_000
+
+# Memory-map flat arrays at least this large (smaller ones are just read)
+FLAT_MMAP = os.getenv("FLAT_MMAP", "1") == "1"
+_MMAP_MIN_BYTES = 64 * 1024
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def _link_name(model) -> str:
+    """Inverse link of the model's loss: identity | log | logit | softmax."""
+    name = type(model._loss.link).__name__
+    links = {"IdentityLink": "identity", "LogLink": "log",
+             "LogitLink": "logit", "MultinomialLogit": "softmax"}
+    if name not in links:
+        raise ValueError(f"Unsupported link {name} for flat export")
+    return links[name]
+
+
+def flatten_model(model) -> Dict[str, np.ndarray]:
+    """Node arrays for a fitted HistGradientBoosting{Classifier,Regressor}."""
+    feature, threshold, missing_left, left, right, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    offset = 0
+    # _predictors[iteration][k]: tree k of the iteration (one per class for multiclass)
+    for trees in model._predictors:
+        for tree in trees:
+            nodes = tree.nodes
+            if nodes["is_categorical"].any():
+                raise ValueError("Native categorical splits are not supported by the flat format")
+            n = len(nodes)
+            leaf = nodes["is_leaf"].astype(bool)
+            own = np.arange(offset, offset + n)
+            feature.append(np.where(leaf, 0, nodes["feature_idx"]).astype(np.int32))
+            threshold.append(nodes["num_threshold"].astype(np.float64))
+            missing_left.append(nodes["missing_go_to_left"].astype(bool))
+            left.append(np.where(leaf, own, nodes["left"].astype(np.int64) + offset).astype(np.int32))
+            right.append(np.where(leaf, own, nodes["right"].astype(np.int64) + offset).astype(np.int32))
+            value.append(np.where(leaf, nodes["value"], 0.0).astype(np.float64))
+            roots.append(offset)
+            depth = max(depth, int(nodes["depth"].max()))
+            offset += n
+
+    arrays = {
+        "version": np.array(FLAT_VERSION),
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "missing_left": np.concatenate(missing_left),
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "value": np.concatenate(value),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "baseline": np.asarray(model._baseline_prediction, dtype=np.float64).ravel(),
+        "trees_per_iteration": np.array(int(model.n_trees_per_iteration_)),
+        "max_depth": np.array(depth),
+        "n_features": np.array(int(model.n_features_in_)),
+        "link": np.array(_link_name(model)),
+    }
+    if hasattr(model, "classes_"):
+        arrays["classes"] = np.asarray([str(c) for c in model.classes_])
+    return arrays
+
+
+def _atomic_savez(path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    """np.savez-compatible, uncompressed, with every member's data 64-byte aligned in the file.
+
+    Alignment comes from a padding extra field in each local header (as zipalign
+    does), so memory-mapped arrays are aligned and NumPy keeps its fast paths.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as zf:
+        for key, arr in arrays.items():
+            buf = io.BytesIO()
+            np.lib.format.write_array(buf, np.asanyarray(arr), allow_pickle=False)
+            info = zipfile.ZipInfo(f"{key}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            data_start = zf.fp.tell() + 30 + len(info.filename.encode()) + 4
+            pad = (-data_start) % 64
+            info.extra = struct.pack("<HH", 0xD935, pad) + b"\0" * pad
+            zf.writestr(info, buf.getvalue())
+    os.replace(tmp, path)
+
+
+def export_model(model, path: Path) -> Path:
+    """Write <path> (e.g. artifacts/india_health/clf_flat.npz) atomically."""
+    _atomic_savez(path, flatten_model(model))
+    return path
+
+
+def export_pipeline(pipeline: dict, path: Path) -> Path:
+    """Write the shared feature pipeline as JSON (category lists instead of a fitted encoder)."""
+    flat = {
+        "version": pipeline["version"],
+        "features": pipeline["features"],
+        "num_cols": pipeline["num_cols"],
+        "cat_cols": pipeline["cat_cols"],
+        "categories": [[str(c) for c in cats] for cats in pipeline["encoder"].categories_]
+        if pipeline["cat_cols"] else [],
+    }
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(flat, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+class FlatOneHot:
+    """Drop-in for the fitted OneHotEncoder(handle_unknown='ignore') in a pipeline dict."""
+
+    def __init__(self, categories: List[List[str]]):
+        self.categories_ = [np.asarray(c, dtype=object) for c in categories]
+        self._index = [{c: i for i, c in enumerate(cats)} for cats in categories]
+        self._width = sum(len(c) for c in categories)
+
+    def transform(self, X) -> np.ndarray:
+        """X: DataFrame of the categorical columns, already cast to str."""
+        out = np.zeros((len(X), self._width))
+        rows = np.arange(len(X))
+        start = 0
+        for j, index in enumerate(self._index):
+            codes = np.fromiter((index.get(v, -1) for v in X.iloc[:, j]), dtype=np.int64, count=len(X))
+            hit = codes >= 0  # unknown categories encode as all zeros
+            out[rows[hit], start + codes[hit]] = 1.0
+            start += len(index)
+        return out
+
+
+class FlatModel:
+    """Evaluates exported HGB node arrays with NumPy; mirrors predict / predict_proba."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        if int(arrays["version"]) != FLAT_VERSION:
+            raise ValueError(f"Unsupported flat model version {int(arrays['version'])}")
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.missing_left = arrays["missing_left"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.baseline = arrays["baseline"]
+        self.k = int(arrays["trees_per_iteration"])
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.link = str(arrays["link"])
+        if "classes" in arrays:
+            self.classes_ = np.asarray(arrays["classes"], dtype=object)
+
+    def _raw_chunk(self, X: np.ndarray) -> np.ndarray:
+        n = len(X)
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        flat_x = X.ravel()
+        row_base = (np.arange(n) * X.shape[1])[:, None]
+        has_nan = bool(np.isnan(flat_x).any())
+        for _ in range(self.max_depth):
+            x = flat_x.take(row_base + self.feature.take(node))
+            go_left = x <= self.threshold.take(node)
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left.take(node), go_left)
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+        leaf_values = self.value[node]  # (n, n_trees), trees ordered iteration-major
+        return leaf_values.reshape(n, -1, self.k).sum(axis=1) + self.baseline
+
+    def raw_predict(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        step = max(1, _CHUNK_CELLS // max(len(self.roots), 1))
+        return np.vstack([self._raw_chunk(X[i:i + step]) for i in range(0, len(X), step)]) \
+            if len(X) else np.zeros((0, self.k))
+
+    def predict_proba(self, X) -> np.ndarray:
+        raw = self.raw_predict(X)
+        if self.link == "logit":
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        if self.link == "softmax":
+            e = np.exp(raw - raw.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        raise AttributeError("predict_proba is only available for classifiers")
+
+    def predict(self, X) -> np.ndarray:
+        if hasattr(self, "classes_"):
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        raw = self.raw_predict(X)[:, 0]
+        return np.exp(raw) if self.link == "log" else raw
+
+
+def _mmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Arrays of an uncompressed .npz; large members are read-only np.memmap views into the file."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED or info.file_size < _MMAP_MIN_BYTES:
+                with zf.open(info) as member:
+                    arrays[key] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            # Local file header: 30 fixed bytes, then file name + extra field
+            f.seek(info.header_offset)
+            header = struct.unpack("<4s5H3L2H", f.read(30))
+            f.seek(info.header_offset + 30 + header[-2] + header[-1])
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran, dtype = read_header(f)
+            if dtype.hasobject:
+                raise ValueError(f"Object arrays are not allowed in {path}")
+            mapped = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(),
+                               shape=shape, order="F" if fortran else "C")
+            # Plain ndarray view of the mapping: avoids memmap subclass overhead per op
+            arrays[key] = mapped.view(np.ndarray)
+    return arrays
+
+
+def load_flat_model(path: Path, mmap: Optional[bool] = None) -> FlatModel:
+    """Load an exported model; node arrays are memory-mapped unless FLAT_MMAP=0."""
+    if FLAT_MMAP if mmap is None else mmap:
+        return FlatModel(_mmap_npz(Path(path)))
+    with np.load(path, allow_pickle=False) as z:
+        return FlatModel({k: z[k] for k in z.files})
+
+
+def load_flat_pipeline(path: Path) -> Optional[dict]:
+    """pipeline_flat.json as a pipeline dict usable by common.encode_with_pipeline."""
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        flat = json.load(f)
+    return {
+        "version": flat["version"],
+        "features": flat["features"],
+        "num_cols": flat["num_cols"],
+        "cat_cols": flat["cat_cols"],
+        "encoder": FlatOneHot(flat["categories"]),
+    }
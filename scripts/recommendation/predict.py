@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+import bisect
 import json
+import os
 import re
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
-from .common import ARTIFACTS, load_artifacts, preprocess
+from .common import (
+    ARTIFACTS,
+    encode_with_pipeline,
+    load_artifacts,
+    load_feature_pipeline,
+    preprocess,
+)
+from .bundles import current_version, is_bundle, resolve_bundle_dir, verify_manifest
+from .flat_trees import load_flat_model, load_flat_pipeline
+from .premium_grid import GRID_FILE, GRID_SPECS, grid_premium, load_grid
+from .rule_table import explain_rule, short_circuit_tier
 
 TIERS = ["Basic", "Standard", "Gold", "Premium"]
 
@@ -59,6 +74,10 @@ PROPERTY_AGE_MULTIPLIER = {
     20: 1.4,   # 20 years and above
 }
 
+# Sorted once at import (was re-sorted on every premium calculation)
+PROPERTY_AGE_THRESHOLDS = sorted(PROPERTY_AGE_MULTIPLIER)
+PROPERTY_AGE_FACTORS = [PROPERTY_AGE_MULTIPLIER[a] for a in PROPERTY_AGE_THRESHOLDS]
+
 PROPERTY_TYPE_MULTIPLIER = {
     "apartment": 1.0,
     "house": 1.2,
@@ -72,11 +91,9 @@ def calculate_property_premium(value: float, age: int, property_type: str, size:
         # Get base premium
         base_premium = value * PROPERTY_BASE_RATE
         
-        # Apply age multiplier
-        age_multiplier = 1.0
-        for threshold_age, mult in sorted(PROPERTY_AGE_MULTIPLIER.items()):
-            if age >= threshold_age:
-                age_multiplier = mult
+        # Apply age multiplier (last threshold <= age)
+        slab = bisect.bisect_right(PROPERTY_AGE_THRESHOLDS, age) - 1
+        age_multiplier = PROPERTY_AGE_FACTORS[slab] if slab >= 0 else 1.0
         
         # Apply property type multiplier
         type_multiplier = PROPERTY_TYPE_MULTIPLIER.get(property_type.lower(), 1.2)
@@ -143,6 +160,9 @@ def calculate_vehicle_idv(price: float, age: int, vehicle_type: str) -> tuple[fl
     annual_premium = idv * base_rate
     
     return idv, annual_premium
+# Serve from the flat node-array export (flat_trees.py) when a bundle has one
+FLAT_TREES = os.getenv("FLAT_TREES", "0") == "1"
+
 def _canon(s: str) -> str:
     return re.sub(r"[^a-z0-9]", "", s.lower())
 
@@ -180,6 +200,164 @@ def _expected_features_from_encoder(enc, fallback: List[str]) -> List[str]:
         return list(enc.feature_names_in_)
     return fallback
 
+# Check manifest checksums before a bundle version is loaded
+VERIFY_BUNDLES = os.getenv("VERIFY_BUNDLES", "1") == "1"
+
+def _load_bundle(path: Path) -> Dict:
+    """Load clf/reg plus the shared feature pipeline (or old per-model encoders).
+
+    `path` is a bundle dir (artifacts/<country>_<policy>); its live version is loaded.
+    """
+    version = current_version(path)
+    path = resolve_bundle_dir(path)
+    if version and VERIFY_BUNDLES:
+        verify_manifest(path)
+    # Premium lookup table (vehicle / travel), read once here rather than per request
+    meta = {"dir": path, "version": version or "legacy", "grid": load_grid(path)}
+    if FLAT_TREES and (path / "clf_flat.npz").exists() and (path / "pipeline_flat.json").exists():
+        # Node-array export: same predictions, no sklearn estimators to unpickle
+        return {
+            "clf": load_flat_model(path / "clf_flat.npz"),
+            "reg": load_flat_model(path / "reg_flat.npz"),
+            "pipeline": load_flat_pipeline(path / "pipeline_flat.json"),
+            **meta,
+        }
+    bundle = {
+        "clf": load_artifacts(path, "clf"),
+        "reg": load_artifacts(path, "reg"),
+        "pipeline": load_feature_pipeline(path),
+        **meta,
+    }
+    if bundle["pipeline"] is None:
+        # Pre-pipeline bundle: separate encoders for classifier and regressor
+        bundle["enc_cls"] = load_artifacts(path, "encoder_cls")
+        bundle["enc_reg"] = load_artifacts(path, "encoder_reg")
+    return bundle
+
+def _warm_bundle(bundle: Dict) -> None:
+    """Score one dummy row so lazy imports and first-touch page faults happen now."""
+    n = getattr(bundle["clf"], "n_features_in_", None)
+    if n is None:
+        return
+    X = np.zeros((1, n))
+    bundle["clf"].predict_proba(X)
+    bundle["reg"].predict(X)
+
+# Loaded bundles, shared by every request in the process: bundle dir ->
+# (live key, bundle). The live key is the CURRENT version id, or file mtimes for
+# legacy unversioned bundles. A request holds on to the bundle dict it got, so
+# swapping an entry never disturbs requests already in flight.
+_BUNDLE_CACHE: Dict[str, tuple] = {}
+_BUNDLE_LOCK = threading.Lock()
+_RELOAD_LOCK = threading.Lock()
+_WATCHER: Optional[threading.Thread] = None
+
+def _bundle_stamp(path: Path) -> tuple:
+    stamp = []
+    for name in ("clf.pkl", "reg.pkl", "pipeline.pkl", "encoder_cls.pkl", "encoder_reg.pkl",
+                 "clf_flat.npz", "reg_flat.npz", "pipeline_flat.json", GRID_FILE):
+        try:
+            stamp.append((name, (path / name).stat().st_mtime_ns))
+        except OSError:
+            pass
+    return tuple(stamp)
+
+def _live_key(path: Path) -> tuple:
+    version = current_version(path)
+    return ("version", version) if version else ("legacy", _bundle_stamp(path))
+
+def get_bundle(path: Path) -> Dict:
+    """Cached _load_bundle(path).
+
+    While the reload watcher runs, new versions are swapped in by the watcher and
+    requests never touch the disk; otherwise the live version is checked per call.
+    """
+    key = str(path)
+    cached = _BUNDLE_CACHE.get(key)
+    if cached is not None and _WATCHER is not None:
+        return cached[1]
+    live = _live_key(path)
+    if cached is not None and cached[0] == live:
+        return cached[1]
+    with _BUNDLE_LOCK:
+        cached = _BUNDLE_CACHE.get(key)
+        if cached is None or cached[0] != live:
+            cached = (live, _load_bundle(path))
+            _BUNDLE_CACHE[key] = cached
+    return cached[1]
+
+def preload_bundles(root: Path = ARTIFACTS) -> List[str]:
+    """Load every bundle under `root` into the cache (e.g. in the gunicorn master before fork)."""
+    loaded = []
+    for path in sorted(root.glob("*_*")):
+        if is_bundle(path):
+            get_bundle(path)
+            loaded.append(path.name)
+    return loaded
+
+def reload_bundles(root: Path = ARTIFACTS) -> Dict[str, Dict]:
+    """Swap in every loaded bundle whose live version changed on disk.
+
+    The new version is loaded, checksum-verified and warmed while requests keep
+    using the old one; the cache entry is then replaced in one step. A version
+    that fails to load is reported and the old one stays live.
+    """
+    changes: Dict[str, Dict] = {}
+    with _RELOAD_LOCK:
+        for path in sorted(root.glob("*_*")):
+            if not is_bundle(path):
+                continue
+            key = str(path)
+            live = _live_key(path)
+            cached = _BUNDLE_CACHE.get(key)
+            if cached is None or cached[0] == live:
+                continue  # never requested (loaded lazily) or already current
+            old = cached[1]["version"]
+            t0 = time.perf_counter()
+            try:
+                bundle = _load_bundle(path)
+                _warm_bundle(bundle)
+            except Exception as e:
+                print(f"⚠️  Reload of {path.name} failed, keeping {old}: {e}")
+                changes[path.name] = {"from": old, "error": str(e)}
+                continue
+            with _BUNDLE_LOCK:
+                _BUNDLE_CACHE[key] = (live, bundle)
+            changes[path.name] = {"from": old, "to": bundle["version"],
+                                  "seconds": round(time.perf_counter() - t0, 3)}
+            print(f"🔄 {path.name}: {old} → {bundle['version']}")
+    return changes
+
+def bundle_versions() -> Dict[str, str]:
+    """Version currently served for each loaded bundle."""
+    return {Path(k).name: v[1]["version"] for k, v in sorted(_BUNDLE_CACHE.items())}
+
+def start_bundle_watcher(interval: float, root: Path = ARTIFACTS) -> threading.Thread:
+    """Poll CURRENT pointers every `interval` seconds and hot-swap new versions (once per process)."""
+    global _WATCHER
+
+    def _watch():
+        while True:
+            time.sleep(interval)
+            try:
+                reload_bundles(root)
+            except Exception as e:
+                print(f"⚠️  Bundle watcher: {e}")
+
+    with _BUNDLE_LOCK:
+        if _WATCHER is None:
+            _WATCHER = threading.Thread(target=_watch, name="bundle-watcher", daemon=True)
+            _WATCHER.start()
+    return _WATCHER
+
+def _encode_for(bundle: Dict, X: pd.DataFrame, which: str) -> np.ndarray:
+    """Encode X for 'cls' or 'reg'. With a shared pipeline both get the same matrix."""
+    pipeline = bundle["pipeline"]
+    if pipeline is not None:
+        return encode_with_pipeline(_align_columns(X, pipeline["features"]), pipeline)
+    X_enc, _ = preprocess(X, bundle[f"enc_{which}"])
+    return X_enc
+
 def _ensure_csv_schema(data_norm: dict) -> pd.DataFrame:
     """Force input row to match the CSV schema exactly."""
     row = {}
@@ -187,6 +365,67 @@ def _ensure_csv_schema(data_norm: dict) -> pd.DataFrame:
         row[col] = data_norm.get(col, pd.NA)
     return pd.DataFrame([row], dtype="object")
 
+# -------------------------
+# Hybrid rule + model scoring
+# -------------------------
+# With hybrid mode on, rules that settle the tier with certainty skip the
+# classifier; the regressor still prices every tier.
+HYBRID_RULES = os.getenv("HYBRID_RULES", "0") == "1"
+
+_HYBRID_LOCK = threading.Lock()
+_HYBRID_STATS: Dict[str, Dict[str, float]] = {}
+
+def _rule_row(country: str, policy: str, data: dict) -> dict:
+    """Map a request onto the column names rule_engine / rule_table expect."""
+    row = {
+        "Country": country,
+        "ProductType": policy,
+        "Age": data.get("age"),
+        "SumInsured": data.get("sum_assured"),
+        "AnnualPremium": data.get("annual_premium"),
+        "SmokerDrinker": data.get("smoker_drinker"),
+        "HealthIssues": data.get("diseases"),
+        "PriceOfVehicle": data.get("price_of_vehicle"),
+        "AgeOfVehicle": data.get("age_of_vehicle"),
+        "TypeOfVehicle": data.get("type_of_vehicle"),
+        "TripDurationDays": data.get("trip_duration_days"),
+        "ExistingMedicalCondition": data.get("existing_medical_condition"),
+        "BaggageCoverage": data.get("baggage_coverage"),
+        "TripCancellationCoverage": data.get("trip_cancellation_coverage"),
+        "AccidentCoverage": data.get("accident_coverage"),
+        "HealthCoverage": data.get("health_coverage"),
+        "PropertyValue": data.get("property_value"),
+        "PropertySizeSqFeet": data.get("property_size_sq_feet", data.get("property_size")),
+    }
+    return {k: v for k, v in row.items() if v is not None}
+
+def _record_hybrid(product: str, rule_hit: bool, clf_seconds: Optional[float]) -> None:
+    with _HYBRID_LOCK:
+        st = _HYBRID_STATS.setdefault(
+            product, {"requests": 0, "rule_hits": 0, "clf_calls": 0, "clf_seconds": 0.0}
+        )
+        st["requests"] += 1
+        if rule_hit:
+            st["rule_hits"] += 1
+        if clf_seconds is not None:
+            st["clf_calls"] += 1
+            st["clf_seconds"] += clf_seconds
+
+def hybrid_stats() -> Dict[str, Dict[str, float]]:
+    """Per-product rule-hit rate and classifier time saved by short-circuiting."""
+    out = {}
+    with _HYBRID_LOCK:
+        for product, st in _HYBRID_STATS.items():
+            avg_clf_ms = st["clf_seconds"] / st["clf_calls"] * 1000 if st["clf_calls"] else 0.0
+            out[product] = {
+                "requests": st["requests"],
+                "rule_hits": st["rule_hits"],
+                "rule_hit_rate": round(st["rule_hits"] / st["requests"], 4) if st["requests"] else 0.0,
+                "avg_classifier_ms": round(avg_clf_ms, 3),
+                "est_saved_ms": round(st["rule_hits"] * avg_clf_ms, 3),
+            }
+    return out
+
 # -------------------------
 # Currency conversion
 # -------------------------
@@ -204,13 +443,8 @@ def convert_output_for_country(country: str, premiums_in_inr: Dict[str, float])
 # -------------------------
 # Main Prediction
 # -------------------------
-def predict(country: str, policy: str, data: dict) -> Dict:
-    """
-    Predict recommended tier + all-tier premiums.
-    """
-    print(f"Input data: {data}")
-    print(f"Country: {country}, Policy: {policy}")
-
+def _normalize_input(country: str, policy: str, data: dict) -> Tuple[str, dict]:
+    """Validate one request and map it onto model feature names -> (country, row)."""
     # Normalize country
     country_mapping = {
         "IN": "INDIA",
@@ -352,43 +586,59 @@ def predict(country: str, policy: str, data: dict) -> Dict:
         raise ValueError(f"Invalid data format: {str(e)}")
         
     print(f"Normalized data: {data_norm}")
-    data_norm = pd.DataFrame([data_norm])
-    print(f"Normalized data:\n{data_norm}")
+    return normalized_country, data_norm
 
-    # Load artifacts
-    path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-    clf = load_artifacts(path, "clf")
-    reg = load_artifacts(path, "reg")
-    enc_cls = load_artifacts(path, "encoder_cls")
-    enc_reg = load_artifacts(path, "encoder_reg")
+def _score_rows(country: str, policy: str, normalized_country: str,
+                rows: List[dict], raw: List[dict], hybrid: bool) -> List[Dict]:
+    """Tier + all-tier premiums for normalized rows of one (country, policy), one model call each."""
+    data_norm = pd.DataFrame(rows)
+    print(f"Normalized data:\n{data_norm}")
 
     # Load artifacts
     path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-    clf = load_artifacts(path, "clf")
-    reg = load_artifacts(path, "reg")
-    enc_cls = load_artifacts(path, "encoder_cls")
-    enc_reg = load_artifacts(path, "encoder_reg")
-
-    # Feature lists
-    features_cls = _load_feature_list(path, "features_cls.json") or []
-    features_reg = _load_feature_list(path, "features_reg.json") or features_cls
-
-    exp_cls = _expected_features_from_encoder(enc_cls, features_cls)
-    exp_reg = _expected_features_from_encoder(enc_reg, features_reg if features_reg else features_cls)
+    bundle = get_bundle(path)
+    clf, reg = bundle["clf"], bundle["reg"]
 
-    # Use the normalized DataFrame directly
-    X_enc_cls, _ = preprocess(data_norm, enc_cls)
-    recommended_tier = clf.predict(X_enc_cls)[0]
-
-    confidence: Dict[str, float] = {}
-    if hasattr(clf, "predict_proba"):
-        probs = clf.predict_proba(X_enc_cls)[0]
-        classes = list(clf.classes_)
-        confidence = {c: round(float(p), 4) for c, p in zip(classes, probs)}
+    if bundle["pipeline"] is not None:
+        # Shared pipeline: encode the rows once for both models
+        exp_reg = bundle["pipeline"]["features"]
+        X_enc_cls = X_enc_reg = _encode_for(bundle, data_norm, "cls")
+    else:
+        features_cls = _load_feature_list(bundle["dir"], "features_cls.json") or []
+        features_reg = _load_feature_list(bundle["dir"], "features_reg.json") or features_cls
+        exp_reg = _expected_features_from_encoder(bundle["enc_reg"], features_reg)
+        X_enc_cls = _encode_for(bundle, data_norm, "cls")
+        X_enc_reg = _encode_for(bundle, data_norm, "reg")
+
+    n = len(rows)
+    product = f"{normalized_country.lower()}_{policy.lower()}"
+    rule_rows = [_rule_row(normalized_country, policy, d) for d in raw]
+    rule_tiers = [short_circuit_tier(r) if hybrid else None for r in rule_rows]
+
+    tiers: List = list(rule_tiers)
+    confidence: List[Dict[str, float]] = [{t: 1.0} if t is not None else {} for t in rule_tiers]
+    for i, t in enumerate(rule_tiers):
+        if t is not None:
+            # Deterministic rule: no classifier inference needed
+            print(f"Rule short-circuit: {t}")
+            _record_hybrid(product, True, None)
+
+    todo = [i for i, t in enumerate(rule_tiers) if t is None]
+    if todo:
+        t0 = time.perf_counter()
+        X = X_enc_cls[todo]
+        predicted = clf.predict(X)
+        probs = clf.predict_proba(X) if hasattr(clf, "predict_proba") else None
+        per_row = (time.perf_counter() - t0) / len(todo)
+        for j, i in enumerate(todo):
+            tiers[i] = predicted[j]
+            if probs is not None:
+                confidence[i] = {c: round(float(p), 4) for c, p in zip(list(clf.classes_), probs[j])}
+            _record_hybrid(product, False, per_row)
 
     # ---- Regressor
-    X_enc_reg, _ = preprocess(data_norm, enc_reg)
-    all_tiers: Dict[str, float] = {}
+    all_tiers: List[Dict[str, float]] = [{} for _ in range(n)]
+    priced_by = ["model"] * n
     reg_has_policy_tier = any(_canon(c) == "policytier" for c in exp_reg)
 
     if reg_has_policy_tier:
@@ -396,21 +646,80 @@ def predict(country: str, policy: str, data: dict) -> Dict:
         for t in TIERS:
             data_with_tier = data_norm.copy()
             data_with_tier[tier_col] = t
-            X_enc_reg_t, _ = preprocess(data_with_tier, enc_reg)
-            premium = float(reg.predict(X_enc_reg_t)[0])
-            all_tiers[t] = round(premium, 2)
+            X_enc_reg_t = _encode_for(bundle, data_with_tier, "reg")
+            for i, premium in enumerate(reg.predict(X_enc_reg_t)):
+                all_tiers[i][t] = round(float(premium), 2)
     else:
-        base = float(reg.predict(X_enc_reg)[0])
-        for t in TIERS:
-            all_tiers[t] = round(base * TIER_MULTIPLIER[t], 2)
+        # Low-cardinality policies: precomputed table first, regressor off-grid
+        base: List[Optional[float]] = [None] * n
+        if policy.lower() in GRID_SPECS:
+            for i, row in enumerate(rows):
+                base[i] = grid_premium(bundle["grid"], {_canon(k): v for k, v in row.items()})
+                if base[i] is not None:
+                    priced_by[i] = "grid"
+        off_grid = [i for i in range(n) if base[i] is None]
+        if off_grid:
+            for i, premium in zip(off_grid, reg.predict(X_enc_reg[off_grid])):
+                base[i] = float(premium)
+        for i in range(n):
+            all_tiers[i] = {t: round(base[i] * TIER_MULTIPLIER[t], 2) for t in TIERS}
+
+    return [
+        {
+            "recommended_tier": tiers[i],
+            "all_tiers": convert_output_for_country(country, all_tiers[i]),
+            "confidence": confidence[i],
+            "decided_by": "rule" if rule_tiers[i] is not None else "model",
+            "priced_by": priced_by[i],
+            # Underwriting rule for this profile, for template explanations
+            "rule": explain_rule(rule_rows[i]),
+        }
+        for i in range(n)
+    ]
+
+def predict(country: str, policy: str, data: dict, hybrid: Optional[bool] = None) -> Dict:
+    """
+    Predict recommended tier + all-tier premiums.
+
+    hybrid: let certain rules decide the tier before the classifier runs
+    (defaults to the HYBRID_RULES env flag).
+    """
+    hybrid = HYBRID_RULES if hybrid is None else hybrid
+    print(f"Input data: {data}")
+    print(f"Country: {country}, Policy: {policy}")
+    normalized_country, row = _normalize_input(country, policy, data)
+    return _score_rows(country, policy, normalized_country, [row], [data], hybrid)[0]
 
-    all_tiers = convert_output_for_country(country, all_tiers)
+def predict_batch(requests: List[Tuple[str, str, dict]],
+                  hybrid: Optional[bool] = None) -> List[Union[Dict, Exception]]:
+    """
+    predict() for many (country, policy, data) requests at once.
 
-    return {
-        "recommended_tier": recommended_tier,
-        "all_tiers": all_tiers,
-        "confidence": confidence,
-    }
+    Requests for the same bundle are encoded and scored together (one classifier
+    and one regressor call per bundle). Results come back in input order; a
+    request that fails yields its exception instead of a result.
+    """
+    hybrid = HYBRID_RULES if hybrid is None else hybrid
+    results: List[Union[Dict, Exception]] = [None] * len(requests)
+    groups: Dict[Tuple[str, str], List[Tuple[int, str, dict]]] = {}
+    for idx, (country, policy, data) in enumerate(requests):
+        try:
+            normalized_country, row = _normalize_input(country, policy, data)
+        except Exception as e:
+            results[idx] = e
+            continue
+        groups.setdefault((country.lower(), policy.lower()), []).append((idx, normalized_country, row))
+
+    for (country, policy), members in groups.items():
+        idxs = [m[0] for m in members]
+        try:
+            scored = _score_rows(country, policy, members[0][1], [m[2] for m in members],
+                                 [requests[i][2] for i in idxs], hybrid)
+        except Exception as e:
+            scored = [e] * len(idxs)
+        for i, r in zip(idxs, scored):
+            results[i] = r
+    return results
 
 def predict_probability(data: dict, country: str, policy: str) -> pd.DataFrame:
     """Get probability prediction for a single row."""
@@ -430,13 +739,13 @@ def predict_probability(data: dict, country: str, policy: str) -> pd.DataFrame:
         
         print(f"Normalized data:\n{data_norm}")
         
-        # Load classifier model and encoder
+        # Load classifier model and feature pipeline
         path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-        clf = load_artifacts(path, "clf")
-        enc = load_artifacts(path, "encoder_cls")
+        bundle = get_bundle(path)
+        clf = bundle["clf"]
         
         # Preprocess data
-        X_enc, _ = preprocess(data_norm, enc)
+        X_enc = _encode_for(bundle, data_norm, "cls")
         print(f"Preprocessed data shape: {X_enc.shape}")
         
         # Get probabilities
@@ -467,13 +776,13 @@ def predict_amount(data: dict, country: str, policy: str) -> pd.DataFrame:
         
         print(f"Normalized data:\n{data_norm}")
         
-        # Load regression model and encoder
+        # Load regression model and feature pipeline
         path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-        reg = load_artifacts(path, "reg")
-        enc = load_artifacts(path, "encoder_reg")
+        bundle = get_bundle(path)
+        reg = bundle["reg"]
         
         # Preprocess data
-        X_enc, _ = preprocess(data_norm, enc)
+        X_enc = _encode_for(bundle, data_norm, "reg")
         print(f"Preprocessed data shape: {X_enc.shape}")
         
         # Get prediction
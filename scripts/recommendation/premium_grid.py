@@ -0,0 +1,427 @@
+# scripts/recommendation/premium_grid.py
+"""
+Precomputed premium lookup tables for low-cardinality policies.
+
+Offline: the premium regressor of a (country, policy) bundle is evaluated once
+over a grid of its inputs (every categorical value × numeric breakpoints) and
+saved as premium_grid.npz next to that regressor. train.py builds it into each
+new version dir before the manifest is written, so the table ships (and is
+checksummed) with the models it was built from. The CLI below rebuilds it for
+the live models as a new published version; it never edits a live version.
+
+HGB is piecewise constant between the split thresholds it actually uses, so
+when the cross product of those thresholds fits in MAX_CELLS the table is exact
+("step" axes, no interpolation). Otherwise numeric axes are quantized to
+quantile points and interpolated multilinearly, refining until the measured
+error meets BUILD_ERROR_TARGET or the size cap is hit.
+
+Serving: predict.py loads the table with the rest of the bundle (load_grid) and
+`grid_premium()` prices one row by table lookup. Rows off the grid
+(unknown category, value outside a quantized axis, missing input), stale tables
+and tables measured worse than PREMIUM_GRID_MAX_ERROR return None -> use the model.
+
+    python -m scripts.recommendation.premium_grid --country india
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .bundles import (
+        MANIFEST, current_version, load_manifest, new_version_id, prune_versions,
+        publish_version, version_dir, write_manifest,
+    )
+    from .common import ARTIFACTS, encode_with_pipeline, load_artifacts, load_feature_pipeline
+except ImportError:  # run directly as a script
+    from bundles import (
+        MANIFEST, current_version, load_manifest, new_version_id, prune_versions,
+        publish_version, version_dir, write_manifest,
+    )
+    from common import ARTIFACTS, encode_with_pipeline, load_artifacts, load_feature_pipeline
+
+GRID_FILE = "premium_grid.npz"
+GRID_VERSION = 1
+
+# Numeric inputs interpolated per policy -> starting number of grid points.
+# Numeric pipeline features not listed are held missing, as predict() sends them.
+GRID_SPECS: Dict[str, Dict[str, int]] = {
+    "vehicle": {"age": 16, "priceofvehicle": 32, "ageofvehicle": 16},
+    "travel": {"age": 16, "tripdurationdays": 32},
+}
+
+MAX_CELLS = 2_000_000      # refuse grids larger than this (≈16 MB of float64)
+MAX_REFINEMENTS = 2        # double the numeric points at most this many times
+BUILD_ERROR_TARGET = 0.01  # p99 relative error the builder refines towards
+
+# Serving-side bound: tables measured worse than this are ignored
+PREMIUM_GRID_MAX_ERROR = float(os.getenv("PREMIUM_GRID_MAX_ERROR", "0.02"))
+
+MISSING = "__missing__"  # same placeholder encode_with_pipeline uses
+
+
+# -----------------------------
+# Grid axes
+# -----------------------------
+def _numeric_axis(values: pd.Series, points: int) -> np.ndarray:
+    """Exact values for small integer-like domains, else quantile points over the observed range."""
+    v = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=float)
+    uniq = np.unique(v)
+    if len(uniq) <= points:
+        return uniq
+    qs = np.quantile(v, np.linspace(0.0, 1.0, points))
+    return np.unique(qs)
+
+
+def _split_thresholds(reg, column: int) -> np.ndarray:
+    """Sorted numeric thresholds the fitted HGB splits `column` of the encoded matrix on."""
+    found = set()
+    for trees in reg._predictors:
+        for tree in trees:
+            nodes = tree.nodes[~tree.nodes["is_leaf"].astype(bool)]
+            found.update(nodes["num_threshold"][nodes["feature_idx"] == column].tolist())
+    return np.array(sorted(found), dtype=float)
+
+
+def _step_points(thresholds: np.ndarray) -> np.ndarray:
+    """One evaluation point per constant piece: x <= t0, t0 < x <= t1, ..., x > t_last."""
+    if len(thresholds) == 0:
+        return np.zeros(1)
+    return np.append(thresholds, np.nextafter(thresholds[-1], np.inf))
+
+
+def _cat_axes(pipeline: dict) -> List[Dict]:
+    axes = []
+    for col, cats in zip(pipeline["cat_cols"], pipeline["encoder"].categories_):
+        values = np.asarray([str(c) for c in cats])
+        axes.append({"name": col, "kind": "cat", "values": values, "points": values})
+    return axes
+
+
+def _exact_axes(reg, pipeline: dict, spec: Dict[str, int]) -> List[Dict]:
+    """Categorical axes + one step axis per spec'd numeric input (numeric columns encode first)."""
+    axes = _cat_axes(pipeline)
+    for col in spec:
+        if col in pipeline["num_cols"]:
+            thr = _split_thresholds(reg, pipeline["num_cols"].index(col))
+            axes.append({"name": col, "kind": "step", "values": thr, "points": _step_points(thr)})
+    return axes
+
+
+def _quantized_axes(X: pd.DataFrame, pipeline: dict, spec: Dict[str, int], scale: int) -> List[Dict]:
+    """Categorical axes + interpolated numeric axes with `points * scale` quantile points."""
+    axes = _cat_axes(pipeline)
+    for col, points in spec.items():
+        if col in pipeline["num_cols"]:
+            values = _numeric_axis(X[col], points * scale)
+            axes.append({"name": col, "kind": "num", "values": values, "points": values})
+    return axes
+
+
+def _grid_frame(axes: List[Dict], features: List[str], flat: np.ndarray) -> pd.DataFrame:
+    """Rows for the given flat cell indices; features off the grid stay missing."""
+    shape = tuple(len(a["points"]) for a in axes)
+    idx = np.unravel_index(flat, shape)
+    cols = {a["name"]: a["points"][i] for a, i in zip(axes, idx)}
+    return pd.DataFrame(cols).reindex(columns=features)
+
+
+def _n_cells(axes: List[Dict]) -> int:
+    return int(np.prod([len(a["points"]) for a in axes]))
+
+
+# -----------------------------
+# Lookup table
+# -----------------------------
+class PremiumGrid:
+    """Array-backed premium table with per-axis category maps and numeric breakpoints."""
+
+    def __init__(self, values: np.ndarray, axes: List[Dict], meta: Dict):
+        self.values = values.ravel()
+        self.meta = meta
+        self.names = [a["name"] for a in axes]
+        shape = [len(a["values"]) + (a["kind"] == "step") for a in axes]
+        strides = np.cumprod([1] + shape[::-1][:-1])[::-1]
+
+        self._cat = []   # (name, {category: offset})
+        self._step = []  # (name, split thresholds, stride)
+        self._num = []   # (name, breakpoints, stride)
+        for a, stride in zip(axes, strides):
+            if a["kind"] == "cat":
+                self._cat.append((a["name"], {str(c): i * int(stride) for i, c in enumerate(a["values"])}))
+            elif a["kind"] == "step":
+                self._step.append((a["name"], [float(x) for x in a["values"]], int(stride)))
+            else:
+                self._num.append((a["name"], [float(x) for x in a["values"]], int(stride)))
+
+    def lookup(self, row: Dict) -> Optional[float]:
+        """Interpolated base premium for one row of canonical features, or None if off-grid."""
+        base = 0
+        for name, offsets in self._cat:
+            val = row.get(name)
+            key = MISSING if val is None or (isinstance(val, float) and np.isnan(val)) else str(val)
+            off = offsets.get(key)
+            if off is None:
+                return None
+            base += off
+
+        for name, thr, stride in self._step:
+            try:
+                x = float(row.get(name))
+            except (TypeError, ValueError):
+                return None
+            if x != x:  # NaN
+                return None
+            # HGB sends x <= threshold left, so the piece index is #thresholds < x
+            base += bisect.bisect_left(thr, x) * stride
+
+        corners = [(base, 1.0)]
+        for name, pts, stride in self._num:
+            try:
+                x = float(row.get(name))
+            except (TypeError, ValueError):
+                return None
+            if not (pts[0] <= x <= pts[-1]):  # also rejects NaN
+                return None
+            i = min(bisect.bisect_right(pts, x) - 1, len(pts) - 2)
+            if i < 0:  # single-point axis
+                continue
+            w = (x - pts[i]) / (pts[i + 1] - pts[i])
+            lo, hi = i * stride, (i + 1) * stride
+            nxt = []
+            for off, cw in corners:
+                if w < 1.0:
+                    nxt.append((off + lo, cw * (1.0 - w)))
+                if w > 0.0:
+                    nxt.append((off + hi, cw * w))
+            corners = nxt
+
+        return float(sum(self.values[off] * cw for off, cw in corners))
+
+    def lookup_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Row-wise lookup; NaN where the row falls off the grid."""
+        out = np.full(len(df), np.nan)
+        for i, row in enumerate(df.to_dict("records")):
+            v = self.lookup(row)
+            if v is not None:
+                out[i] = v
+        return out
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def _reg_stamp(path: Path) -> int:
+    return (path / "reg.pkl").stat().st_mtime_ns
+
+
+def save_grid(path: Path, grid_values: np.ndarray, axes: List[Dict], meta: Dict) -> Path:
+    arrays = {"values": grid_values}
+    for i, a in enumerate(axes):
+        arrays[f"axis_{i}"] = a["values"].astype(str) if a["kind"] == "cat" else a["values"]
+    meta = {**meta, "axes": [{"name": a["name"], "kind": a["kind"]} for a in axes]}
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    fd, tmp = tempfile.mkstemp(dir=path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path / GRID_FILE)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path / GRID_FILE
+
+
+def load_grid(path: Path) -> Optional[PremiumGrid]:
+    """Load a bundle's grid; None if absent or built from a different reg.pkl."""
+    f = path / GRID_FILE
+    if not f.exists():
+        return None
+    with np.load(f, allow_pickle=False) as z:
+        meta = json.loads(str(z["meta"]))
+        if meta.get("version") != GRID_VERSION:
+            return None
+        axes = [{**a, "values": z[f"axis_{i}"]} for i, a in enumerate(meta["axes"])]
+        values = z["values"]
+    if meta.get("reg_stamp") != _reg_stamp(path):
+        print(f"⚠️  {f} is older than reg.pkl; ignoring it until rebuilt")
+        return None
+    return PremiumGrid(values, axes, meta)
+
+
+def grid_premium(grid: Optional[PremiumGrid], row: Dict, max_error: Optional[float] = None) -> Optional[float]:
+    """Base premium from a bundle's lookup table (bundle["grid"]), or None to fall back to the regressor."""
+    if grid is None:
+        return None
+    bound = PREMIUM_GRID_MAX_ERROR if max_error is None else max_error
+    if grid.meta["p99_rel_error"] > bound:
+        return None
+    return grid.lookup(row)
+
+
+# -----------------------------
+# Offline build
+# -----------------------------
+def _validation_rows(sample: pd.DataFrame, axes: List[Dict], features: List[str]) -> pd.DataFrame:
+    """Real training rows, with off-grid features held missing like at serving time."""
+    on_grid = {a["name"] for a in axes}
+    sample = sample.reindex(columns=features).copy()
+    for col in features:
+        if col not in on_grid:
+            sample[col] = np.nan
+    return sample
+
+
+def _measure(grid: PremiumGrid, sample: pd.DataFrame, reg, pipeline: dict) -> Dict:
+    approx = grid.lookup_frame(sample)
+    inside = ~np.isnan(approx)
+    if not inside.any():
+        return {"coverage": 0.0, "p99_rel_error": float("inf"), "max_rel_error": float("inf")}
+    exact = reg.predict(encode_with_pipeline(sample[inside], pipeline))
+    rel = np.abs(approx[inside] - exact) / np.maximum(np.abs(exact), 1.0)
+    return {
+        "coverage": round(float(inside.mean()), 4),
+        "p99_rel_error": float(np.quantile(rel, 0.99)),
+        "max_rel_error": float(rel.max()),
+    }
+
+
+def build_grid(country: str, policy: str, X: pd.DataFrame, path: Path,
+               target_error: float = BUILD_ERROR_TARGET) -> Optional[Dict]:
+    """
+    Evaluate the regressor in `path` over the grid, refining until
+    `target_error` or the size cap, and save premium_grid.npz there. `path` is
+    a version dir that is not live yet: write its manifest afterwards.
+    """
+    policy = policy.lower()
+    spec = GRID_SPECS.get(policy)
+    pipeline = load_feature_pipeline(path) if (path / "reg.pkl").exists() else None
+    if spec is None or pipeline is None:
+        print(f"⚠️  No grid for {country}-{policy} (unsupported policy or no pipeline bundle)")
+        return None
+    reg = load_artifacts(path, "reg")
+    features = pipeline["features"]
+
+    sample = X.sample(min(5000, len(X)), random_state=0)
+
+    def evaluate(axes: List[Dict]):
+        n_cells = _n_cells(axes)
+        values = np.empty(n_cells)
+        for start in range(0, n_cells, 200_000):
+            flat = np.arange(start, min(start + 200_000, n_cells))
+            values[flat] = reg.predict(encode_with_pipeline(_grid_frame(axes, features, flat), pipeline))
+        grid = PremiumGrid(values, axes, {})
+        err = _measure(grid, _validation_rows(sample, axes, features), reg, pipeline)
+        return values, err
+
+    best = None
+    axes = _exact_axes(reg, pipeline, spec)
+    if _n_cells(axes) <= MAX_CELLS:
+        values, err = evaluate(axes)
+        print(f"   exact: {_n_cells(axes):,} cells, p99 err {err['p99_rel_error']:.4%}")
+        best = (values, axes, err, "exact")
+    else:
+        print(f"   exact grid needs {_n_cells(axes):,} cells; quantizing")
+        for r in range(MAX_REFINEMENTS + 1):
+            axes = _quantized_axes(X, pipeline, spec, 2 ** r)
+            if _n_cells(axes) > MAX_CELLS:
+                print(f"   {_n_cells(axes):,} cells exceeds MAX_CELLS; keeping the previous grid")
+                break
+            values, err = evaluate(axes)
+            print(f"   refine {r}: {_n_cells(axes):,} cells, p99 err {err['p99_rel_error']:.4%}, "
+                  f"max {err['max_rel_error']:.4%}, coverage {err['coverage']:.1%}")
+            best = (values, axes, err, "quantized")
+            if err["p99_rel_error"] <= target_error:
+                break
+
+    if best is None:
+        return None
+    values, axes, err, mode = best
+    meta = {"version": GRID_VERSION, "country": country.lower(), "policy": policy, "mode": mode,
+            "cells": _n_cells(axes), "reg_stamp": _reg_stamp(path), **err}
+    out = save_grid(path, values.reshape([len(a["points"]) for a in axes]), axes, meta)
+    print(f"✅ Saved {out} ({out.stat().st_size / 1024:.0f} KB)")
+    return meta
+
+
+def publish_grid(country: str, policy: str, X: pd.DataFrame) -> Optional[Dict]:
+    """
+    Rebuild the grid for the live models as a new version: copy the live
+    version, build premium_grid.npz in the copy, rewrite its manifest and
+    publish it. Legacy (unversioned) bundles get the grid in place.
+    """
+    bundle_root = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
+    live = current_version(bundle_root)
+    if live is None:
+        return build_grid(country, policy, X, bundle_root)
+
+    version = new_version_id()
+    vdir = version_dir(bundle_root, version)
+    if vdir.exists():
+        raise ValueError(f"{vdir} already exists")
+    # copy2 keeps reg.pkl's mtime, which the grid records as reg_stamp
+    shutil.copytree(version_dir(bundle_root, live), vdir)
+    for stale in (MANIFEST, GRID_FILE):
+        (vdir / stale).unlink(missing_ok=True)
+    try:
+        meta = build_grid(country, policy, X, vdir)
+    except BaseException:
+        shutil.rmtree(vdir, ignore_errors=True)
+        raise
+    if meta is None:
+        shutil.rmtree(vdir, ignore_errors=True)
+        return None
+
+    manifest = load_manifest(version_dir(bundle_root, live)) or {}
+    carried = {k: v for k, v in manifest.items()
+               if k not in ("manifest_version", "version", "created_at", "files")}
+    write_manifest(vdir, {**carried, "rebuilt_from": live})
+    publish_version(bundle_root, version)
+    prune_versions(bundle_root)
+    print(f"✅ Published {version} (models from {live}, new premium grid)")
+    return meta
+
+
+def build_all(country: str, data_path: str) -> Dict[str, Dict]:
+    try:
+        from .train import load_training_frame, prepare_xy
+    except ImportError:
+        from train import load_training_frame, prepare_xy
+
+    df = load_training_frame(data_path, country=country, policies=list(GRID_SPECS))
+    report = {}
+    for policy in GRID_SPECS:
+        print("\n" + "=" * 68)
+        print(f"🧮 Premium grid {country.upper()} — {policy.upper()}")
+        print("=" * 68)
+        prepared = prepare_xy(country, df, policy)
+        if prepared is None:
+            continue
+        meta = publish_grid(country, policy, prepared[0])
+        if meta is not None:
+            report[policy] = meta
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute premium lookup grids")
+    parser.add_argument("--country", default="india", help="india | australia")
+    parser.add_argument("--data", default=None, help="Training data (default: processed/standardized_<country>.parquet)")
+    args = parser.parse_args()
+
+    base = Path("processed")
+    data = args.data or str(base / f"standardized_{args.country.lower()}.parquet")
+    if args.data is None and not Path(data).exists():
+        data = str(base / f"standardized_{args.country.lower()}.csv")
+    build_all(args.country, data)
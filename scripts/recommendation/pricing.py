@@ -0,0 +1,106 @@
+# recommendation/pricing.py
+# Array-native IDV and premium calculators for bulk quoting.
+# Same rate tables as predict.py / rule_engine.py, precomputed into sorted
+# slab arrays so a whole portfolio is priced with searchsorted + take.
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .predict import (
+    PROPERTY_AGE_FACTORS,
+    PROPERTY_AGE_THRESHOLDS,
+    PROPERTY_BASE_RATE,
+    PROPERTY_TYPE_MULTIPLIER,
+    VEHICLE_BASE_PREMIUM,
+    VEHICLE_DEPRECIATION,
+)
+from .rule_table import idv_vectorized
+
+# --------------------------
+# Slab tables
+# --------------------------
+# predict.calculate_vehicle_idv: depreciation by min(age, 5) whole years
+_VEHICLE_DEP = np.array([VEHICLE_DEPRECIATION[a] for a in sorted(VEHICLE_DEPRECIATION)], dtype=float)
+_VEHICLE_DEP_MAX_AGE = max(VEHICLE_DEPRECIATION)
+_VEHICLE_DEFAULT_RATE = 0.03  # car rate, same default as the scalar version
+
+_PROPERTY_AGE_BOUNDS = np.array(PROPERTY_AGE_THRESHOLDS, dtype=float)
+_PROPERTY_AGE_FACTORS = np.array(PROPERTY_AGE_FACTORS, dtype=float)
+_PROPERTY_DEFAULT_TYPE_MULT = 1.2
+
+# rule_engine.calculate_idv, vectorized (IRDAI slabs)
+calculate_idv_vectorized = idv_vectorized
+
+
+def _lookup(labels, table: Dict[str, float], default: float) -> np.ndarray:
+    """Case-insensitive dict lookup over a column; factorized so each label is looked up once."""
+    codes, uniques = pd.factorize(pd.Series(labels, dtype=object).astype(str).str.lower())
+    rates = np.array([table.get(u, default) for u in uniques] + [default], dtype=float)
+    return rates[np.where(codes < 0, len(uniques), codes)]
+
+
+# --------------------------
+# Vehicle
+# --------------------------
+def calculate_vehicle_idv_vectorized(price, age, vehicle_type) -> Tuple[np.ndarray, np.ndarray]:
+    """Array version of predict.calculate_vehicle_idv -> (idv, annual_premium)."""
+    price = np.asarray(price, dtype=float)
+    slab = np.clip(np.asarray(age, dtype=float), 0, _VEHICLE_DEP_MAX_AGE).astype(int)
+    idv = price * (1 - _VEHICLE_DEP[slab])
+    premium = idv * _lookup(vehicle_type, VEHICLE_BASE_PREMIUM, _VEHICLE_DEFAULT_RATE)
+    return idv, premium
+
+
+# --------------------------
+# Property
+# --------------------------
+def calculate_property_premium_vectorized(value, age, property_type, size) -> np.ndarray:
+    """Array version of predict.calculate_property_premium (rounded to 2 dp)."""
+    value = np.asarray(value, dtype=float)
+    slab = np.searchsorted(_PROPERTY_AGE_BOUNDS, np.asarray(age, dtype=float), side="right") - 1
+    age_mult = np.where(slab >= 0, _PROPERTY_AGE_FACTORS[np.maximum(slab, 0)], 1.0)
+    type_mult = _lookup(property_type, PROPERTY_TYPE_MULTIPLIER, _PROPERTY_DEFAULT_TYPE_MULT)
+    size_mult = 1.0 + np.maximum(0, (np.asarray(size, dtype=float) - 1000) / 1000) * 0.05
+    return np.round(value * PROPERTY_BASE_RATE * age_mult * type_mult * size_mult, 2)
+
+
+# --------------------------
+# Bulk quoting
+# --------------------------
+def quote_vehicle_portfolio(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reprice a vehicle book in one call.
+    Needs price_of_vehicle, age_of_vehicle, type_of_vehicle; adds idv + annual_premium.
+    """
+    out = df.copy()
+    idv, premium = calculate_vehicle_idv_vectorized(
+        pd.to_numeric(df["price_of_vehicle"], errors="coerce").fillna(0),
+        pd.to_numeric(df["age_of_vehicle"], errors="coerce").fillna(0),
+        df["type_of_vehicle"].fillna("car"),
+    )
+    out["idv"] = idv
+    out["annual_premium"] = premium
+    return out
+
+
+def quote_property_portfolio(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reprice a property book in one call.
+    Needs property_value, property_age, property_type, property_size_sq_feet;
+    adds annual_premium. Missing/invalid inputs get the same defaults as predict().
+    """
+    out = df.copy()
+    size = pd.to_numeric(df.get("property_size_sq_feet", 1000), errors="coerce")
+    size = pd.Series(size, index=df.index).fillna(1000)
+    size = size.where(size > 0, 1000)
+    ptype = df["property_type"].fillna("house").astype(str).str.lower()
+    ptype = ptype.where(ptype.isin(list(PROPERTY_TYPE_MULTIPLIER)), "house")
+    out["annual_premium"] = calculate_property_premium_vectorized(
+        pd.to_numeric(df["property_value"], errors="coerce").fillna(0),
+        pd.to_numeric(df["property_age"], errors="coerce").fillna(0),
+        ptype,
+        size,
+    )
+    return out
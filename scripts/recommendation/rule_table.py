@@ -0,0 +1,502 @@
+# recommendation/rule_table.py
+# Table-driven, vectorized version of rule_engine.py
+# Same rules, written as data: inputs, risk weights, thresholds and tier
+# cutoffs per (country, product). Each spec compiles to NumPy operations
+# over a whole DataFrame, so millions of rows are labelled in one pass.
+
+import operator
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Inputs: name -> (source column, kind, default)
+# Mirrors the row.get(...) casts in rule_engine.py:
+#   int   -> int(x or 0)         (truncates)
+#   float -> float(x or 0)
+#   str   -> str(x).lower()
+# --------------------------
+INPUTS: Dict[str, Tuple[str, str, object]] = {
+    "age":            ("Age", "int", 0),
+    "sum_insured":    ("SumInsured", "float", 0),
+    "premium":        ("AnnualPremium", "float", 0),
+    "smoker":         ("SmokerDrinker", "str", "No"),
+    "disease":        ("HealthIssues", "str", "none"),
+    "price":          ("PriceOfVehicle", "float", 0),
+    "vehicle_age":    ("AgeOfVehicle", "int", 0),
+    "vtype":          ("TypeOfVehicle", "str", ""),
+    "duration":       ("TripDurationDays", "int", 0),
+    "medical":        ("ExistingMedicalCondition", "str", "No"),
+    "baggage":        ("BaggageCoverage", "str", "No"),
+    "trip_cancel":    ("TripCancellationCoverage", "str", "No"),
+    "accident":       ("AccidentCoverage", "str", "No"),
+    "health_cover":   ("HealthCoverage", "str", "No"),
+    "value":          ("PropertyValue", "float", 0),
+    "size":           ("PropertySizeSqFeet", "float", 0),
+}
+
+# IRDAI IDV slabs (see rule_engine.calculate_idv): age < bound -> depreciation
+IDV_AGE_BOUNDS = np.array([0.5, 1, 2, 3, 4, 5], dtype=float)
+IDV_DEPRECIATION = np.array([0.05, 0.15, 0.20, 0.30, 0.40, 0.50, 0.60], dtype=float)
+
+# Shared coverage counter for travel products
+_COVERAGE = [
+    (("eq", "baggage", "yes"), 1),
+    (("eq", "trip_cancel", "yes"), 1),
+    (("eq", "accident", "yes"), 1),
+    (("eq", "health_cover", "yes"), 1),
+]
+
+# --------------------------
+# Rule table
+#   scores : name -> [(condition, weight)]  (weighted sums of conditions)
+#   derived: name -> ("idv", price, age)
+#   tiers  : ordered [(condition, tier)]; first match wins
+#   default: tier when nothing matches (None = no decision)
+# Conditions: (op, name, value) with op in lt/le/gt/ge/eq/ne/in,
+#             ("and", c1, c2, ...), ("or", c1, c2, ...)
+# --------------------------
+RULE_TABLE: Dict[Tuple[str, str], Dict] = {
+    ("india", "health"): {
+        "scores": {"risk": [
+            (("eq", "smoker", "yes"), 1),
+            (("ne", "disease", "none"), 1),
+            (("ge", "age", 45), 1),
+            (("ge", "age", 60), 2),
+        ]},
+        "tiers": [
+            (("or", ("gt", "sum_insured", 1500000), ("gt", "premium", 50000)), "Premium"),
+            (("le", "risk", 0), "Basic"),
+            (("le", "risk", 1), "Standard"),
+            (("le", "risk", 2), "Gold"),
+        ],
+        "default": "Premium",
+    },
+    ("india", "life"): {
+        "scores": {"risk": [
+            (("eq", "smoker", "yes"), 2),
+            (("ne", "disease", "none"), 1),
+            (("ge", "age", 50), 1),
+            (("ge", "age", 65), 2),
+        ]},
+        "tiers": [
+            (("gt", "premium", 100000), "Premium"),
+            (("le", "risk", 0), "Basic"),
+            (("le", "risk", 2), "Standard"),
+            (("le", "risk", 3), "Gold"),
+        ],
+        "default": "Premium",
+    },
+    ("india", "vehicle"): {
+        "derived": {"idv": ("idv", "price", "vehicle_age")},
+        "scores": {"type_risk": [
+            (("in", "vtype", ["luxury", "truck"]), 1),
+            (("eq", "vtype", "bike"), 0.5),
+        ]},
+        "tiers": [
+            (("and", ("lt", "idv", 200000), ("eq", "type_risk", 0)), "Basic"),
+            (("or", ("and", ("ge", "idv", 200000), ("lt", "idv", 600000)), ("gt", "type_risk", 0)), "Standard"),
+            (("and", ("ge", "idv", 600000), ("lt", "idv", 1500000)), "Gold"),
+            (("ge", "idv", 1500000), "Premium"),
+        ],
+        "default": None,
+    },
+    ("india", "travel"): {
+        "scores": {
+            "risk": [
+                (("gt", "duration", 15), 1),
+                (("eq", "medical", "yes"), 1),
+            ],
+            "coverage": _COVERAGE,
+        },
+        "tiers": [
+            (("eq", "coverage", 1), "Basic"),
+            (("and", ("eq", "coverage", 2), ("eq", "risk", 0)), "Standard"),
+            (("eq", "coverage", 2), "Gold"),
+            (("and", ("eq", "coverage", 3), ("le", "risk", 1)), "Gold"),
+            (("eq", "coverage", 3), "Premium"),
+            (("eq", "coverage", 4), "Premium"),
+        ],
+        "default": None,
+    },
+    # The scalar house rules compute an age/type risk score but never use it,
+    # so it is left out here.
+    ("india", "house"): {
+        "tiers": [
+            (("and", ("lt", "value", 2000000), ("lt", "size", 800)), "Basic"),
+            (("or", ("and", ("ge", "value", 2000000), ("lt", "value", 10000000)), ("lt", "size", 1500)), "Standard"),
+            (("or", ("and", ("ge", "value", 10000000), ("lt", "value", 30000000)), ("lt", "size", 3000)), "Gold"),
+        ],
+        "default": "Premium",
+    },
+    ("australia", "health"): {
+        "scores": {"risk": [
+            (("eq", "smoker", "yes"), 2),
+            (("ne", "disease", "none"), 2),
+            (("ge", "age", 50), 1),
+            (("ge", "age", 65), 2),
+        ]},
+        "tiers": [
+            (("gt", "sum_insured", 2000000), "Premium"),
+            (("le", "risk", 0), "Basic"),
+            (("le", "risk", 2), "Standard"),
+            (("le", "risk", 4), "Gold"),
+        ],
+        "default": "Premium",
+    },
+    ("australia", "life"): {
+        "scores": {"risk": [
+            (("eq", "smoker", "yes"), 2),
+            (("ge", "age", 55), 2),
+            (("ge", "age", 70), 2),
+        ]},
+        "tiers": [
+            (("gt", "premium", 150000), "Premium"),
+            (("le", "risk", 0), "Basic"),
+            (("le", "risk", 2), "Standard"),
+            (("le", "risk", 4), "Gold"),
+        ],
+        "default": "Premium",
+    },
+    ("australia", "vehicle"): {
+        "derived": {"idv": ("idv", "price", "vehicle_age")},
+        "scores": {"type_risk": [
+            (("in", "vtype", ["luxury", "truck"]), 1),
+            (("eq", "vtype", "bike"), 0.5),
+        ]},
+        "tiers": [
+            (("and", ("lt", "idv", 5000), ("eq", "type_risk", 0)), "Basic"),
+            (("or", ("and", ("ge", "idv", 5000), ("lt", "idv", 15000)), ("gt", "type_risk", 0)), "Standard"),
+            (("and", ("ge", "idv", 15000), ("lt", "idv", 30000)), "Gold"),
+            (("ge", "idv", 30000), "Premium"),
+        ],
+        "default": None,
+    },
+    ("australia", "travel"): {
+        "scores": {
+            "risk": [
+                (("gt", "duration", 20), 1),
+                (("eq", "medical", "yes"), 2),
+            ],
+            "coverage": _COVERAGE,
+        },
+        "tiers": [
+            (("eq", "coverage", 1), "Basic"),
+            (("and", ("eq", "coverage", 2), ("eq", "risk", 0)), "Standard"),
+            (("eq", "coverage", 2), "Gold"),
+            (("and", ("eq", "coverage", 3), ("le", "risk", 2)), "Gold"),
+            (("eq", "coverage", 3), "Premium"),
+            (("eq", "coverage", 4), "Premium"),
+        ],
+        "default": None,
+    },
+    ("australia", "house"): {
+        "tiers": [
+            (("and", ("lt", "value", 300000), ("lt", "size", 1000)), "Basic"),
+            (("or", ("and", ("ge", "value", 300000), ("lt", "value", 1000000)), ("lt", "size", 2000)), "Standard"),
+            (("or", ("and", ("ge", "value", 1000000), ("lt", "value", 3000000)), ("lt", "size", 4000)), "Gold"),
+        ],
+        "default": "Premium",
+    },
+}
+
+
+# --------------------------
+# Compiler
+# --------------------------
+
+class _Labels(NamedTuple):
+    """Factorized string column: conditions run on the few unique labels, then take by code."""
+    codes: np.ndarray
+    labels: np.ndarray
+
+    def take(self, idx: np.ndarray) -> "_Labels":
+        return _Labels(self.codes[idx], self.labels)
+
+
+def idv_vectorized(price: np.ndarray, age_years: np.ndarray) -> np.ndarray:
+    """Array version of rule_engine.calculate_idv (slab lookup via searchsorted)."""
+    slab = np.searchsorted(IDV_AGE_BOUNDS, np.asarray(age_years, dtype=float), side="right")
+    return np.maximum(np.asarray(price, dtype=float) * (1 - IDV_DEPRECIATION[slab]), 0)
+
+
+def _labels(values: pd.Series, default) -> _Labels:
+    codes, uniques = pd.factorize(values)
+    # Missing values (code -1) map to the default, appended as the last label
+    labels = np.array([str(u).lower() for u in uniques] + [str(default).lower()], dtype=object)
+    return _Labels(np.where(codes < 0, len(uniques), codes), labels)
+
+
+def _column(df: pd.DataFrame, name: str):
+    col, kind, default = INPUTS[name]
+    if col not in df.columns:
+        values = pd.Series(np.nan, index=df.index)
+    else:
+        values = df[col]
+    if kind == "str":
+        return _labels(values, default)
+    num = pd.to_numeric(values, errors="coerce").fillna(default).to_numpy(dtype=float)
+    return np.trunc(num) if kind == "int" else num
+
+
+def _on(arr, fn) -> np.ndarray:
+    if isinstance(arr, _Labels):
+        return np.asarray(fn(arr.labels), dtype=bool)[arr.codes]
+    return np.asarray(fn(arr), dtype=bool)
+
+
+def _compile_condition(cond) -> Callable[[Dict], np.ndarray]:
+    op = cond[0]
+    if op in ("and", "or"):
+        parts = [_compile_condition(c) for c in cond[1:]]
+        combine = np.logical_and if op == "and" else np.logical_or
+        return lambda env: combine.reduce([p(env) for p in parts])
+
+    _, name, value = cond
+    if op == "in":
+        options = list(value)
+        return lambda env: _on(env[name], lambda a: np.isin(a, options))
+    compare = {
+        "lt": np.less, "le": np.less_equal,
+        "gt": np.greater, "ge": np.greater_equal,
+        "eq": np.equal, "ne": np.not_equal,
+    }[op]
+    return lambda env: _on(env[name], lambda a: compare(a, value))
+
+
+def _names_in(cond) -> List[str]:
+    if cond[0] in ("and", "or"):
+        return [n for c in cond[1:] for n in _names_in(c)]
+    return [cond[1]]
+
+
+def spec_inputs(spec: Dict) -> List[str]:
+    """Input columns (INPUTS keys) a rule-table entry reads."""
+    needed = set()
+    for terms in spec.get("scores", {}).values():
+        for c, _ in terms:
+            needed.update(_names_in(c))
+    for c, _ in spec["tiers"]:
+        needed.update(_names_in(c))
+    for _, a, b in spec.get("derived", {}).values():
+        needed.update([a, b])
+    return sorted(n for n in needed if n in INPUTS)
+
+
+def compile_spec(spec: Dict) -> Callable[[Dict, int], np.ndarray]:
+    """Compile one rule-table entry into (inputs, n_rows) -> array of tiers (None = no decision)."""
+    derived = spec.get("derived", {})
+    scores = {
+        name: [(_compile_condition(c), w) for c, w in terms]
+        for name, terms in spec.get("scores", {}).items()
+    }
+    tiers = [(_compile_condition(c), t) for c, t in spec["tiers"]]
+    choices = np.array([t for _, t in tiers] + [spec.get("default")], dtype=object)
+
+    def evaluate(inputs: Dict, n: int) -> np.ndarray:
+        env = dict(inputs)
+        for name, (_, price, age) in derived.items():
+            env[name] = idv_vectorized(env[price], env[age])
+        for name, terms in scores.items():
+            total = np.zeros(n)
+            for cond, weight in terms:
+                total += cond(env) * weight
+            env[name] = total
+        # Index of the first matching clause (len(tiers) = default)
+        first = np.select([cond(env) for cond, _ in tiers], np.arange(len(tiers)), default=len(tiers))
+        return choices[first]
+
+    return evaluate
+
+
+COMPILED_RULES = {key: (spec_inputs(spec), compile_spec(spec)) for key, spec in RULE_TABLE.items()}
+
+
+def apply_rules_frame(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized apply_rules: one tier (or None) per row, aligned to df.index.
+    Each input column is parsed once; rows are then grouped by
+    (Country, ProductType) and each group is labelled in one pass.
+    """
+    out = np.full(len(df), None, dtype=object)
+    if df.empty:
+        return pd.Series(out, index=df.index, dtype=object)
+
+    country = _labels(df["Country"] if "Country" in df.columns else pd.Series(np.nan, index=df.index), "")
+    product = _labels(df["ProductType"] if "ProductType" in df.columns else pd.Series(np.nan, index=df.index), "")
+    parsed: Dict[str, object] = {}
+
+    for (c, p), (names, evaluate) in COMPILED_RULES.items():
+        mask = _on(country, lambda a: a == c) & _on(product, lambda a: a == p)
+        idx = np.flatnonzero(mask)
+        if not len(idx):
+            continue
+        for name in names:
+            if name not in parsed:
+                parsed[name] = _column(df, name)
+        inputs = {
+            name: parsed[name].take(idx) if isinstance(parsed[name], _Labels) else parsed[name][idx]
+            for name in names
+        }
+        out[idx] = evaluate(inputs, len(idx))
+    return pd.Series(out, index=df.index, dtype=object)
+
+
+# --------------------------
+# Short-circuit rules (single row)
+# --------------------------
+# Clauses that settle the tier with certainty whatever the model says.
+# Used by predict(hybrid=True) to skip classifier inference.
+SHORT_CIRCUIT: Dict[Tuple[str, str], List] = {
+    key: [RULE_TABLE[key]["tiers"][0]]
+    for key in [
+        ("india", "health"),      # sum insured > 15L or premium > 50k
+        ("india", "life"),        # premium > 1L
+        ("australia", "health"),  # sum insured > 20L
+        ("australia", "life"),    # premium > 1.5L
+    ]
+}
+
+
+def _scalar_input(row: Dict, name: str):
+    col, kind, default = INPUTS[name]
+    value = row.get(col, default)
+    if kind == "str":
+        return str(value).lower()
+    try:
+        num = float(value or 0)
+    except (TypeError, ValueError):
+        num = float(default)
+    return float(int(num)) if kind == "int" else num
+
+
+_SCALAR_OPS = {
+    "lt": operator.lt, "le": operator.le,
+    "gt": operator.gt, "ge": operator.ge,
+    "eq": operator.eq, "ne": operator.ne,
+}
+
+
+def _eval_scalar(cond, row: Dict, lookup: Callable[[Dict, str], object] = _scalar_input) -> bool:
+    op = cond[0]
+    if op == "and":
+        return all(_eval_scalar(c, row, lookup) for c in cond[1:])
+    if op == "or":
+        return any(_eval_scalar(c, row, lookup) for c in cond[1:])
+    _, name, value = cond
+    x = lookup(row, name)
+    if op == "in":
+        return x in value
+    return _SCALAR_OPS[op](x, value)
+
+
+def short_circuit_tier(row: Dict) -> Optional[str]:
+    """Tier decided by a certain rule for this row (rule_engine keys), else None."""
+    key = (str(row.get("Country", "")).lower(), str(row.get("ProductType", "")).lower())
+    for cond, tier in SHORT_CIRCUIT.get(key, []):
+        if _eval_scalar(cond, row):
+            return tier
+    return None
+
+
+# --------------------------
+# Rule explanations (single row)
+# --------------------------
+# Readable names for inputs, derived values and scores in explain_rule()
+LABELS = {
+    "age": "age",
+    "sum_insured": "sum insured",
+    "premium": "annual premium",
+    "smoker": "smoker/drinker",
+    "disease": "health issues",
+    "price": "vehicle price",
+    "vehicle_age": "vehicle age",
+    "vtype": "vehicle type",
+    "duration": "trip length (days)",
+    "medical": "existing medical condition",
+    "baggage": "baggage cover",
+    "trip_cancel": "trip cancellation cover",
+    "accident": "accident cover",
+    "health_cover": "health cover",
+    "value": "property value",
+    "size": "property size (sq ft)",
+    "idv": "insured declared value (IDV)",
+    "risk": "risk score",
+    "type_risk": "vehicle type risk",
+    "coverage": "add-on covers chosen",
+}
+_SYMBOLS = {"lt": "<", "le": "≤", "gt": ">", "ge": "≥", "eq": "=", "ne": "≠", "in": "in"}
+
+
+def _fmt(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return "/".join(str(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f"{value:,}" if isinstance(value, int) else str(value)
+
+
+def _describe(cond, env: Dict) -> str:
+    """Readable text for a condition that holds in env, e.g. "age 52 (≥ 45)"."""
+    op = cond[0]
+    if op == "or":
+        lookup = lambda e, n: e[n]
+        return " or ".join(_describe(c, env) for c in cond[1:] if _eval_scalar(c, env, lookup))
+    if op == "and":
+        parts, bounds = [], {}
+        for c in cond[1:]:
+            if c[0] in ("and", "or"):
+                parts.append(_describe(c, env))
+            elif c[1] in bounds:
+                bounds[c[1]].append(c)  # a range: "IDV 855,000 (≥ 600,000, < 1,500,000)"
+            else:
+                bounds[c[1]] = [c]
+                parts.append(c[1])
+        return " and ".join(_describe_leaves(bounds[p], env) if p in bounds else p for p in parts)
+    return _describe_leaves([cond], env)
+
+
+def _describe_leaves(conds: List, env: Dict) -> str:
+    name = conds[0][1]
+    label = LABELS.get(name, name.replace("_", " "))
+    op, value = conds[0][0], conds[0][2]
+    if len(conds) == 1 and op == "eq" and value in ("yes", "no"):
+        return label if value == "yes" else f"no {label}"
+    actual = env[name]
+    if isinstance(actual, float):
+        actual = round(actual, 2)
+    limits = ", ".join(f"{_SYMBOLS[c[0]]} {_fmt(c[2])}" for c in conds)
+    return f"{label} {_fmt(actual)} ({limits})"
+
+
+def explain_rule(row: Dict) -> Optional[Dict]:
+    """
+    Tier the rule table gives this row (rule_engine keys) and why:
+    {"tier", "reason", "factors"}, where reason is the matching tier clause and
+    factors the score conditions that held. None if no rule covers the product.
+    """
+    key = (str(row.get("Country", "")).lower(), str(row.get("ProductType", "")).lower())
+    spec = RULE_TABLE.get(key)
+    if spec is None:
+        return None
+
+    env = {name: _scalar_input(row, name) for name in spec_inputs(spec)}
+    for name, (_, price, age) in spec.get("derived", {}).items():
+        env[name] = float(idv_vectorized([env[price]], [env[age]])[0])
+    lookup = lambda e, n: e[n]
+    factors = []
+    for name, terms in spec.get("scores", {}).items():
+        env[name] = 0.0
+        for cond, weight in terms:
+            if _eval_scalar(cond, env, lookup):
+                env[name] += weight
+                if weight > 0:
+                    factors.append(_describe(cond, env))
+
+    for cond, tier in spec["tiers"]:
+        if _eval_scalar(cond, env, lookup):
+            return {"tier": tier, "reason": _describe(cond, env), "factors": factors}
+    if spec.get("default") is None:
+        return None
+    return {"tier": spec["default"], "reason": "no lower tier's conditions apply", "factors": factors}
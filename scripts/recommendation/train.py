@@ -1,17 +1,34 @@
 # scripts/recommendation/train.py
 from __future__ import annotations
 
+import argparse
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
 from sklearn.metrics import classification_report, r2_score
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder
+from threadpoolctl import threadpool_limits
+
+try:
+    from .common import FEATURE_PIPELINE_VERSION, canon_column, encode_with_pipeline
+    from .flat_trees import export_model, export_pipeline
+    from .bundles import new_version_id, prune_versions, publish_version, version_dir, write_manifest
+    from .premium_grid import GRID_SPECS, build_grid
+except ImportError:  # run directly as a script
+    from common import FEATURE_PIPELINE_VERSION, canon_column, encode_with_pipeline
+    from flat_trees import export_model, export_pipeline
+    from bundles import new_version_id, prune_versions, publish_version, version_dir, write_manifest
+    from premium_grid import GRID_SPECS, build_grid
 
 # -------------------------------------------------------------------
 # Paths / constants
@@ -41,16 +58,32 @@ PREMIUM_COLUMN = {
     "travel": "trippremium",
 }
 
+# Default HGB hyperparameters; tune.py can override per bundle via tuned_params.json
+DEFAULT_CLF_PARAMS = {"max_iter": 300, "learning_rate": 0.05}
+DEFAULT_REG_PARAMS = {"max_iter": 400, "learning_rate": 0.05}
+
 
 # -------------------------------------------------------------------
 # Helpers
 # -------------------------------------------------------------------
 def _split_num_cat(X: pd.DataFrame) -> Tuple[List[str], List[str]]:
-    cat_cols = [c for c in X.columns if X[c].dtype == "object" or str(X[c].dtype).startswith("string")]
+    cat_cols = [c for c in X.columns
+                if X[c].dtype == "object" or str(X[c].dtype).startswith(("string", "category"))]
     num_cols = [c for c in X.columns if c not in cat_cols]
     return num_cols, cat_cols
 
 
+def _fill_categorical(col: pd.Series) -> pd.Series:
+    """NaN -> "__missing__"; category columns stay categorical (no per-value str cast)."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        if col.isna().any():
+            if "__missing__" not in col.cat.categories:
+                col = col.cat.add_categories("__missing__")
+            col = col.fillna("__missing__")
+        return col
+    return col.astype("object").fillna("__missing__").astype(str)
+
+
 def _fit_encoder(X: pd.DataFrame) -> OneHotEncoder:
     """Fit OneHotEncoder on categorical columns (object dtype)."""
     _, cat_cols = _split_num_cat(X)
@@ -63,44 +96,46 @@ def _fit_encoder(X: pd.DataFrame) -> OneHotEncoder:
     return enc
 
 
-def _encode(X: pd.DataFrame, enc: OneHotEncoder) -> np.ndarray:
-    """Return numeric + encoded categorical matrix; fill NA properly first."""
+def _fit_pipeline(X: pd.DataFrame, features: List[str]) -> Dict:
+    """Fit the bundle's single feature pipeline (shared by clf + reg)."""
     num_cols, cat_cols = _split_num_cat(X)
+    return {
+        "version": FEATURE_PIPELINE_VERSION,
+        "features": list(features),
+        "num_cols": num_cols,
+        "cat_cols": cat_cols,
+        "encoder": _fit_encoder(X),
+    }
 
-    # numeric: coerce to numeric, fillna -1
-    Xn = np.zeros((len(X), 0))
-    if len(num_cols):
-        X_num = X[num_cols].apply(pd.to_numeric, errors="coerce").fillna(-1.0)
-        Xn = X_num.to_numpy(dtype=float)
 
-    # categorical: fillna "__missing__" and cast to str
-    Xc = np.zeros((len(X), 0))
-    if len(cat_cols):
-        X_cat = X[cat_cols].astype("object").fillna("__missing__").astype(str)
-        Xc = enc.transform(X_cat)
+def _atomic_dump(obj, path: Path) -> None:
+    """joblib.dump to a temp file in the same dir, then rename over the target."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
 
-    return np.hstack([Xn, Xc])
+def _atomic_write_json(obj, path: Path) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
 
 
 def _save_feature_lists(outdir: Path, features: List[str]) -> None:
     outdir.mkdir(parents=True, exist_ok=True)
-    with open(outdir / "features_cls.json", "w", encoding="utf-8") as f:
-        json.dump(features, f, ensure_ascii=False, indent=2)
-    with open(outdir / "features_reg.json", "w", encoding="utf-8") as f:
-        json.dump(features, f, ensure_ascii=False, indent=2)
+    _atomic_write_json(features, outdir / "features_cls.json")
+    _atomic_write_json(features, outdir / "features_reg.json")
     # backward compat
-    with open(outdir / "features.json", "w", encoding="utf-8") as f:
-        json.dump(features, f, ensure_ascii=False, indent=2)
+    _atomic_write_json(features, outdir / "features.json")
 
 
 # -------------------------------------------------------------------
 # Training
 # -------------------------------------------------------------------
-def train_one(country: str, df: pd.DataFrame, policy: str) -> None:
-    print("\n" + "=" * 68)
-    print(f"🚀 Training {country.upper()} — {policy.upper()}")
-    print("=" * 68)
-
+def prepare_xy(country: str, df: pd.DataFrame, policy: str
+               ) -> Optional[Tuple[pd.DataFrame, pd.Series, pd.Series]]:
+    """Filter to one (country, policy) and build X / y_cls / y_reg. None if no usable rows."""
     feats   = POLICY_FEATURES[policy]
     tgt_cls = "policytier"
     tgt_reg = PREMIUM_COLUMN[policy]
@@ -111,13 +146,13 @@ def train_one(country: str, df: pd.DataFrame, policy: str) -> None:
 
     if sub.empty:
         print(f"⚠️  Skipping {country}-{policy}: no rows after filter.")
-        return
+        return None
 
     # Remove rows missing targets
     sub = sub.dropna(subset=[tgt_cls, tgt_reg])
     if sub.empty:
         print(f"⚠️  Skipping {country}-{policy}: no rows with targets.")
-        return
+        return None
 
     # Build X/y
     X = sub.reindex(columns=feats).copy()
@@ -133,99 +168,291 @@ def train_one(country: str, df: pd.DataFrame, policy: str) -> None:
             X[c] = pd.to_numeric(X[c], errors="coerce").fillna(-1.0)
     if len(cat_cols):
         for c in cat_cols:
-            X[c] = X[c].astype("object").fillna("__missing__").astype(str)
+            X[c] = _fill_categorical(X[c])
 
-    # Save feature order to artifacts
-    outdir = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-    _save_feature_lists(outdir, list(X.columns))
+    return X, y_cls, y_reg
 
-    # Split
+
+def split_xy(X: pd.DataFrame, y_cls: pd.Series, y_reg: pd.Series, test_size: float = 0.2):
+    """Stratified split on tier, falling back to a plain split for tiny classes."""
     try:
-        Xtr, Xte, yct, yce, yrt, yre = train_test_split(
-            X, y_cls, y_reg, test_size=0.2, random_state=42, stratify=y_cls
+        return train_test_split(
+            X, y_cls, y_reg, test_size=test_size, random_state=42, stratify=y_cls
         )
     except Exception:
         # if stratify fails (too few samples per class), use non‑stratified split
-        Xtr, Xte, yct, yce, yrt, yre = train_test_split(
-            X, y_cls, y_reg, test_size=0.2, random_state=42
+        return train_test_split(
+            X, y_cls, y_reg, test_size=test_size, random_state=42
         )
 
-    # ---- Classifier ----
-    enc_cls = _fit_encoder(Xtr)
-    Mtr_cls = _encode(Xtr, enc_cls)
-    Mte_cls = _encode(Xte, enc_cls)
 
-    clf = HistGradientBoostingClassifier(max_iter=300, learning_rate=0.05)
-    clf.fit(Mtr_cls, yct)
+def _load_tuned_params(outdir: Path) -> Dict[str, Dict]:
+    """Hyperparameters picked by tune.py, falling back to the defaults."""
+    params = {"clf": dict(DEFAULT_CLF_PARAMS), "reg": dict(DEFAULT_REG_PARAMS)}
+    p = outdir / "tuned_params.json"
+    if p.exists():
+        with open(p, "r", encoding="utf-8") as f:
+            tuned = json.load(f)
+        params["clf"].update(tuned.get("clf", {}))
+        params["reg"].update(tuned.get("reg", {}))
+        print(f"🎛️  Using tuned params from {p}: {params}")
+    return params
+
+
+def train_one(country: str, df: pd.DataFrame, policy: str) -> int:
+    """Train classifier + regressor for one (country, policy). Returns rows used."""
+    print("\n" + "=" * 68)
+    print(f"🚀 Training {country.upper()} — {policy.upper()}")
+    print("=" * 68)
+
+    prepared = prepare_xy(country, df, policy)
+    if prepared is None:
+        return 0
+    X, y_cls, y_reg = prepared
+
+    # Everything is written to a fresh version dir; nothing is live until CURRENT flips
+    bundle_root = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
+    version = new_version_id()
+    outdir = version_dir(bundle_root, version)
+    _save_feature_lists(outdir, list(X.columns))
+    params = _load_tuned_params(bundle_root)
+
+    # Split
+    Xtr, Xte, yct, yce, yrt, yre = split_xy(X, y_cls, y_reg)
+
+    # ---- Shared feature pipeline: fit once, encode each split once ----
+    pipeline = _fit_pipeline(Xtr, list(X.columns))
+    Mtr = encode_with_pipeline(Xtr, pipeline)
+    Mte = encode_with_pipeline(Xte, pipeline)
+
+    # ---- Classifier ----
+    clf = HistGradientBoostingClassifier(**params["clf"])
+    clf.fit(Mtr, yct)
 
     try:
-        yhat = clf.predict(Mte_cls)
+        yhat = clf.predict(Mte)
         print(f"[{country}-{policy}] Classifier report:")
         print(classification_report(yce, yhat, labels=TIERS, zero_division=0))
     except Exception as e:
         print(f"[{country}-{policy}] Classifier eval skipped: {e}")
 
     # ---- Regressor ----
-    enc_reg = _fit_encoder(Xtr)  # separate encoder
-    Mtr_reg = _encode(Xtr, enc_reg)
-    Mte_reg = _encode(Xte, enc_reg)
-
-    reg = HistGradientBoostingRegressor(max_iter=400, learning_rate=0.05)
-    reg.fit(Mtr_reg, yrt)
+    reg = HistGradientBoostingRegressor(**params["reg"])
+    reg.fit(Mtr, yrt)
 
     try:
-        r2 = r2_score(yre, reg.predict(Mte_reg))
+        r2 = r2_score(yre, reg.predict(Mte))
         print(f"[{country}-{policy}] Regressor R²: {r2:.3f}")
     except Exception as e:
         print(f"[{country}-{policy}] Regressor eval skipped: {e}")
 
     # Save artifacts
-    joblib.dump(clf, outdir / "clf.pkl")
-    joblib.dump(reg, outdir / "reg.pkl")
-    joblib.dump(enc_cls, outdir / "encoder_cls.pkl")
-    joblib.dump(enc_reg, outdir / "encoder_reg.pkl")
-    print(f"✅ Saved to {outdir}")
-
-
-def train_all(csv_path: str, country: str) -> None:
-    csv = Path(csv_path)
-    if not csv.exists():
-        raise FileNotFoundError(f"Data not found: {csv}")
-
-    df = pd.read_csv(csv)
-    # normalize headers -> lowercase, strip spaces/underscores to your schema
-    df.columns = df.columns.str.lower().str.strip()
-    # also unify some headers that might vary across sources
-    df = df.rename(columns={
-        "policy type": "policytype",
-        "policy tier": "policytier",
-        "sum assured": "sumassured",
-        "annual premium": "annualpremium",
-        "property size sq feet": "propertysize",
+    _atomic_dump(clf, outdir / "clf.pkl")
+    _atomic_dump(reg, outdir / "reg.pkl")
+    _atomic_dump(pipeline, outdir / "pipeline.pkl")
+
+    # Flat node-array copies for sklearn-free serving (see flat_trees.py)
+    try:
+        export_model(clf, outdir / "clf_flat.npz")
+        export_model(reg, outdir / "reg_flat.npz")
+        export_pipeline(pipeline, outdir / "pipeline_flat.json")
+    except Exception as e:
+        print(f"[{country}-{policy}] Flat export skipped: {e}")
+
+    # Premium lookup table, built from this version's regressor so it ships with it
+    if policy.lower() in GRID_SPECS:
+        try:
+            build_grid(country, policy, X, outdir)
+        except Exception as e:
+            print(f"[{country}-{policy}] Premium grid skipped: {e}")
+
+    # ---- Manifest (checksums) + atomic switch of the live version ----
+    write_manifest(outdir, {
+        "country": country.lower(),
+        "policy": policy.lower(),
+        "rows": len(X),
+        "feature_pipeline_version": FEATURE_PIPELINE_VERSION,
+        "params": params,
     })
+    publish_version(bundle_root, version)
+    pruned = prune_versions(bundle_root)
+    print(f"✅ Saved to {outdir} (live version: {version}"
+          + (f", pruned {len(pruned)} old" if pruned else "") + ")")
+    return len(X)
+
+
+def _needed_columns(policies: Optional[List[str]] = None) -> List[str]:
+    """Union of features + targets for the given policies (canonical names)."""
+    policies = policies or list(POLICY_FEATURES.keys())
+    cols = {"country", "policytype", "policytier"}
+    for policy in policies:
+        cols.update(POLICY_FEATURES[policy])
+        cols.add(PREMIUM_COLUMN[policy])
+    return sorted(cols)
+
+
+def load_training_frame(path: str, country: Optional[str] = None,
+                        policies: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load a standardized dataset (Parquet preferred, CSV fallback).
+
+    Only the columns some policy needs are read, headers are normalised to
+    the POLICY_FEATURES names, string columns become `category`, and rows are
+    filtered to `country` once here instead of once per policy.
+    """
+    src = Path(path)
+    if not src.exists():
+        raise FileNotFoundError(f"Data not found: {src}")
+
+    needed = set(_needed_columns(policies))
+    if src.suffix.lower() == ".parquet":
+        # Column projection: map canonical names onto the file's real headers
+        schema_cols = pq.read_schema(src).names
+        cols = [c for c in schema_cols if canon_column(c) in needed]
+        df = pd.read_parquet(src, columns=cols)
+    else:
+        df = pd.read_csv(src, usecols=lambda c: canon_column(c) in needed)
+    df.columns = [canon_column(c) for c in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
 
     required = {"country", "policytype", "policytier"}
     missing = [c for c in required if c not in df.columns]
     if missing:
-        raise ValueError(f"Missing required columns in {csv}: {missing}")
+        raise ValueError(f"Missing required columns in {src}: {missing}")
+
+    for c in ("country", "policytype"):
+        df[c] = df[c].astype(str).str.strip().str.lower()
+    if country:
+        df = df[df["country"] == country.lower()]
+
+    # Low-cardinality strings -> category (smaller, faster groupby/encode)
+    for c in df.columns:
+        if df[c].dtype == "object":
+            df[c] = df[c].astype("category")
+
+    print(f"📂 Loaded {len(df)} rows × {df.shape[1]} cols from {src.name} "
+          f"({df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+    return df
+
+
+def split_by_policy(df: pd.DataFrame, policies: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """Partition a country frame by policy type in a single pass."""
+    policies = policies or list(POLICY_FEATURES.keys())
+    groups = {str(k): g for k, g in df.groupby("policytype", observed=True)}
+    return {p: groups.get(p, df.iloc[0:0]) for p in policies}
+
+
+def train_all(data_path: str, country: str) -> None:
+    df = load_training_frame(data_path, country=country)
 
     print("\n" + "#" * 72)
-    print(f"### Training for {country.upper()} from {csv} ###")
+    print(f"### Training for {country.upper()} from {data_path} ###")
     print("#" * 72)
 
-    for policy in POLICY_FEATURES.keys():
+    for policy, sub in split_by_policy(df).items():
         try:
-            train_one(country, df, policy)
+            train_one(country, sub, policy)
         except Exception as e:
             print(f"❌ Failed {country}-{policy}: {e}")
 
 
 
+# -------------------------------------------------------------------
+# Parallel orchestrator
+# -------------------------------------------------------------------
+def _init_worker(threads: int) -> None:
+    """Runs once per pool process: cap OpenMP/BLAS threads."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    # HGB uses OpenMP; without a cap every job grabs every core
+    threadpool_limits(limits=threads)
+
+
+def _run_job(country: str, policy: str, df: pd.DataFrame) -> Dict:
+    t0 = time.perf_counter()
+    try:
+        rows = train_one(country, df, policy)
+        status = "ok" if rows else "skipped"
+    except Exception as e:
+        print(f"❌ Failed {country}-{policy}: {e}")
+        rows, status = 0, f"failed: {e}"
+    return {
+        "country": country,
+        "policy": policy,
+        "rows": rows,
+        "status": status,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def train_all_parallel(sources: Dict[str, str], workers: Optional[int] = None,
+                       policies: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Train every (country, policy) pair across a process pool.
+
+    Each job fits one classifier and one regressor; the CPU budget is split
+    evenly between workers so OpenMP does not oversubscribe the box.
+    """
+    policies = policies or list(POLICY_FEATURES.keys())
+    # Load + filter once per country; each job only receives its own slice
+    jobs = []
+    for country, path in sources.items():
+        df = load_training_frame(path, country=country, policies=policies)
+        for policy, sub in split_by_policy(df, policies).items():
+            jobs.append((country, policy, sub))
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(jobs)))
+    threads = max(1, cpus // workers)
+
+    print("\n" + "#" * 72)
+    print(f"### Training {len(jobs)} jobs on {workers} workers × {threads} threads ###")
+    print("#" * 72)
+
+    t0 = time.perf_counter()
+    results: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(threads,)) as pool:
+        futures = [pool.submit(_run_job, country, policy, sub) for country, policy, sub in jobs]
+        for fut in as_completed(futures):
+            results.append(fut.result())
+    wall = time.perf_counter() - t0
+
+    _print_summary(results, wall)
+    return results
+
+
+def _print_summary(results: List[Dict], wall: float) -> None:
+    print("\n" + "=" * 68)
+    print(f"{'job':<24}{'rows':>8}{'seconds':>10}  status")
+    print("-" * 68)
+    for r in sorted(results, key=lambda r: (r["country"], r["policy"])):
+        name = f"{r['country']}_{r['policy']}"
+        print(f"{name:<24}{r['rows']:>8}{r['seconds']:>10.2f}  {r['status']}")
+    busy = sum(r["seconds"] for r in results)
+    print("-" * 68)
+    print(f"Wall time: {wall:.2f}s | Sum of job time: {busy:.2f}s | Speedup: {busy / max(wall, 1e-9):.2f}x")
+    print("=" * 68)
+
+
+# -------------------------------------------------------------------
 # Main
 # -------------------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train tier classifiers + premium regressors")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    parser.add_argument("--sequential", action="store_true", help="Train one job at a time (old behaviour)")
+    args = parser.parse_args()
+
     base = Path(__file__).resolve().parents[1].parent / "processed"
     # OR simply: Path(__file__).resolve().parents[2] / "processed"
-
-    train_all(str(base / "standardized_india.csv"), "india")
-    train_all(str(base / "standardized_australia.csv"), "australia")
+    sources = {}
+    for country in ("india", "australia"):
+        # Parquet is what common.load_data / ingest_all use; CSV as fallback
+        parquet = base / f"standardized_{country}.parquet"
+        sources[country] = str(parquet if parquet.exists() else base / f"standardized_{country}.csv")
+
+    if args.sequential:
+        for country, path in sources.items():
+            train_all(path, country)
+    else:
+        train_all_parallel(sources, workers=args.workers)
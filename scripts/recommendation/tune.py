@@ -0,0 +1,205 @@
+# scripts/recommendation/tune.py
+"""
+Time-bounded hyperparameter search for the HGB tier classifier + premium regressor.
+
+- Early stopping on a held-out validation split (no fixed tree count)
+- Successive halving over depth / leaf count, with max_iter as the resource
+- Every candidate records quality (accuracy / R²) AND per-row inference latency,
+  so a smaller, faster model can be picked when quality is equal
+
+Writes artifacts/<country>_<policy>/tuned_params.json (read by train.py)
+and tuning_report.json (full leaderboard).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.model_selection import train_test_split
+
+try:
+    from .common import encode_with_pipeline
+    from .train import (
+        ARTIFACTS, POLICY_FEATURES, _atomic_write_json, _fit_pipeline,
+        load_training_frame, prepare_xy, split_xy,
+    )
+except ImportError:  # run directly as a script
+    from common import encode_with_pipeline
+    from train import (
+        ARTIFACTS, POLICY_FEATURES, _atomic_write_json, _fit_pipeline,
+        load_training_frame, prepare_xy, split_xy,
+    )
+
+# Search space (max_iter is the successive-halving resource, not a grid axis)
+SEARCH_SPACE = {
+    "max_depth": [None, 4, 8],
+    "max_leaf_nodes": [15, 31, 63],
+    "learning_rate": [0.05, 0.1],
+}
+MIN_ITER = 50
+MAX_ITER = 400
+ETA = 3
+
+# Accept a faster model if it is within this much of the best score
+DEFAULT_TOLERANCE = 0.005
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def _per_row_latency_us(model, M: np.ndarray, repeats: int = 50) -> Dict[str, float]:
+    """Latency of single-row predict calls and amortised batch cost per row (µs)."""
+    single = M[:1]
+    model.predict(single)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(single)
+    single_us = (time.perf_counter() - t0) / repeats * 1e6
+
+    t0 = time.perf_counter()
+    model.predict(M)
+    batch_us = (time.perf_counter() - t0) / max(len(M), 1) * 1e6
+    return {"single_row_us": round(single_us, 2), "batch_row_us": round(batch_us, 3)}
+
+
+def _make_model(kind: str, params: Dict, max_iter: int):
+    cls = HistGradientBoostingClassifier if kind == "clf" else HistGradientBoostingRegressor
+    return cls(
+        max_iter=max_iter,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=10,
+        random_state=42,
+        **params,
+    )
+
+
+def _score(kind: str, model, M: np.ndarray, y) -> float:
+    pred = model.predict(M)
+    return float(accuracy_score(y, pred) if kind == "clf" else r2_score(y, pred))
+
+
+# -----------------------------
+# Successive halving
+# -----------------------------
+def successive_halving(kind: str, Mtr, ytr, Mval, yval, time_budget: float) -> List[Dict]:
+    """
+    Start every candidate at MIN_ITER trees, keep the best 1/ETA, multiply the
+    tree budget by ETA, repeat. Stops early when the time budget is spent
+    (after at least one fit). Returns one record per evaluated (candidate, rung).
+    """
+    keys = list(SEARCH_SPACE.keys())
+    candidates = [dict(zip(keys, vals)) for vals in itertools.product(*SEARCH_SPACE.values())]
+    deadline = time.perf_counter() + time_budget
+    n_iter = MIN_ITER
+    history: List[Dict] = []
+
+    rung = 0
+    while candidates:
+        results = []
+        for params in candidates:
+            # Always fit at least one candidate, so pick_best has something to pick
+            if (history or results) and time.perf_counter() > deadline:
+                print(f"⏱️  [{kind}] time budget spent at rung {rung}")
+                break
+            t0 = time.perf_counter()
+            model = _make_model(kind, params, n_iter)
+            model.fit(Mtr, ytr)
+            rec = {
+                "rung": rung,
+                "params": params,
+                "max_iter": n_iter,
+                "n_iter_": int(model.n_iter_),
+                "score": round(_score(kind, model, Mval, yval), 4),
+                "fit_seconds": round(time.perf_counter() - t0, 3),
+                **_per_row_latency_us(model, Mval),
+            }
+            results.append(rec)
+            print(f"   [{kind}] rung={rung} iters={rec['n_iter_']:>3}/{n_iter:<3} "
+                  f"score={rec['score']:.4f} single={rec['single_row_us']:.0f}µs {params}")
+        history.extend(results)
+
+        if not results or len(results) < len(candidates) or n_iter >= MAX_ITER or len(candidates) == 1:
+            break
+        keep = max(1, math.ceil(len(results) / ETA))
+        results.sort(key=lambda r: r["score"], reverse=True)
+        candidates = [r["params"] for r in results[:keep]]
+        n_iter = min(MAX_ITER, n_iter * ETA)
+        rung += 1
+
+    return history
+
+
+def pick_best(history: List[Dict], tolerance: float = DEFAULT_TOLERANCE) -> Dict:
+    """Fastest single-row model whose score is within `tolerance` of the best."""
+    best_score = max(r["score"] for r in history)
+    eligible = [r for r in history if r["score"] >= best_score - tolerance]
+    return min(eligible, key=lambda r: (r["single_row_us"], -r["score"]))
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def tune_one(country: str, policy: str, df, time_budget: float = 120.0,
+             tolerance: float = DEFAULT_TOLERANCE) -> Dict:
+    print("\n" + "=" * 68)
+    print(f"🎛️  Tuning {country.upper()} — {policy.upper()} (budget {time_budget:.0f}s per model)")
+    print("=" * 68)
+
+    prepared = prepare_xy(country, df, policy)
+    if prepared is None:
+        return {}
+    X, y_cls, y_reg = prepared
+
+    # Test split is the same one train.py holds out; tune only on the train part
+    Xtr, _, yct, _, yrt, _ = split_xy(X, y_cls, y_reg)
+    Xfit, Xval, ycf, ycv, yrf, yrv = train_test_split(
+        Xtr, yct, yrt, test_size=0.2, random_state=7
+    )
+    pipeline = _fit_pipeline(Xfit, list(X.columns))
+    Mfit = encode_with_pipeline(Xfit, pipeline)
+    Mval = encode_with_pipeline(Xval, pipeline)
+
+    report = {"country": country, "policy": policy, "tolerance": tolerance}
+    tuned = {}
+    for kind, yf, yv in (("clf", ycf, ycv), ("reg", yrf, yrv)):
+        history = successive_halving(kind, Mfit, yf, Mval, yv, time_budget)
+        best = pick_best(history, tolerance)
+        # Train with the tree count early stopping actually used
+        tuned[kind] = {**best["params"], "max_iter": best["n_iter_"]}
+        report[kind] = {"best": best, "history": history}
+        print(f"🏁 [{kind}] picked {tuned[kind]} score={best['score']:.4f} "
+              f"single={best['single_row_us']:.0f}µs")
+
+    outdir = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
+    outdir.mkdir(parents=True, exist_ok=True)
+    _atomic_write_json(tuned, outdir / "tuned_params.json")
+    _atomic_write_json(report, outdir / "tuning_report.json")
+    print(f"✅ Saved tuned params to {outdir}")
+    return tuned
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune HGB models under a time budget")
+    parser.add_argument("--country", default="india", help="india | australia")
+    parser.add_argument("--policy", default=None, help="One policy (default: all)")
+    parser.add_argument("--budget", type=float, default=120.0, help="Seconds per model search")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Max score loss accepted for a faster model")
+    args = parser.parse_args()
+
+    base = Path(__file__).resolve().parents[2] / "processed"
+    # Same source train.py reads: Parquet, CSV as fallback
+    parquet = base / f"standardized_{args.country.lower()}.parquet"
+    source = parquet if parquet.exists() else base / f"standardized_{args.country.lower()}.csv"
+    policies = [args.policy.lower()] if args.policy else list(POLICY_FEATURES.keys())
+    df = load_training_frame(str(source), country=args.country, policies=policies)
+    for policy in policies:
+        tune_one(args.country, policy, df, args.budget, args.tolerance)
@@ -0,0 +1,65 @@
+import tempfile
+from pathlib import Path
+
+from scripts.recommendation.bundles import (
+    current_version,
+    list_versions,
+    prune_versions,
+    publish_version,
+    resolve_bundle_dir,
+    verify_manifest,
+    version_dir,
+    write_manifest,
+)
+
+
+def _write_version(root: Path, version: str, payload: str) -> Path:
+    vdir = version_dir(root, version)
+    vdir.mkdir(parents=True)
+    (vdir / "clf.pkl").write_text(payload)
+    (vdir / "features.json").write_text("[]")
+    write_manifest(vdir, {"country": "india", "policy": "health"})
+    return vdir
+
+
+def test_publish_and_resolve():
+    root = Path(tempfile.mkdtemp()) / "india_health"
+    root.mkdir()
+    (root / "clf.pkl").write_text("legacy")
+    assert current_version(root) is None
+    assert resolve_bundle_dir(root) == root  # unversioned bundles still load
+
+    vdir = _write_version(root, "v1", "one")
+    assert resolve_bundle_dir(root) == root  # not live until published
+    publish_version(root, "v1")
+    assert current_version(root) == "v1"
+    assert resolve_bundle_dir(root) == vdir
+    assert set(verify_manifest(vdir)["files"]) == {"clf.pkl", "features.json"}
+
+
+def test_checksum_mismatch():
+    root = Path(tempfile.mkdtemp()) / "india_health"
+    vdir = _write_version(root, "v1", "one")
+    (vdir / "clf.pkl").write_text("two")
+    try:
+        verify_manifest(vdir)
+    except ValueError as e:
+        assert "clf.pkl" in str(e)
+    else:
+        raise AssertionError("tampered file was not detected")
+
+
+def test_prune_keeps_live():
+    root = Path(tempfile.mkdtemp()) / "india_health"
+    for i in range(5):
+        _write_version(root, f"v{i}", str(i))
+    publish_version(root, "v0")  # rolled back to the oldest
+    assert prune_versions(root, keep=2) == ["v1", "v2"]
+    assert list_versions(root) == ["v0", "v3", "v4"]
+
+
+if __name__ == "__main__":
+    test_publish_and_resolve()
+    test_checksum_mismatch()
+    test_prune_keeps_live()
+    print("✅ bundle versioning works")
@@ -0,0 +1,68 @@
+import json
+import random
+
+from scripts.llm.llm_client import JsonFieldStream
+
+# Characters that break naive parsers: quotes, escapes, structure inside strings
+TRICKY = ['"', "\\", "\n", "\t", "{", "}", "[", "]", ":", ",", "é", "₹", "😀", "\\u", " ", " "]
+
+
+def _string(rng: random.Random) -> str:
+    return "".join(rng.choice(TRICKY + list("abcXYZ 019")) for _ in range(rng.randint(0, 30)))
+
+
+def _value(rng: random.Random, depth: int = 0):
+    kind = rng.choice(["str", "str", "str", "int", "float", "bool", "null", "dict", "list"])
+    if kind == "str":
+        return _string(rng)
+    if kind == "int":
+        return rng.randint(-10**6, 10**6)
+    if kind == "float":
+        return rng.uniform(-1e3, 1e3)
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    if depth >= 2:
+        return _string(rng)
+    if kind == "dict":
+        return {f"{_string(rng)}_{i}": _value(rng, depth + 1) for i in range(rng.randint(0, 3))}
+    return [_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+
+
+def _document(rng: random.Random):
+    obj = {f"k{i}{_string(rng)}": _value(rng) for i in range(rng.randint(1, 8))}
+    text = json.dumps(obj, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+    if rng.random() < 0.5:
+        text = f"```json\n{text}\n```"
+    return obj, text
+
+
+def _feed_in_chunks(text: str, rng: random.Random):
+    parser, out, i = JsonFieldStream(), [], 0
+    while i < len(text):
+        n = rng.choice([1, 1, 2, 3, 7, 16, 64])
+        out.extend(parser.feed(text[i:i + n]))
+        i += n
+    return out
+
+
+def test_json_field_stream_fuzz():
+    rng = random.Random(0)
+    for _ in range(2000):
+        obj, text = _document(rng)
+        expected = [(k, v) for k, v in obj.items() if isinstance(v, str)]
+        assert _feed_in_chunks(text, rng) == expected, text
+
+
+def test_fields_close_as_they_arrive():
+    parser = JsonFieldStream()
+    assert parser.feed('```json\n{"Basic": "a \\"b') == []
+    assert parser.feed('\\" c", "n": {"Gold": "x"}, "m": [1, "y"], "t": tr') == [("Basic", 'a "b" c')]
+    assert parser.feed('ue, "why_recommended": "z"}\n```') == [("why_recommended", "z")]
+
+
+if __name__ == "__main__":
+    test_json_field_stream_fuzz()
+    test_fields_close_as_they_arrive()
+    print("✅ JsonFieldStream survives every chunking")
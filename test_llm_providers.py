@@ -0,0 +1,92 @@
+import json
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from scripts.llm import stub_llm
+from scripts.llm.providers import (
+    CircuitBreaker,
+    GeminiProvider,
+    LLMUnavailable,
+    OpenAICompatProvider,
+)
+
+
+@contextmanager
+def _stub(**kwargs):
+    """stub_llm on a free port; yields its base URL."""
+    server = stub_llm.serve(0, **kwargs)
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+
+
+def _stub_stats(base: str) -> dict:
+    with urllib.request.urlopen(f"{base}/stats") as resp:
+        return json.loads(resp.read())
+
+
+def _providers(base: str, **kwargs):
+    return [GeminiProvider("stub", base_url=base, **kwargs),
+            OpenAICompatProvider(None, base_url=f"{base}/v1", **kwargs)]
+
+
+def _fails(call) -> str:
+    try:
+        call()
+    except LLMUnavailable as e:
+        return str(e)
+    raise AssertionError("expected LLMUnavailable")
+
+
+def test_generate_stream_and_pooling():
+    with _stub() as base:
+        for p in _providers(base, pool_size=2):
+            usage = {}
+            assert "why_recommended" in json.loads(p.generate("x", system="s", usage=usage))
+            assert usage["provider"] == p.name and usage["in"] > 0
+            for _ in range(4):
+                p.generate("x")
+            assert "why_recommended" in json.loads("".join(p.stream("x", system="s")))
+            s = p.stats()
+            assert (s["calls"], s["ok"], s["failed"], s["retries"]) == (6, 6, 0, 0), s
+        stats = _stub_stats(base)
+        # Keep-alive pool: 12 calls over at most 2 connections per provider
+        assert stats["requests"] >= 12 and stats["connections"] <= 4, stats
+
+
+def test_retries_then_breaker_opens():
+    with _stub(fail_rate=1.0) as base:
+        for p in (GeminiProvider("stub", base_url=base, max_retries=2, backoff=0.01,
+                                 breaker=CircuitBreaker(failures=2, cooldown=60)),
+                  OpenAICompatProvider(None, base_url=f"{base}/v1", max_retries=2, backoff=0.01,
+                                       breaker=CircuitBreaker(failures=2, cooldown=60))):
+            for i in range(2):
+                assert "503" in _fails(lambda: p.generate("x"))
+                assert p.stats()["retries"] == 2 * (i + 1)
+            assert p.stats()["breaker"] == "open"
+
+            before = _stub_stats(base)["requests"]
+            assert "circuit breaker open" in _fails(lambda: p.generate("x"))
+            assert "circuit breaker open" in _fails(lambda: list(p.stream("x")))
+            assert _stub_stats(base)["requests"] == before  # rejected without a request
+            s = p.stats()
+            assert (s["calls"], s["failed"], s["rejected"]) == (2, 2, 2), s
+
+
+def test_deadline_on_hang():
+    with _stub(hang_rate=1.0, hang_seconds=5) as base:
+        for p in _providers(base, max_retries=3, backoff=0.01):
+            for call in (lambda: p.generate("x", deadline=0.5),
+                         lambda: list(p.stream("x", deadline=0.5))):
+                t0 = time.monotonic()
+                _fails(call)
+                assert time.monotonic() - t0 < 1.5
+
+
+if __name__ == "__main__":
+    test_generate_stream_and_pooling()
+    test_retries_then_breaker_opens()
+    test_deadline_on_hang()
+    print("✅ LLM providers retry, break and honour deadlines")
@@ -0,0 +1,98 @@
+import contextlib
+import importlib
+import io
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# scripts.recommendation re-exports the predict() function under the module's name
+P = importlib.import_module("scripts.recommendation.predict")
+T = importlib.import_module("scripts.recommendation.train")
+
+POLICIES = ["health", "vehicle", "house"]
+
+CASES = [
+    ("india", "health", {"age": 40, "sum_assured": 500000, "smoker_drinker": "No", "diseases": "none"}),
+    ("india", "vehicle", {"age": 30, "price_of_vehicle": 800000, "age_of_vehicle": 2, "type_of_vehicle": "car"}),
+    ("india", "house", {"age": 45, "property_value": 9000000, "property_age": 12, "property_type": "villa",
+                        "property_size_sq_feet": 2500}),
+    ("india", "pet", {"age": 3}),  # no bundle for this product: fails in the middle of the batch
+    ("india", "health", {"age": 66, "sum_assured": 2500000, "smoker_drinker": "Yes", "diseases": "diabetes"}),
+    ("india", "vehicle", {"age": 55, "price_of_vehicle": 5000000, "age_of_vehicle": 0, "type_of_vehicle": "suv"}),
+    ("india", "health", {"age": 25, "sum_assured": 300000, "smoker_drinker": "No", "diseases": "asthma"}),
+]
+
+
+def _frame(n: int = 600) -> pd.DataFrame:
+    """Tiny random training frame with canonical column names."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "country": "india",
+        "policytype": rng.choice(POLICIES, n),
+        "policytier": rng.choice(T.TIERS, n),
+        "age": rng.integers(18, 80, n),
+        "sumassured": rng.integers(100000, 3000000, n).astype(float),
+        "smokerdrinker": rng.choice(["yes", "no"], n),
+        "diseases": rng.choice(["none", "diabetes", "asthma"], n),
+        "annualpremium": rng.integers(5000, 90000, n).astype(float),
+        "priceofvehicle": rng.integers(50000, 5000000, n).astype(float),
+        "ageofvehicle": rng.integers(0, 10, n),
+        "typeofvehicle": rng.choice(["car", "suv", "2wheeler"], n),
+        "propertyvalue": rng.integers(1000000, 50000000, n).astype(float),
+        "propertyage": rng.integers(0, 50, n),
+        "propertytype": rng.choice(["house", "villa", "apartment"], n),
+        "propertysize": rng.integers(400, 5000, n).astype(float),
+    })
+
+
+@contextlib.contextmanager
+def _tiny_bundles():
+    """Train small bundles into a temp artifacts dir and point predict.py at it."""
+    root = Path(tempfile.mkdtemp())
+    saved = T.ARTIFACTS, P.ARTIFACTS
+    T.ARTIFACTS = P.ARTIFACTS = root
+    try:
+        df = _frame()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for policy in POLICIES:
+                bundle_root = root / f"india_{policy}"
+                bundle_root.mkdir()
+                (bundle_root / "tuned_params.json").write_text(
+                    json.dumps({"clf": {"max_iter": 20}, "reg": {"max_iter": 20}}))
+                assert T.train_one("india", df, policy) > 0
+        yield root
+    finally:
+        T.ARTIFACTS, P.ARTIFACTS = saved
+
+
+def _same(batched, single):
+    if isinstance(single, Exception):
+        return isinstance(batched, type(single)) and str(batched) == str(single)
+    return json.dumps(batched, sort_keys=True, default=str) == json.dumps(single, sort_keys=True, default=str)
+
+
+def test_predict_batch_matches_predict():
+    with _tiny_bundles():
+        for hybrid in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = []
+                for country, policy, data in CASES:
+                    try:
+                        expected.append(P.predict(country, policy, dict(data), hybrid=hybrid))
+                    except Exception as e:
+                        expected.append(e)
+                got = P.predict_batch([(c, p, dict(d)) for c, p, d in CASES], hybrid=hybrid)
+
+            assert len(got) == len(CASES)
+            assert isinstance(got[3], Exception) and isinstance(expected[3], Exception)
+            assert all(isinstance(r, dict) for i, r in enumerate(got) if i != 3)
+            for i, (b, s) in enumerate(zip(got, expected)):
+                assert _same(b, s), (i, hybrid, b, s)
+
+
+if __name__ == "__main__":
+    test_predict_batch_matches_predict()
+    print("✅ predict_batch matches predict")
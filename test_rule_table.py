@@ -0,0 +1,81 @@
+import random
+
+import pandas as pd
+
+from scripts.recommendation.rule_engine import apply_rules, calculate_idv
+from scripts.recommendation.rule_table import apply_rules_frame, explain_rule, idv_vectorized
+
+COUNTRIES = ["India", "Australia"]
+PRODUCTS = ["Health", "Life", "Vehicle", "Travel", "House"]
+
+
+def _random_row(rng: random.Random) -> dict:
+    """Random row around every threshold used by rule_engine.py."""
+    yes_no = lambda: rng.choice(["Yes", "No", "yes", "NO", None])
+    return {
+        "Country": rng.choice(COUNTRIES),
+        "ProductType": rng.choice(PRODUCTS),
+        "Age": rng.choice([0, 18, 44, 45, 49, 50, 54, 55, 59, 60, 64, 65, 69, 70, 85, None]),
+        "SumInsured": rng.choice([0, 500000, 1500000, 1500001, 2000000, 2000001, None]),
+        "AnnualPremium": rng.choice([0, 50000, 50001, 100000, 100001, 150000, 150001, None]),
+        "SmokerDrinker": yes_no(),
+        "HealthIssues": rng.choice(["none", "None", "diabetes", "asthma", None]),
+        "PriceOfVehicle": rng.choice([0, 4000, 6000, 16000, 40000, 150000, 300000, 700000, 2000000, 5000000]),
+        "AgeOfVehicle": rng.choice([0, 1, 2, 3, 4, 5, 6, 10]),
+        "TypeOfVehicle": rng.choice(["car", "bike", "luxury", "truck", "suv", None]),
+        "TripDurationDays": rng.choice([1, 15, 16, 20, 21, 60]),
+        "ExistingMedicalCondition": yes_no(),
+        "BaggageCoverage": yes_no(),
+        "TripCancellationCoverage": yes_no(),
+        "AccidentCoverage": yes_no(),
+        "HealthCoverage": yes_no(),
+        "PropertyValue": rng.choice([100000, 299999, 300000, 999999, 1000000, 1999999, 2000000,
+                                     2999999, 3000000, 9999999, 10000000, 29999999, 30000000]),
+        "PropertyAge": rng.choice([0, 30, 31, 40, 41]),
+        "PropertySizeSqFeet": rng.choice([500, 799, 800, 999, 1000, 1499, 1500, 1999, 2000, 2999, 3000, 3999, 4000, 6000]),
+        "PropertyType": rng.choice(["apartment", "villa", "bungalow", "house"]),
+    }
+
+
+def test_idv_parity():
+    prices = [0, 10000, 250000, 1500000]
+    ages = [0, 0.4, 0.5, 0.9, 1, 1.5, 2, 3, 4, 4.9, 5, 12]
+    for p in prices:
+        for a in ages:
+            assert idv_vectorized([p], [a])[0] == calculate_idv(p, a), (p, a)
+
+
+def test_rule_table_parity():
+    rng = random.Random(0)
+    rows = [_random_row(rng) for _ in range(20000)]
+    expected = [apply_rules(r) for r in rows]
+    got = apply_rules_frame(pd.DataFrame(rows)).tolist()
+
+    mismatches = [(r, e, g) for r, e, g in zip(rows, expected, got) if e != g]
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[0]}"
+
+
+def test_explain_rule_parity():
+    rng = random.Random(1)
+    for _ in range(5000):
+        row = _random_row(rng)
+        explained = explain_rule(row)
+        assert (explained and explained["tier"]) == apply_rules(row), (row, explained)
+        if explained:
+            assert explained["reason"]
+
+
+def test_unknown_country_or_product():
+    df = pd.DataFrame([
+        {"Country": "Japan", "ProductType": "Health", "Age": 30},
+        {"Country": "India", "ProductType": "Pet", "Age": 30},
+    ])
+    assert apply_rules_frame(df).tolist() == [None, None]
+
+
+if __name__ == "__main__":
+    test_idv_parity()
+    test_rule_table_parity()
+    test_explain_rule_parity()
+    test_unknown_country_or_product()
+    print("✅ rule_table matches rule_engine")
@@ -0,0 +1,164 @@
+import threading
+import time
+
+from scripts.preprocessing import multilingual_handler as M
+
+
+def _stub_batches(delay: float = 0.05, fail: bool = False):
+    """Replace translate_batch with an upper-casing stub; returns the list of batches it saw."""
+    batches = []
+
+    def fake(texts, src_lang, tgt_lang="en"):
+        batches.append(list(texts))
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("model unavailable")
+        return [f"{t.upper()}<{src_lang}-{tgt_lang}>" for t in texts]
+
+    M.translate_batch = fake
+    return batches
+
+
+def _concurrently(fn, args):
+    out = [None] * len(args)
+
+    def run(i):
+        out[i] = fn(*args[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(args))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def test_batched_results_keep_order():
+    original, wait_ms = M.translate_batch, M.TRANSLATE_BATCH_WAIT_MS
+    M.TRANSLATE_BATCH_WAIT_MS = 50  # wide window so the threads land in shared batches
+    try:
+        batches = _stub_batches()
+        texts = [f"order {i}" for i in range(12)]
+        got = _concurrently(M.translate_text, [(t, "xa", "en") for t in texts])
+        assert got == [f"{t.upper()}<xa-en>" for t in texts]
+        assert sum(len(b) for b in batches) == len(texts)
+        assert len(batches) < len(texts)  # concurrent requests shared model calls
+    finally:
+        M.translate_batch, M.TRANSLATE_BATCH_WAIT_MS = original, wait_ms
+
+
+def test_in_flight_repeats_share_one_translation():
+    original = M.translate_batch
+    try:
+        batches = _stub_batches(delay=0.2)
+        before = M.translation_stats()["coalesced"]
+        got = _concurrently(M.translate_text, [("same phrase", "xb", "en")] * 10)
+        assert got == ["SAME PHRASE<xb-en>"] * 10
+        assert [t for b in batches for t in b] == ["same phrase"]  # translated once
+        assert M.translation_stats()["coalesced"] - before == 9
+    finally:
+        M.translate_batch = original
+
+
+def test_repeats_are_cache_hits():
+    original = M.translate_batch
+    try:
+        batches = _stub_batches()
+        assert M.translate_text("  cached phrase ", "xc", "en") == "CACHED PHRASE<xc-en>"
+        hits = M.translation_stats()["cache_hits"]
+        assert M.translate_text("cached phrase", "xc", "en") == "CACHED PHRASE<xc-en>"
+        assert M.translation_stats()["cache_hits"] == hits + 1
+        assert len(batches) == 1
+        assert M.translate_text("cached phrase", "xc", "fr") == "CACHED PHRASE<xc-fr>"  # other pair
+    finally:
+        M.translate_batch = original
+
+
+def test_failures_propagate_and_are_not_cached():
+    original = M.translate_batch
+    try:
+        batches = _stub_batches(fail=True)
+        failures = M.translation_stats()["failures"]
+        try:
+            M._batcher("xd", "en").submit("broken").result(timeout=5)
+        except RuntimeError as e:
+            assert "model unavailable" in str(e)
+        else:
+            raise AssertionError("batch error did not reach the caller")
+
+        # translate_text falls back to the input text and counts the failure
+        assert _concurrently(M.translate_text, [("broken", "xd", "en")] * 3) == ["broken"] * 3
+        assert M.translation_stats()["failures"] == failures + 3
+
+        _stub_batches()
+        assert M.translate_text("broken", "xd", "en") == "BROKEN<xd-en>"  # retried, not cached
+        assert len(batches) >= 2
+    finally:
+        M.translate_batch = original
+
+
+class _FakeTensor:
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+    def numel(self):
+        return self.nbytes
+
+    def element_size(self):
+        return 1
+
+
+def _fake_loader(sizes_mb, loaded):
+    """_load_pair stand-in: a (tokenizer, model) pair whose weights take sizes_mb[src] MB."""
+    def fake(model_name):
+        src = model_name.rsplit("-", 2)[-2]
+        loaded.append(src)
+        weights = {"weight": _FakeTensor(int(sizes_mb[src] * 1e6)), "dtype": "float32"}
+        return "tokenizer", type("FakeModel", (), {"state_dict": lambda self: weights})()
+    return fake
+
+
+def _cached():
+    return [n.rsplit("-", 2)[-2] for n in M.MODEL_CACHE]
+
+
+def test_translator_lru_budget_and_pins():
+    saved = M._load_pair, M.TRANSLATOR_CACHE_MB
+    M.MODEL_CACHE.clear()
+    M._MODEL_BYTES.clear()
+    M._PINNED.clear()
+    loaded = []
+    M._load_pair = _fake_loader({"hi": 100, "fr": 100, "de": 100, "ja": 100, "zh": 400}, loaded)
+    M.TRANSLATOR_CACHE_MB = 300
+    try:
+        assert M.preload_translators("hi-en") == ["hi-en"]
+        M.load_translator("fr")
+        M.load_translator("de")
+        assert _cached() == ["hi", "fr", "de"]  # exactly at budget
+
+        M.load_translator("fr")  # hit: fr becomes most recently used
+        M.load_translator("ja")  # evicts de (LRU), never the pinned hi
+        assert _cached() == ["hi", "fr", "ja"]
+        assert loaded == ["hi", "fr", "de", "ja"]
+
+        M.load_translator("zh")  # bigger than the budget on its own: kept, everything else unpinned goes
+        assert _cached() == ["hi", "zh"]
+        assert M.translator_models()["total_mb"] == 500.0
+
+        M.load_translator("de")  # reloaded after eviction; zh is now the LRU victim
+        assert _cached() == ["hi", "de"] and loaded[-1] == "de"
+        assert M.translator_models()["pinned"] == ["opus-mt-hi-en"]
+    finally:
+        M._load_pair, M.TRANSLATOR_CACHE_MB = saved
+        M.MODEL_CACHE.clear()
+        M._MODEL_BYTES.clear()
+        M._PINNED.clear()
+
+
+if __name__ == "__main__":
+    test_batched_results_keep_order()
+    test_in_flight_repeats_share_one_translation()
+    test_repeats_are_cache_hits()
+    test_failures_propagate_and_are_not_cached()
+    test_translator_lru_budget_and_pins()
+    print("✅ translation batching, caching and translator LRU work")